@@ -0,0 +1,73 @@
+# accounts/authentication.py
+"""
+JWT authentication for the API.
+
+ClaimsJWTAuthentication refuses tokens whose embedded grant is out of date
+(see accounts/tokens.py). CachedJWTAuthentication, the default, also keeps
+the authenticated user - with its role already joined - in Django's cache
+for AUTH_USER_CACHE_TTL seconds, so a request costs no user or role query.
+Signals (accounts/signals.py) drop a user's entry whenever the user or their
+role is saved or deleted, so deactivations take effect on the next request.
+That only holds when CACHES is shared by every worker process (see settings).
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.utils import get_md5_hash_password
+
+from .tokens import is_stale
+
+AUTH_USER_CACHE_TTL = getattr(settings, 'AUTH_USER_CACHE_TTL', 30)
+
+
+def user_cache_key(user_id):
+    return f'accounts:auth-user:{user_id}'
+
+
+def invalidate_cached_users(user_ids):
+    cache.delete_many([user_cache_key(user_id) for user_id in user_ids])
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """JWTAuthentication that refuses tokens whose embedded grant is out of date (see accounts/tokens.py)."""
+
+    def authenticate(self, request):
+        result = super().authenticate(request)
+        if result is None:
+            return None
+        user, token = result
+        if is_stale(token, user):
+            raise InvalidToken('Token permissions are out of date; refresh the token.')
+        return user, token
+
+
+class CachedJWTAuthentication(ClaimsJWTAuthentication):
+    """ClaimsJWTAuthentication that loads the user and role from a short-lived cache."""
+
+    def get_user(self, validated_token):
+        try:
+            user_id = validated_token[api_settings.USER_ID_CLAIM]
+        except KeyError as e:
+            raise InvalidToken(_("Token contained no recognizable user identification")) from e
+
+        key = user_cache_key(user_id)
+        user = cache.get(key)
+        if user is None:
+            user = (
+                self.user_model.objects.select_related('role')
+                .filter(**{api_settings.USER_ID_FIELD: user_id}).first()
+            )
+            if user is None:
+                raise AuthenticationFailed(_("User not found"), code="user_not_found")
+            cache.set(key, user, AUTH_USER_CACHE_TTL)
+
+        # the same checks as JWTAuthentication.get_user
+        if api_settings.CHECK_USER_IS_ACTIVE and not user.is_active:
+            raise AuthenticationFailed(_("User is inactive"), code="user_inactive")
+        if api_settings.CHECK_REVOKE_TOKEN:
+            if validated_token.get(api_settings.REVOKE_TOKEN_CLAIM) != get_md5_hash_password(user.password):
+                raise AuthenticationFailed(_("The user's password has been changed."), code="password_changed")
+        return user
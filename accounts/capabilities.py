@@ -0,0 +1,93 @@
+# accounts/capabilities.py
+"""
+Per-process cache of each role's key, capability codes and capability version.
+
+A role's grant is loaded with one query the first time it is needed and kept
+with its codes as a frozenset, so has_capability() and the any/all checks used
+by HasCapability and require_capabilities are set operations with no query.
+Signals (accounts/signals.py) drop a role's entry when its capabilities, the
+role itself or a capability code changes, and bump Role.capability_version so
+access tokens carrying the old grant (accounts/tokens.py) are refused. Those
+signals only reach the process that made the change, so entries also expire
+after CAPABILITY_CACHE_TTL seconds, which bounds how long other worker
+processes can serve a stale set. Token minting reads the grant fresh, and the
+version that token checks compare against lives in Django's shared cache.
+"""
+import threading
+import time
+from collections import namedtuple
+
+from django.conf import settings
+from django.core.cache import cache
+
+CAPABILITY_CACHE_TTL = getattr(settings, 'CAPABILITY_CACHE_TTL', 60)
+
+RoleGrant = namedtuple('RoleGrant', ['key', 'version', 'codes'])
+NO_ROLE = RoleGrant(None, None, frozenset())
+
+_cache = {}  # role id -> (expires at, RoleGrant)
+_lock = threading.Lock()
+
+
+def role_version_key(role_id):
+    return f'accounts:role-version:{role_id}'
+
+
+def role_grant(role_id, fresh=False):
+    """
+    RoleGrant (key, capability version, frozenset of codes) of this role; NO_ROLE for None.
+    fresh=True skips the cache and reloads it, for decisions other processes must agree on.
+    """
+    if role_id is None:
+        return NO_ROLE
+    now = time.monotonic()
+    entry = None if fresh else _cache.get(role_id)
+    if entry is not None and entry[0] > now:
+        return entry[1]
+    from .models import Role  # models import this module
+    rows = list(Role.objects.filter(pk=role_id).values_list('key', 'capability_version', 'capabilities__code'))
+    if not rows:
+        return NO_ROLE
+    grant = RoleGrant(rows[0][0], rows[0][1], frozenset(code for _, _, code in rows if code is not None))
+    with _lock:
+        _cache[role_id] = (now + CAPABILITY_CACHE_TTL, grant)
+    return grant
+
+
+def role_version(role_id):
+    """Current capability_version of this role, from the shared cache (one query on a miss)."""
+    key = role_version_key(role_id)
+    version = cache.get(key)
+    if version is None:
+        from .models import Role
+        version = Role.objects.filter(pk=role_id).values_list('capability_version', flat=True).first()
+        if version is not None:
+            cache.set(key, version, CAPABILITY_CACHE_TTL)
+    return version
+
+
+def role_capabilities(role_id):
+    """Frozenset of the capability codes granted to this role (empty for None)."""
+    return role_grant(role_id).codes
+
+
+def invalidate_role_capabilities(role_ids=None):
+    """Forget the cached grants of these roles, or of every role when role_ids is None."""
+    with _lock:
+        if role_ids is None:
+            _cache.clear()
+        else:
+            role_ids = list(role_ids)
+            for role_id in role_ids:
+                _cache.pop(role_id, None)
+    if role_ids is None:
+        from .models import Role
+        role_ids = Role.objects.values_list('pk', flat=True)
+    cache.delete_many([role_version_key(role_id) for role_id in role_ids])
+
+
+def has_capabilities(codes, granted, require_all=False):
+    """Whether `granted` covers all of `codes` (require_all) or at least one of them."""
+    if require_all:
+        return granted.issuperset(codes)
+    return not granted.isdisjoint(codes)
@@ -0,0 +1,156 @@
+# accounts/hierarchy.py
+"""
+Maintenance of the reports_to closure table (UserHierarchy).
+
+Each user has a depth-0 row for itself plus one row per manager above it, so
+"is A above B", "who is above B" and "how many report to A" are single
+indexed lookups. Saves keep it current through signals (accounts/signals.py):
+a new user copies its manager's ancestor rows; a user whose manager changes
+has its whole subtree detached from the old ancestors and re-attached under
+the new ones. Manager changes go through assign_manager(), which locks the
+manager chain and refuses cycles; saves re-check as a last guard. QuerySet.update()
+of reports_to bypasses this; run `manage.py rebuild_user_hierarchy` after one.
+"""
+from collections import defaultdict
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+
+from .models import User, UserHierarchy
+
+HIERARCHY_BATCH_SIZE = 1000
+
+
+def would_create_cycle(user_id, manager_id):
+    """Whether making manager_id the manager of user_id would close a loop."""
+    if manager_id is None or user_id is None:
+        return False
+    return manager_id == user_id or UserHierarchy.objects.filter(ancestor_id=user_id, descendant_id=manager_id).exists()
+
+
+def add_user(user):
+    """Rows for a newly created user: itself, plus its manager's ancestors one level further up."""
+    rows = [UserHierarchy(ancestor_id=user.pk, descendant_id=user.pk, depth=0)]
+    if user.reports_to_id is not None:
+        rows += [
+            UserHierarchy(ancestor_id=ancestor_id, descendant_id=user.pk, depth=depth + 1)
+            for ancestor_id, depth in UserHierarchy.objects.filter(descendant_id=user.reports_to_id)
+            .values_list('ancestor_id', 'depth')
+        ]
+    UserHierarchy.objects.bulk_create(rows)
+
+
+def detach_subtree(user_id):
+    """Cut user_id and everything below it loose from the managers above it."""
+    UserHierarchy.objects.filter(
+        descendant_id__in=UserHierarchy.objects.filter(ancestor_id=user_id).values('descendant_id'),
+        ancestor_id__in=UserHierarchy.objects.filter(descendant_id=user_id, depth__gt=0).values('ancestor_id'),
+    ).delete()
+
+
+def move_user(user_id, manager_id):
+    """Re-attach user_id's subtree under manager_id (None: make it a root)."""
+    with transaction.atomic():
+        detach_subtree(user_id)
+        if manager_id is None:
+            return
+        ancestors = list(UserHierarchy.objects.filter(descendant_id=manager_id).values_list('ancestor_id', 'depth'))
+        subtree = UserHierarchy.objects.filter(ancestor_id=user_id).values_list('descendant_id', 'depth')
+        rows = (
+            UserHierarchy(ancestor_id=ancestor_id, descendant_id=descendant_id, depth=up + down + 1)
+            for descendant_id, down in subtree.iterator(chunk_size=HIERARCHY_BATCH_SIZE)
+            for ancestor_id, up in ancestors
+        )
+        UserHierarchy.objects.bulk_create(rows, batch_size=HIERARCHY_BATCH_SIZE)
+
+
+def team_of(manager_id, max_depth=None):
+    """
+    Users below manager_id, direct reports first, annotated with `team_depth`
+    (1 for direct reports). max_depth stops that many levels down.
+    """
+    links = {'hierarchy_ancestors__ancestor_id': manager_id, 'hierarchy_ancestors__depth__gt': 0}
+    if max_depth is not None:
+        links['hierarchy_ancestors__depth__lte'] = max_depth
+    return (
+        User.objects.filter(**links)
+        .annotate(team_depth=F('hierarchy_ancestors__depth'))
+        .order_by('team_depth', 'hierarchy_ancestors__descendant_id')
+    )
+
+
+def check_manager(user_id, manager_id):
+    """Raise ValidationError if the assignment would make a user report to itself."""
+    if would_create_cycle(user_id, manager_id):
+        raise ValidationError("Invalid manager (would create cycle or self-reporting).")
+
+
+def lock_manager_chain(user_id, manager_id):
+    """
+    Lock the user and the new manager with every manager above it, in id order.
+    Two moves that could close a loop together share at least one of these rows,
+    so they run one after the other and the second sees the first's result.
+    """
+    ids = {user_id}
+    if manager_id is not None:
+        ids.add(manager_id)
+        ids.update(UserHierarchy.objects.filter(descendant_id=manager_id).values_list('ancestor_id', flat=True))
+    list(User.objects.select_for_update().filter(pk__in=ids).order_by('pk').values_list('pk', flat=True))
+
+
+def assign_manager(user, manager):
+    """Make `manager` (a User, or None) the user's manager; ValidationError if that closes a loop."""
+    manager_id = manager.pk if manager is not None else None
+    with transaction.atomic():
+        lock_manager_chain(user.pk, manager_id)
+        check_manager(user.pk, manager_id)
+        user.reports_to = manager
+        user.save()
+
+
+def rebuild_user_hierarchy():
+    """
+    Recompute the closure table from reports_to. Users caught in an existing cycle are
+    treated as roots of their own branch so the table stays a tree. Returns the row count.
+    """
+    children = defaultdict(list)
+    user_ids = []
+    for user_id, manager_id in User.objects.values_list('id', 'reports_to_id').iterator():
+        user_ids.append(user_id)
+        children[manager_id].append(user_id)
+
+    def rows():
+        placed = set()
+        roots = list(children[None])
+        pending = set(user_ids)
+        while True:
+            # depth-first from each root, carrying the path of ancestors
+            stack = [(root, ()) for root in roots]
+            while stack:
+                user_id, path = stack.pop()
+                if user_id in placed:
+                    continue
+                placed.add(user_id)
+                yield UserHierarchy(ancestor_id=user_id, descendant_id=user_id, depth=0)
+                for depth, ancestor_id in enumerate(reversed(path), start=1):
+                    yield UserHierarchy(ancestor_id=ancestor_id, descendant_id=user_id, depth=depth)
+                stack.extend((child, path + (user_id,)) for child in children[user_id])
+            pending -= placed
+            if not pending:
+                return
+            # whatever is left only hangs off a cycle; break it at the smallest id
+            roots = [min(pending)]
+
+    with transaction.atomic():
+        UserHierarchy.objects.all().delete()
+        count = 0
+        batch = []
+        for row in rows():
+            batch.append(row)
+            if len(batch) >= HIERARCHY_BATCH_SIZE:
+                UserHierarchy.objects.bulk_create(batch)
+                count += len(batch)
+                batch = []
+        UserHierarchy.objects.bulk_create(batch)
+    return count + len(batch)
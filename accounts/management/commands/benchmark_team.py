@@ -0,0 +1,111 @@
+# accounts/management/commands/benchmark_team.py
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+
+from accounts.hierarchy import rebuild_user_hierarchy, team_of
+from accounts.models import User
+
+# the same subtree, walked by the database instead of read from the closure table
+RECURSIVE_TEAM_SQL = """
+    WITH RECURSIVE team(id, depth) AS (
+        SELECT id, 1 FROM accounts_user WHERE reports_to_id = %s
+        UNION ALL
+        SELECT u.id, team.depth + 1 FROM accounts_user u JOIN team ON u.reports_to_id = team.id
+    )
+    SELECT id, depth FROM team ORDER BY depth, id LIMIT %s
+"""
+RECURSIVE_COUNT_SQL = """
+    WITH RECURSIVE team(id) AS (
+        SELECT id FROM accounts_user WHERE reports_to_id = %s
+        UNION ALL
+        SELECT u.id FROM accounts_user u JOIN team ON u.reports_to_id = team.id
+    )
+    SELECT COUNT(*) FROM team
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Time team lookups (first page plus count) through the closure table against a recursive CTE "
+        "and a Python walk over team_members, for managers at every level of a synthetic org of N users. "
+        "Everything runs in a transaction that is rolled back, so the database is left unchanged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100_000)
+        parser.add_argument('--fan-out', type=int, default=8, help='Direct reports per manager')
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--page-size', type=int, default=50)
+        parser.add_argument('--managers', type=int, default=5, help='Managers sampled per level')
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        page_size = options['page_size']
+        with transaction.atomic():
+            self.stdout.write(f"Creating {options['users']} users, {options['fan_out']} reports per manager...")
+            started = time.perf_counter()
+            levels = self.create_org(options['users'], options['fan_out'], options['batch_size'])
+            self.stdout.write(f"  inserted in {time.perf_counter() - started:.1f}s ({len(levels)} levels)")
+
+            started = time.perf_counter()
+            rows = rebuild_user_hierarchy()
+            self.stdout.write(f"  closure table rebuilt in {time.perf_counter() - started:.1f}s ({rows} rows)")
+
+            for level, ids in enumerate(levels[:-1]):
+                managers = rng.sample(ids, min(options['managers'], len(ids)))
+                sizes = sorted(team_of(manager_id).count() for manager_id in managers)
+                self.stdout.write(f"level {level} (median team of {sizes[len(sizes) // 2]}):")
+                self.report('closure', managers, lambda m: (
+                    list(team_of(m).values_list('id', 'team_depth')[:page_size]), team_of(m).count()
+                ))
+                self.report('CTE', managers, lambda m: self.recursive_team(m, page_size))
+                self.report('walk', managers, self.walk_team)
+
+            transaction.set_rollback(True)
+
+    def create_org(self, total, fan_out, batch_size):
+        """bulk_create the org one level at a time; returns the user ids of each level."""
+        levels = [[User.objects.create_user(phone_number='bench-0', username='bench-0', password=None).pk]]
+        created = 1
+        while created < total:
+            managers = levels[-1]
+            count = min(len(managers) * fan_out, total - created)
+            users = [
+                User(phone_number=f'bench-{created + i}', username=f'bench-{created + i}', reports_to_id=managers[i % len(managers)])
+                for i in range(count)
+            ]
+            User.objects.bulk_create(users, batch_size=batch_size)
+            created += count
+            levels.append(list(
+                User.objects.filter(reports_to_id__in=managers).order_by('id').values_list('id', flat=True)
+            ))
+        return levels
+
+    def recursive_team(self, manager_id, page_size):
+        with connection.cursor() as cursor:
+            cursor.execute(RECURSIVE_TEAM_SQL, [manager_id, page_size])
+            page = cursor.fetchall()
+            cursor.execute(RECURSIVE_COUNT_SQL, [manager_id])
+            return page, cursor.fetchone()[0]
+
+    def walk_team(self, manager_id):
+        # what a view would do without either: one query per level
+        team, frontier = [], [manager_id]
+        while frontier:
+            frontier = list(User.objects.filter(reports_to_id__in=frontier).values_list('id', flat=True))
+            team.extend(frontier)
+        return team
+
+    def report(self, label, managers, lookup):
+        timings = []
+        for manager_id in managers:
+            started = time.perf_counter()
+            lookup(manager_id)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f"{label:>10}: median {timings[len(timings) // 2]:.1f} ms, max {timings[-1]:.1f} ms over {len(timings)} managers"
+        )
@@ -0,0 +1,12 @@
+# accounts/management/commands/rebuild_user_hierarchy.py
+from django.core.management.base import BaseCommand
+
+from accounts.hierarchy import rebuild_user_hierarchy
+
+
+class Command(BaseCommand):
+    help = "Recompute the reports_to closure table from the users table"
+
+    def handle(self, *args, **options):
+        rows = rebuild_user_hierarchy()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt user hierarchy ({rows} rows)"))
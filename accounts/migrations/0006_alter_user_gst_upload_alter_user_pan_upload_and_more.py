@@ -0,0 +1,29 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:42
+
+import filestore.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_user_manufacturers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='user',
+            name='gst_upload',
+            field=models.FileField(blank=True, null=True, storage=filestore.storage.content_addressed_storage, upload_to='uploads/gst/'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='pan_upload',
+            field=models.FileField(blank=True, null=True, storage=filestore.storage.content_addressed_storage, upload_to='uploads/pan/'),
+        ),
+        migrations.AlterField(
+            model_name='user',
+            name='tan_upload',
+            field=models.FileField(blank=True, null=True, storage=filestore.storage.content_addressed_storage, upload_to='uploads/tan/'),
+        ),
+    ]
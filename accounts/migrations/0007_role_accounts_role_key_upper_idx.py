@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:51
+
+import django.db.models.functions.text
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_alter_user_gst_upload_alter_user_pan_upload_and_more'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='role',
+            index=models.Index(django.db.models.functions.text.Upper('key'), name='accounts_role_key_upper_idx'),
+        ),
+    ]
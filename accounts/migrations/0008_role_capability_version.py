@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:06
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_role_accounts_role_key_upper_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='role',
+            name='capability_version',
+            field=models.PositiveIntegerField(default=1, editable=False),
+        ),
+    ]
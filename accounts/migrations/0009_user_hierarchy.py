@@ -0,0 +1,66 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:13
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_user_hierarchy(apps, schema_editor):
+    # a frozen copy of accounts.hierarchy.rebuild_user_hierarchy on the historical models
+    User = apps.get_model('accounts', 'User')
+    UserHierarchy = apps.get_model('accounts', 'UserHierarchy')
+    children = defaultdict(list)
+    user_ids = []
+    for user_id, manager_id in User.objects.values_list('id', 'reports_to_id').iterator():
+        user_ids.append(user_id)
+        children[manager_id].append(user_id)
+
+    rows = []
+    placed = set()
+    pending = set(user_ids)
+    roots = list(children[None])
+    while pending:
+        stack = [(root, ()) for root in roots]
+        while stack:
+            user_id, path = stack.pop()
+            if user_id in placed:
+                continue
+            placed.add(user_id)
+            rows.append(UserHierarchy(ancestor_id=user_id, descendant_id=user_id, depth=0))
+            for depth, ancestor_id in enumerate(reversed(path), start=1):
+                rows.append(UserHierarchy(ancestor_id=ancestor_id, descendant_id=user_id, depth=depth))
+            stack.extend((child, path + (user_id,)) for child in children[user_id])
+            if len(rows) >= 1000:
+                UserHierarchy.objects.bulk_create(rows)
+                rows = []
+        pending -= placed
+        # whatever is left only hangs off a cycle; break it at the smallest id
+        roots = [min(pending)] if pending else []
+    UserHierarchy.objects.bulk_create(rows)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_role_capability_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UserHierarchy',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('depth', models.PositiveIntegerField()),
+                ('ancestor', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='hierarchy_descendants', to=settings.AUTH_USER_MODEL)),
+                ('descendant', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='hierarchy_ancestors', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'accounts_user_hierarchy',
+                'indexes': [models.Index(fields=['descendant', 'depth'], name='user_hierarchy_ancestors_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestor', 'descendant'), name='user_hierarchy_pair')],
+            },
+        ),
+        migrations.RunPython(backfill_user_hierarchy, migrations.RunPython.noop),
+    ]
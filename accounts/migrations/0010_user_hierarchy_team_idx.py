@@ -0,0 +1,17 @@
+# Generated by Django 5.2.5 on 2026-10-16 23:15
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0009_user_hierarchy'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='userhierarchy',
+            index=models.Index(fields=['ancestor', 'depth', 'descendant'], name='user_hierarchy_team_idx'),
+        ),
+    ]
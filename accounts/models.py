@@ -1,7 +1,12 @@
 from django.contrib.auth.models import AbstractUser, BaseUserManager
+from django.core.exceptions import ValidationError
 from django.db import models
+from django.db.models.functions import Upper
 from django.utils.translation import gettext_lazy as _
 
+from filestore.storage import content_addressed_storage
+from .capabilities import has_capabilities, role_capabilities
+
 
 class Capability(models.Model):
     code = models.CharField(max_length=128, unique=True)
@@ -15,12 +20,30 @@ class Role(models.Model):
     key = models.CharField(max_length=64, unique=True)
     name = models.CharField(max_length=128)
     capabilities = models.ManyToManyField(Capability, blank=True, related_name='roles')
+    # bumped whenever the role's grant changes; access tokens carrying an older value are refused
+    capability_version = models.PositiveIntegerField(default=1, editable=False)
+
+    class Meta:
+        indexes = [
+            # role__key__iexact lookups compare UPPER(key) on PostgreSQL
+            models.Index(Upper('key'), name='accounts_role_key_upper_idx'),
+        ]
 
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        # capability_version only moves by increments in the database (accounts/signals.py);
+        # a copy loaded before one must not write its older number back
+        if not self._state.adding:
+            update_fields = kwargs.get('update_fields')
+            if update_fields is None:
+                update_fields = [field.name for field in self._meta.concrete_fields if not field.primary_key]
+            kwargs['update_fields'] = [name for name in update_fields if name != 'capability_version']
+        super().save(*args, **kwargs)
+
     def has_capability(self, code: str) -> bool:
-        return self.capabilities.filter(code=code).exists()
+        return code in role_capabilities(self.pk)
 
 
 # ✅ Custom manager for User
@@ -75,8 +98,8 @@ class User(AbstractUser):
     gst_no = models.CharField(max_length=20, blank=True, null=True, unique=True)
     tan_no = models.CharField(max_length=20, blank=True, null=True, unique=True)
     state = models.ForeignKey(State, null=True, blank=True, on_delete=models.SET_NULL, related_name="users")
-    gst_upload = models.FileField(upload_to="uploads/gst/", null=True, blank=True)
-    tan_upload = models.FileField(upload_to="uploads/tan/", null=True, blank=True)
+    gst_upload = models.FileField(upload_to="uploads/gst/", storage=content_addressed_storage, null=True, blank=True)
+    tan_upload = models.FileField(upload_to="uploads/tan/", storage=content_addressed_storage, null=True, blank=True)
 
     # ---- NEW FIELDS to support Manufacturer/Vendor/Distributor forms ----
     # These are snake_case in DB but serializers expose camelCase names expected by frontend
@@ -95,7 +118,7 @@ class User(AbstractUser):
     )
 
     pan = models.CharField(max_length=20, null=True, blank=True, unique=True)
-    pan_upload = models.FileField(upload_to="uploads/pan/", null=True, blank=True)
+    pan_upload = models.FileField(upload_to="uploads/pan/", storage=content_addressed_storage, null=True, blank=True)
     region = models.CharField(max_length=150, null=True, blank=True)
     # link flags
     linked_to_distributor = models.BooleanField(default=False)
@@ -107,6 +130,8 @@ class User(AbstractUser):
         symmetrical=False,
         related_name="partners_with",  # manufacturers -> users associated
     )
+    # embedded in other payloads (e.g. device manufacturer), so their ETags track it
+    updated_at = models.DateTimeField(auto_now=True, null=True, blank=True)
 
     USERNAME_FIELD = "phone_number"
     REQUIRED_FIELDS = ["username"]
@@ -143,12 +168,54 @@ class User(AbstractUser):
     def has_capability(self, code: str) -> bool:
         if self.is_superuser:
             return True
-        return self.role.has_capability(code) if self.role else False
+        # role_id, not role: the cached set needs no Role row
+        return code in role_capabilities(self.role_id)
+
+    def has_capabilities(self, codes, require_all=False) -> bool:
+        """Any (or, with require_all, every) code in `codes`, checked against the cached set."""
+        if self.is_superuser:
+            return True
+        return has_capabilities(codes, role_capabilities(self.role_id), require_all)
+
+    def clean(self):
+        super().clean()
+        # the same rule assign_manager() enforces under a lock (accounts/hierarchy.py)
+        if self.pk is not None and self.reports_to_id is not None and (
+            self.reports_to_id == self.pk
+            or UserHierarchy.objects.filter(ancestor_id=self.pk, descendant_id=self.reports_to_id).exists()
+        ):
+            raise ValidationError({"reports_to": "Invalid manager (would create cycle or self-reporting)."})
 
     def is_manager_of(self, user) -> bool:
-        current = user.reports_to
-        while current:
-            if current == self:
-                return True
-            current = current.reports_to
-        return False
\ No newline at end of file
+        """Whether `user` reports to this user directly or indirectly; one closure-table lookup."""
+        return UserHierarchy.objects.filter(ancestor=self, descendant=user, depth__gt=0).exists()
+
+    def team_size(self) -> int:
+        """Number of users reporting to this user at any depth."""
+        return UserHierarchy.objects.filter(ancestor=self, depth__gt=0).count()
+
+
+class UserHierarchy(models.Model):
+    """
+    Closure table of the reports_to tree: one row per (ancestor, descendant) pair,
+    including each user paired with itself at depth 0. Maintained by accounts/hierarchy.py
+    on user saves and deletes; `manage.py rebuild_user_hierarchy` recomputes it.
+    """
+    ancestor = models.ForeignKey(User, on_delete=models.CASCADE, related_name="hierarchy_descendants", db_index=False)
+    descendant = models.ForeignKey(User, on_delete=models.CASCADE, related_name="hierarchy_ancestors", db_index=False)
+    depth = models.PositiveIntegerField()
+
+    class Meta:
+        db_table = "accounts_user_hierarchy"
+        constraints = [
+            # also serves subtree lookups (ancestor = X)
+            models.UniqueConstraint(fields=["ancestor", "descendant"], name="user_hierarchy_pair"),
+        ]
+        indexes = [
+            models.Index(fields=["descendant", "depth"], name="user_hierarchy_ancestors_idx"),
+            # a manager's team in depth order, without touching the table
+            models.Index(fields=["ancestor", "depth", "descendant"], name="user_hierarchy_team_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestor_id} -> {self.descendant_id} ({self.depth})"
\ No newline at end of file
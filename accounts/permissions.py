@@ -1,6 +1,24 @@
 # accounts/permissions.py
 from rest_framework import permissions
 
+from .capabilities import has_capabilities
+from .tokens import token_capabilities
+
+
+def has_request_capabilities(request, codes, require_all=False):
+    """
+    Capability check for the requesting user: from the access token's claims when it
+    carries them (no database access), else from the cached role grant.
+    """
+    user = request.user
+    if user.is_superuser:
+        return True
+    granted = token_capabilities(getattr(request, 'auth', None))
+    if granted is None:
+        return user.has_capabilities(codes, require_all=require_all)
+    return has_capabilities(codes, granted, require_all)
+
+
 class HasCapability(permissions.BasePermission):
     """
     Checks view.required_capabilities OR view.required_all_capabilities.
@@ -18,6 +36,6 @@ class HasCapability(permissions.BasePermission):
             return True
 
         if required_all:
-            return all(request.user.has_capability(code) for code in required_all)
+            return has_request_capabilities(request, required_all, require_all=True)
 
-        return any(request.user.has_capability(code) for code in required_any)
+        return has_request_capabilities(request, required_any)
@@ -1,15 +1,26 @@
 # accounts/serializers.py
 from rest_framework import serializers
 from .models import User, Role, State
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
 from django.contrib.auth import authenticate
 from django.utils.translation import gettext_lazy as _
 
+from filestore.serializers import UploadSessionFileField
+from .tokens import add_authorization_claims
+from .hierarchy import would_create_cycle
+
 
 # -------------------- Custom JWT --------------------
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     username_field = "phone_number"
 
+    @classmethod
+    def get_token(cls, user):
+        # the access token copies these claims from the refresh token
+        return add_authorization_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         phone_number = attrs.get("phone_number")
         password = attrs.get("password")
@@ -31,6 +42,18 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
+class CustomTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh with the user's current role and capabilities, not the ones from login."""
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        user = User.objects.filter(**{api_settings.USER_ID_FIELD: refresh.get(api_settings.USER_ID_CLAIM)}).first()
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(self.error_messages["no_active_account"], "no_active_account")
+        add_authorization_claims(refresh, user)
+        return super().validate({**attrs, "refresh": str(refresh)})
+
+
 # -------------------- Role Serializer --------------------
 class RoleSerializer(serializers.ModelSerializer):
     class Meta:
@@ -153,6 +176,15 @@ class UserSerializer(serializers.ModelSerializer):
         return {k: v for k, v in rep.items() if v is not None}
 
 
+class TeamMemberSerializer(UserSerializer):
+    """UserSerializer plus `depth`: 1 for direct reports, 2 for theirs, and so on."""
+
+    def to_representation(self, instance):
+        rep = super().to_representation(instance)
+        rep["depth"] = instance.team_depth
+        return rep
+
+
 # -------------------- User Create / Update Serializer (for POST/PUT) --------------------
 class UserCreateSerializer(serializers.ModelSerializer):
     # Accept 'name' from frontend to map to username
@@ -176,9 +208,10 @@ class UserCreateSerializer(serializers.ModelSerializer):
     bankName = serializers.CharField(source="bank_name", required=False, allow_blank=True)
     ifsc = serializers.CharField(required=False, allow_blank=True)
     pan = serializers.CharField(required=False, allow_blank=True)
-    panUpload = serializers.FileField(source="pan_upload", required=False, allow_null=True)
-    gstUpload = serializers.FileField(source="gst_upload", required=False, allow_null=True)
-    tanUpload = serializers.FileField(source="tan_upload", required=False, allow_null=True)
+    # KYC files: a multipart upload or the id of a finalized /api/uploads/ session
+    panUpload = UploadSessionFileField(source="pan_upload", required=False, allow_null=True)
+    gstUpload = UploadSessionFileField(source="gst_upload", required=False, allow_null=True)
+    tanUpload = UploadSessionFileField(source="tan_upload", required=False, allow_null=True)
     region = serializers.CharField(required=False, allow_blank=True)
     linkedToDistributor = serializers.BooleanField(source="linked_to_distributor", required=False)
     linkedToManufacturer = serializers.BooleanField(source="linked_to_manufacturer", required=False)
@@ -224,14 +257,17 @@ class UserCreateSerializer(serializers.ModelSerializer):
         s = str(value).strip()
         if s.isdigit():
             try:
-                return User.objects.get(id=int(s))
+                manager = User.objects.get(id=int(s))
             except User.DoesNotExist:
                 raise serializers.ValidationError("No user found with this ID.")
         else:
             try:
-                return User.objects.get(phone_number=s)
+                manager = User.objects.get(phone_number=s)
             except User.DoesNotExist:
                 raise serializers.ValidationError("No user found with this phone_number.")
+        if self.instance is not None and would_create_cycle(self.instance.pk, manager.pk):
+            raise serializers.ValidationError("Invalid manager (would create cycle or self-reporting).")
+        return manager
 
     # ---- helper: resolve district to District instance ----
     def _resolve_district_value(self, district_value):
@@ -0,0 +1,110 @@
+"""
+Keep role grants current: drop cached capability sets (accounts/capabilities.py)
+and bump Role.capability_version, which retires access tokens carrying the old
+grant, whenever the data behind a grant changes. Also drop cached
+authenticated users (accounts/authentication.py) when they or their role change,
+and keep the reports_to closure table (accounts/hierarchy.py) in step with users.
+"""
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_cached_users
+from .capabilities import invalidate_role_capabilities
+from .hierarchy import add_user, check_manager, detach_subtree, move_user
+from .models import Capability, Role, User
+
+
+def _grant_changed(role_ids=None):
+    """Bump the version of these roles (all when None) and forget their cached grants."""
+    roles = Role.objects.all() if role_ids is None else Role.objects.filter(pk__in=role_ids)
+    roles.update(capability_version=F('capability_version') + 1)
+    invalidate_role_capabilities(role_ids)
+    # again once committed, in case a concurrent request re-cached the old grant meanwhile
+    transaction.on_commit(lambda: invalidate_role_capabilities(role_ids))
+
+
+@receiver(m2m_changed, sender=Role.capabilities.through, dispatch_uid='accounts.role_capabilities_changed')
+def role_capabilities_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            _grant_changed([instance.pk])
+            instance.refresh_from_db(fields=['capability_version'])
+    elif action == 'pre_clear':
+        # capability.roles.clear() does not say which roles lose it, so look before the rows go
+        _grant_changed(list(instance.roles.values_list('pk', flat=True)))
+    elif action in ('post_add', 'post_remove'):
+        _grant_changed(pk_set)
+
+
+@receiver(post_save, sender=Role, dispatch_uid='accounts.role_saved')
+def role_saved(sender, instance, created, **kwargs):
+    # the role key travels in tokens too
+    if created:
+        invalidate_role_capabilities([instance.pk])
+        return
+    _grant_changed([instance.pk])
+    instance.refresh_from_db(fields=['capability_version'])
+    # cached users carry the role row
+    invalidate_cached_users(instance.users.values_list('pk', flat=True))
+
+
+@receiver(pre_delete, sender=Role, dispatch_uid='accounts.role_deleting')
+def role_deleting(sender, instance, **kwargs):
+    # users are detached (SET_NULL) without a save, so find them while they still point here
+    invalidate_cached_users(instance.users.values_list('pk', flat=True))
+
+
+@receiver(post_delete, sender=Role, dispatch_uid='accounts.role_deleted')
+def role_deleted(sender, instance, **kwargs):
+    invalidate_role_capabilities([instance.pk])
+
+
+@receiver(post_save, sender=User, dispatch_uid='accounts.user_saved')
+@receiver(post_delete, sender=User, dispatch_uid='accounts.user_deleted')
+def user_changed(sender, instance, **kwargs):
+    # covers is_active, password and role changes
+    invalidate_cached_users([instance.pk])
+    transaction.on_commit(lambda: invalidate_cached_users([instance.pk]))
+
+
+@receiver(pre_save, sender=User, dispatch_uid='accounts.user_manager_before_save')
+def check_manager_before_save(sender, instance, update_fields=None, raw=False, **kwargs):
+    # a new user has nobody below it, so any manager is fine
+    if raw or instance._state.adding or (update_fields is not None and 'reports_to' not in update_fields):
+        return
+    previous = sender.objects.filter(pk=instance.pk).values_list('reports_to_id', flat=True).first()
+    if previous != instance.reports_to_id:
+        # last guard for saves that bypass assign_manager(); views turn the error into a 400
+        check_manager(instance.pk, instance.reports_to_id)
+        instance._hierarchy_moved = True
+
+
+@receiver(post_save, sender=User, dispatch_uid='accounts.user_hierarchy_after_save')
+def update_hierarchy_after_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        add_user(instance)
+    elif instance.__dict__.pop('_hierarchy_moved', False):
+        move_user(instance.pk, instance.reports_to_id)
+
+
+@receiver(pre_delete, sender=User, dispatch_uid='accounts.user_hierarchy_before_delete')
+def detach_deleted_user(sender, instance, **kwargs):
+    # reports_to is SET_NULL without a save, so the team is cut loose here; the user's own rows cascade
+    detach_subtree(instance.pk)
+
+
+@receiver(post_save, sender=Capability, dispatch_uid='accounts.capability_saved')
+def capability_saved(sender, instance, created, **kwargs):
+    # a renamed code sits in the grant of every role holding it
+    if not created:
+        _grant_changed(list(instance.roles.values_list('pk', flat=True)))
+
+
+@receiver(pre_delete, sender=Capability, dispatch_uid='accounts.capability_deleted')
+def capability_deleted(sender, instance, **kwargs):
+    # before the cascade removes the role links
+    _grant_changed(list(instance.roles.values_list('pk', flat=True)))
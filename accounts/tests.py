@@ -1,3 +1,289 @@
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.cache import cache, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.exceptions import ValidationError
+from django.db.models import F
 from django.test import TestCase
+from django.utils.module_loading import import_string
+from rest_framework.test import APIClient, APIRequestFactory
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.tokens import AccessToken
+
+from mapwala_project import settings as project_settings
+
+from .authentication import CachedJWTAuthentication
+from .capabilities import invalidate_role_capabilities, role_grant, role_version, role_version_key
+from .hierarchy import rebuild_user_hierarchy
+from .models import Capability, Role, User, UserHierarchy
+from .permissions import HasCapability, has_request_capabilities
+
+
+class CapabilityCacheTests(TestCase):
+
+    def setUp(self):
+        invalidate_role_capabilities()
+        self.view_cap = Capability.objects.create(code='user.view')
+        self.list_cap = Capability.objects.create(code='user.list')
+        self.role = Role.objects.create(key='manager', name='Manager')
+        self.role.capabilities.add(self.view_cap)
+        self.user = User.objects.create_user(phone_number='9000000030', username='mgr', role=self.role)
+
+    def test_checks_are_served_from_cache(self):
+        self.assertTrue(self.user.has_capability('user.view'))
+        request = SimpleNamespace(user=self.user)
+        with self.assertNumQueries(0):
+            self.assertFalse(self.user.has_capability('user.list'))
+            self.assertTrue(self.user.has_capabilities(['user.list', 'user.view']))
+            self.assertFalse(self.user.has_capabilities(['user.list', 'user.view'], require_all=True))
+            self.assertTrue(HasCapability().has_permission(request, SimpleNamespace(required_capabilities=['user.view'])))
+            self.assertTrue(self.role.has_capability('user.view'))
+
+    def test_role_and_capability_changes_invalidate(self):
+        self.assertFalse(self.user.has_capability('user.list'))
+        self.role.capabilities.add(self.list_cap)
+        self.assertTrue(self.user.has_capability('user.list'))
+
+        self.list_cap.roles.remove(self.role)
+        self.assertFalse(self.user.has_capability('user.list'))
+
+        self.view_cap.code = 'user.read'
+        self.view_cap.save()
+        self.assertTrue(self.user.has_capability('user.read'))
+        self.assertFalse(self.user.has_capability('user.view'))
+
+
+class TokenClaimsTests(TestCase):
+
+    def setUp(self):
+        invalidate_role_capabilities()
+        self.view_cap = Capability.objects.create(code='user.view')
+        self.role = Role.objects.create(key='manager', name='Manager')
+        self.role.capabilities.add(self.view_cap)
+        self.user = User.objects.create_user(
+            phone_number='9000000040', username='mgr', password='MgrPass123', role=self.role
+        )
+        self.client = APIClient()
+
+    def login(self):
+        resp = self.client.post('/api/accounts/login/', {'phone_number': '9000000040', 'password': 'MgrPass123'}, format='json')
+        self.assertEqual(resp.status_code, 200, resp.data)
+        return resp.data
+
+    def get_with(self, access):
+        return self.client.get('/api/devices/choices/', HTTP_AUTHORIZATION=f'Bearer {access}')
+
+    def test_tokens_carry_role_and_capabilities(self):
+        token = AccessToken(self.login()['access'])
+        self.assertEqual((token['role'], token['role_id']), ('manager', self.role.pk))
+        self.assertEqual(token['caps'], ['user.view'])
+
+        invalidate_role_capabilities()
+        request = SimpleNamespace(user=self.user, auth=token)
+        with self.assertNumQueries(0):
+            self.assertTrue(has_request_capabilities(request, ['user.view', 'user.list']))
+            self.assertFalse(has_request_capabilities(request, ['user.view', 'user.list'], require_all=True))
+
+    def test_grant_changes_retire_tokens_until_refreshed(self):
+        tokens = self.login()
+        self.assertEqual(self.get_with(tokens['access']).status_code, 200)
+
+        self.role.capabilities.add(Capability.objects.create(code='user.list'))
+        self.assertEqual(self.get_with(tokens['access']).status_code, 401)
+
+        resp = self.client.post('/api/accounts/token/refresh/', {'refresh': tokens['refresh']}, format='json')
+        self.assertEqual(resp.status_code, 200, resp.data)
+        refreshed = resp.data
+        self.assertEqual(AccessToken(refreshed['access'])['caps'], ['user.list', 'user.view'])
+        self.assertEqual(self.get_with(refreshed['access']).status_code, 200)
+
+    def test_moving_user_to_another_role_retires_tokens(self):
+        access = self.login()['access']
+        self.user.role = Role.objects.create(key='sales', name='Sales')
+        self.user.save()
+        self.assertEqual(self.get_with(access).status_code, 401)
+
+
+    def test_workers_with_an_older_cached_grant_accept_newer_tokens(self):
+        # this process caches version N; another process changes the grant (no signal here)
+        version = role_grant(self.role.pk).version
+        self.assertEqual(role_version(self.role.pk), version)
+        Role.objects.filter(pk=self.role.pk).update(capability_version=F('capability_version') + 1)
+
+        # tokens are minted from the database, not the stale per-process grant
+        access = self.login()['access']
+        self.assertEqual(AccessToken(access)['cap_ver'], version + 1)
+        self.assertEqual(self.get_with(access).status_code, 200)
+
+        # once the shared version moves on, older tokens are refused
+        cache.delete(role_version_key(self.role.pk))
+        Role.objects.filter(pk=self.role.pk).update(capability_version=F('capability_version') + 1)
+        self.assertEqual(self.get_with(access).status_code, 401)
+
+    def test_saving_a_stale_role_never_lowers_its_version(self):
+        access = self.login()['access']
+        minted = AccessToken(access)['cap_ver']
+        stale = Role.objects.get(pk=self.role.pk)
+        self.role.capabilities.add(Capability.objects.create(code='user.list'))
+        self.assertEqual(self.role.capability_version, minted + 1)
+
+        stale.name = 'Renamed'
+        stale.save()
+        version = Role.objects.get(pk=self.role.pk).capability_version
+        self.assertEqual(version, minted + 2)
+        self.assertEqual(stale.capability_version, version)
+        self.assertEqual(self.get_with(access).status_code, 401)
+
+        stale.save(update_fields=['name', 'capability_version'])
+        self.assertEqual(Role.objects.get(pk=self.role.pk).capability_version, version + 1)
+
+
+class CachedAuthenticationTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        invalidate_role_capabilities()
+        self.role = Role.objects.create(key='admin', name='Admin')
+        self.user = User.objects.create_user(phone_number='9000000050', username='boss', password='BossPass123', role=self.role)
+        self.access = str(AccessToken.for_user(self.user))
+
+    def authenticate(self):
+        request = APIRequestFactory().get('/', HTTP_AUTHORIZATION=f'Bearer {self.access}')
+        return CachedJWTAuthentication().authenticate(request)[0]
+
+    def test_cache_is_shared_between_worker_processes(self):
+        # invalidations must reach every process, which a per-process cache cannot do;
+        # tests run on a private in-memory cache, so check the configured one
+        backend = import_string(project_settings.CACHES['default']['BACKEND'])
+        self.assertFalse(issubclass(backend, (LocMemCache, DummyCache)))
+        self.assertIs(caches['default'].__class__, LocMemCache)
+
+    def test_user_and_role_come_from_cache(self):
+        self.authenticate()
+        with self.assertNumQueries(0):
+            user = self.authenticate()
+            self.assertEqual(user.role.key.lower(), 'admin')
+
+    def test_deactivation_applies_immediately(self):
+        self.authenticate()
+        self.user.is_active = False
+        self.user.save()
+        with self.assertRaises(AuthenticationFailed):
+            self.authenticate()
+
+    def test_role_changes_reach_cached_users(self):
+        self.authenticate()
+        self.role.key = 'subadmin'
+        self.role.save()
+        self.assertEqual(self.authenticate().role.key, 'subadmin')
+
+
+class UserHierarchyTests(TestCase):
+
+    def setUp(self):
+        # ceo -> vp -> lead -> dev, and ceo -> cfo
+        self.ceo = User.objects.create_user(phone_number='9000000060', username='ceo', role=Role.objects.create(key='admin', name='Admin'))
+        self.vp = User.objects.create_user(phone_number='9000000061', username='vp', reports_to=self.ceo)
+        self.lead = User.objects.create_user(phone_number='9000000062', username='lead', reports_to=self.vp)
+        self.dev = User.objects.create_user(phone_number='9000000063', username='dev', reports_to=self.lead)
+        self.cfo = User.objects.create_user(phone_number='9000000064', username='cfo', reports_to=self.ceo)
+
+    def closure(self):
+        return set(UserHierarchy.objects.values_list('ancestor_id', 'descendant_id', 'depth'))
+
+    def test_is_manager_of_is_one_query(self):
+        with self.assertNumQueries(1):
+            self.assertTrue(self.ceo.is_manager_of(self.dev))
+        self.assertFalse(self.dev.is_manager_of(self.ceo))
+        self.assertFalse(self.dev.is_manager_of(self.dev))
+        self.assertEqual(self.ceo.team_size(), 4)
+
+    def test_moving_a_manager_moves_their_team(self):
+        self.lead.reports_to = self.cfo
+        self.lead.save()
+        self.assertTrue(self.cfo.is_manager_of(self.dev))
+        self.assertFalse(self.vp.is_manager_of(self.dev))
+        self.assertEqual(UserHierarchy.objects.get(ancestor=self.ceo, descendant=self.dev).depth, 3)
+
+        before = self.closure()
+        rebuild_user_hierarchy()
+        self.assertEqual(self.closure(), before)
+
+    def test_cycles_are_refused(self):
+        client = APIClient()
+        client.force_authenticate(self.ceo)
+        resp = client.post(f'/api/accounts/users/{self.vp.pk}/change_manager/', {'reports_to': str(self.dev.pk)}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.vp.refresh_from_db()
+        self.assertEqual(self.vp.reports_to_id, self.ceo.pk)
+
+    def test_cycle_found_at_save_time_is_a_400(self):
+        client = APIClient()
+        client.force_authenticate(self.ceo)
+        # as if a concurrent move landed between validation and the locked save
+        with mock.patch('accounts.serializers.would_create_cycle', return_value=False):
+            resp = client.patch(f'/api/accounts/users/{self.vp.pk}/', {'reports_to': self.dev.phone_number}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(User.objects.get(pk=self.vp.pk).reports_to_id, self.ceo.pk)
+
+        self.vp.reports_to = self.dev
+        with self.assertRaises(ValidationError):
+            self.vp.clean()
+
+    def test_deleting_a_manager_detaches_their_team(self):
+        self.vp.delete()
+        self.assertFalse(self.ceo.is_manager_of(self.dev))
+        self.assertTrue(self.lead.is_manager_of(self.dev))
+
+        before = self.closure()
+        rebuild_user_hierarchy()
+        self.assertEqual(self.closure(), before)
+
+
+class TeamEndpointTests(TestCase):
+
+    def setUp(self):
+        # vp -> lead -> dev, vp -> (dealer, tester)
+        self.dealer_role = Role.objects.create(key='dealer', name='Dealer')
+        self.vp = User.objects.create_user(phone_number='9000000070', username='vp')
+        self.lead = User.objects.create_user(phone_number='9000000071', username='lead', reports_to=self.vp)
+        self.dev = User.objects.create_user(phone_number='9000000072', username='dev', reports_to=self.lead)
+        self.dealer = User.objects.create_user(phone_number='9000000073', username='dealer', reports_to=self.vp, role=self.dealer_role)
+        self.tester = User.objects.create_user(phone_number='9000000074', username='tester', reports_to=self.vp)
+        self.client = APIClient()
+        self.client.force_authenticate(self.vp)
+
+    def team(self, user, **params):
+        return self.client.get(f'/api/accounts/users/{user.pk}/team/', params)
+
+    def test_lists_the_whole_subtree_direct_reports_first(self):
+        resp = self.team(self.vp)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['count'], 4)
+        self.assertEqual(
+            [(member['id'], member['depth']) for member in resp.data['data']],
+            [(self.lead.pk, 1), (self.dealer.pk, 1), (self.tester.pk, 1), (self.dev.pk, 2)],
+        )
+
+    def test_depth_and_role_filters(self):
+        resp = self.team(self.vp, depth=1)
+        self.assertEqual([member['id'] for member in resp.data['data']], [self.lead.pk, self.dealer.pk, self.tester.pk])
+        resp = self.team(self.vp, role='DEALER')
+        self.assertEqual([member['id'] for member in resp.data['data']], [self.dealer.pk])
+        self.assertEqual(self.team(self.vp, depth=0).status_code, 400)
+
+    def test_pages_with_offset(self):
+        resp = self.team(self.vp, page_size=3)
+        self.assertEqual(len(resp.data['data']), 3)
+        self.assertIn('offset=3', resp.data['next'])
+        self.assertIsNone(resp.data['previous'])
+        resp = self.team(self.vp, page_size=3, offset=3)
+        self.assertEqual([member['id'] for member in resp.data['data']], [self.dev.pk])
+        self.assertIsNone(resp.data['next'])
 
-# Create your tests here.
+    def test_only_managers_see_a_team(self):
+        self.assertEqual(self.team(self.lead).status_code, 200)
+        self.client.force_authenticate(self.dev)
+        self.assertEqual(self.team(self.vp).status_code, 403)
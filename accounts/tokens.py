@@ -0,0 +1,50 @@
+# accounts/tokens.py
+"""
+Authorization claims carried in JWTs.
+
+Tokens issued at login and on refresh embed the user's role id and key, the
+role's capability codes and the role's capability_version. HasCapability
+and require_capabilities authorize from those claims without touching the
+database. The authentication class (accounts/authentication.py) refuses a
+token whose role id no longer matches the user, or whose version is older
+than the role's current one, so clients refresh after a grant change.
+Claims are minted from a fresh read of the grant, and the current version
+comes from the shared cache, so every worker process agrees on both.
+Tokens issued before these claims existed fall back to the cached lookups.
+"""
+from .capabilities import role_grant, role_version
+
+ROLE_ID_CLAIM = 'role_id'
+ROLE_CLAIM = 'role'
+CAPABILITIES_CLAIM = 'caps'
+CAPABILITY_VERSION_CLAIM = 'cap_ver'
+
+
+def add_authorization_claims(token, user):
+    """Write the user's current grant into `token` (a simplejwt Token)."""
+    grant = role_grant(user.role_id, fresh=True)
+    token[ROLE_ID_CLAIM] = user.role_id
+    token[ROLE_CLAIM] = grant.key
+    token[CAPABILITIES_CLAIM] = sorted(grant.codes)
+    token[CAPABILITY_VERSION_CLAIM] = grant.version
+    return token
+
+
+def is_stale(token, user):
+    """True when `token` carries authorization claims that no longer match the user's grant."""
+    if CAPABILITY_VERSION_CLAIM not in token:
+        return False
+    if token.get(ROLE_ID_CLAIM) != user.role_id:
+        return True
+    if user.role_id is None:
+        return False
+    # older only: a token minted after a change elsewhere may be ahead of a cached version
+    current = role_version(user.role_id)
+    return current is not None and token[CAPABILITY_VERSION_CLAIM] < current
+
+
+def token_capabilities(token):
+    """Frozenset of the codes in a token's claims, or None when it carries none."""
+    if token is None or CAPABILITIES_CLAIM not in token:
+        return None
+    return frozenset(token[CAPABILITIES_CLAIM])
@@ -2,6 +2,8 @@
 from functools import wraps
 from rest_framework.exceptions import PermissionDenied
 
+from .permissions import has_request_capabilities
+
 def require_capabilities(*capabilities, require_all=False):
     def decorator(func):
         @wraps(func)
@@ -9,11 +11,7 @@ def require_capabilities(*capabilities, require_all=False):
             user = request.user
             if not user or not user.is_authenticated:
                 raise PermissionDenied("Authentication required")
-            if require_all:
-                ok = all(user.has_capability(c) for c in capabilities)
-            else:
-                ok = any(user.has_capability(c) for c in capabilities)
-            if not ok:
+            if not has_request_capabilities(request, capabilities, require_all=require_all):
                 raise PermissionDenied("Insufficient capabilities")
             return func(self, request, *args, **kwargs)
         return inner
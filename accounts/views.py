@@ -1,19 +1,33 @@
 # accounts/views.py
+from django.conf import settings
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
+from rest_framework.pagination import _positive_int
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
-from rest_framework_simplejwt.views import TokenObtainPairView
+from rest_framework.utils.urls import replace_query_param
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
 
-from .models import User, State
+from filestore.serializers import discard_used_uploads
+from .hierarchy import assign_manager, lock_manager_chain, team_of
+from .models import Role, User, State
 from .permissions import HasCapability
-from .serializers import UserCreateSerializer, UserSerializer, CustomTokenObtainPairSerializer, AdminUserSerializer
+from .serializers import UserCreateSerializer, UserSerializer, CustomTokenObtainPairSerializer, CustomTokenRefreshSerializer, AdminUserSerializer, TeamMemberSerializer
+
+TEAM_PAGE_SIZE = getattr(settings, 'TEAM_PAGE_SIZE', 50)
+TEAM_MAX_PAGE_SIZE = getattr(settings, 'TEAM_MAX_PAGE_SIZE', 500)
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
 
+class CustomTokenRefreshView(TokenRefreshView):
+    serializer_class = CustomTokenRefreshSerializer
+
+
 class UserViewSet(viewsets.ModelViewSet):
     queryset = User.objects.all().select_related('role', 'reports_to', 'state')
     lookup_field = 'id'
@@ -81,9 +95,10 @@ class UserViewSet(viewsets.ModelViewSet):
             except User.DoesNotExist:
                 return Response({'detail': 'Manager not found'}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = UserCreateSerializer(data=data)
+        serializer = UserCreateSerializer(data=data, context={'request': request})
         serializer.is_valid(raise_exception=True)
         self.perform_create(serializer)
+        discard_used_uploads(serializer.context)
         
         # Return response using UserSerializer - it will handle the appropriate format
         output_serializer = UserSerializer(serializer.instance, context={'request': request})
@@ -116,9 +131,18 @@ class UserViewSet(viewsets.ModelViewSet):
             except User.DoesNotExist:
                 return Response({'detail': 'Manager not found'}, status=status.HTTP_400_BAD_REQUEST)
 
-        serializer = UserCreateSerializer(target, data=data, partial=kwargs.get('partial', False))
+        serializer = UserCreateSerializer(target, data=data, partial=kwargs.get('partial', False), context={'request': request})
         serializer.is_valid(raise_exception=True)
-        self.perform_update(serializer)
+        try:
+            with transaction.atomic():
+                manager = serializer.validated_data.get('reports_to')
+                if manager is not None:
+                    # serialize with concurrent moves; the save re-checks for a cycle under the lock
+                    lock_manager_chain(target.pk, manager.pk)
+                self.perform_update(serializer)
+        except DjangoValidationError as e:
+            return Response({'detail': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
+        discard_used_uploads(serializer.context)
         
         # Return response using UserSerializer - it will handle the appropriate format
         output_serializer = UserSerializer(serializer.instance, context={'request': request})
@@ -153,8 +177,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
     # Case: removing manager
       if new_manager_value is None or new_manager_value == "":
-        target.reports_to = None
-        target.save()
+        assign_manager(target, None)
         return Response(UserSerializer(target, context={'request': request}).data)
 
       try:
@@ -170,15 +193,57 @@ class UserViewSet(viewsets.ModelViewSet):
       except User.DoesNotExist:
         return Response({'detail': 'Manager not found'}, status=status.HTTP_400_BAD_REQUEST)
 
-    # Prevent cycles/self-reporting
-      if new_manager.pk == target.pk or target.is_manager_of(new_manager):
-        return Response(
-            {'detail': 'Invalid manager (would create cycle or self-reporting).'},
-            status=status.HTTP_400_BAD_REQUEST
-        )
-
-      target.reports_to = new_manager
-      target.save()
+    # Prevent cycles/self-reporting (checked under a lock on the manager chain)
+      try:
+        assign_manager(target, new_manager)
+      except DjangoValidationError as e:
+        return Response({'detail': e.messages[0]}, status=status.HTTP_400_BAD_REQUEST)
 
       return Response(UserSerializer(target, context={'request': request}).data)
 
+    @action(detail=True, methods=['get'], url_path='team')
+    def team(self, request, id=None):
+        """
+        Everyone reporting to this user, directly or indirectly, direct reports first.
+        One query on the closure table (accounts/hierarchy.py) plus a count.
+        Filters: ?depth= (levels below the user), ?role= (role key). Paged with ?offset= and ?page_size=.
+        """
+        target = self.get_object()
+        caller = request.user
+        if not (caller.is_superuser or caller.has_capability('user.list') or caller.pk == target.pk or caller.is_manager_of(target)):
+            return Response({'detail': 'Not allowed'}, status=status.HTTP_403_FORBIDDEN)
+
+        params = request.query_params
+        errors = {}
+        depth, offset, page_size = None, 0, TEAM_PAGE_SIZE
+        try:
+            if 'depth' in params:
+                depth = _positive_int(params['depth'], strict=True)
+        except ValueError:
+            errors['depth'] = 'Must be a positive integer.'
+        try:
+            offset = _positive_int(params.get('offset', 0))
+        except ValueError:
+            errors['offset'] = 'Must be a non-negative integer.'
+        try:
+            if 'page_size' in params:
+                page_size = _positive_int(params['page_size'], strict=True, cutoff=TEAM_MAX_PAGE_SIZE)
+        except ValueError:
+            errors['page_size'] = 'Must be a positive integer.'
+        if errors:
+            return Response({'success': False, 'message': 'Invalid filters', 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        members = team_of(target.pk, max_depth=depth)
+        if params.get('role'):
+            members = members.filter(role__in=Role.objects.filter(key__iexact=params['role']))
+        total = members.count()
+        page = members.select_related('role', 'reports_to', 'state', 'district_fk').prefetch_related('manufacturers')[offset:offset + page_size]
+        url = request.build_absolute_uri()
+        return Response({
+            'success': True,
+            'message': 'Team retrieved successfully',
+            'data': TeamMemberSerializer(page, many=True, context={'request': request}).data,
+            'count': total,
+            'next': replace_query_param(url, 'offset', offset + page_size) if offset + page_size < total else None,
+            'previous': replace_query_param(url, 'offset', max(0, offset - page_size)) if offset else None,
+        })
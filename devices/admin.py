@@ -1,6 +1,9 @@
 # devices/admin.py
 from django.contrib import admin
 from .models import Device
+from .search import search_devices
+
+ADMIN_SEARCH_LIMIT = 1000
 
 @admin.register(Device)
 class DeviceAdmin(admin.ModelAdmin):
@@ -53,6 +56,15 @@ class DeviceAdmin(admin.ModelAdmin):
         }),
     )
     
+    def get_search_results(self, request, queryset, search_term):
+        # active devices match through the search index instead of LIKE scans over the joined
+        # fields; only the (few) soft-deleted ones, which are not indexed, still use search_fields
+        if not search_term.strip():
+            return queryset, False
+        ids, _ = search_devices(search_term, limit=ADMIN_SEARCH_LIMIT)
+        inactive, may_have_duplicates = super().get_search_results(request, queryset.filter(status=False), search_term)
+        return queryset.filter(pk__in=ids) | inactive, may_have_duplicates
+
     def manufacturer_name(self, obj):
         return obj.manufacturer_name
     manufacturer_name.short_description = 'Manufacturer'
\ No newline at end of file
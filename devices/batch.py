@@ -0,0 +1,119 @@
+# devices/batch.py
+"""
+Batch device create/update.
+
+Every related row the items refer to (manufacturers, devices being updated)
+is fetched up front with one query per kind, so validating N items costs a
+constant number of queries. Valid items are then written with bulk_create /
+bulk_update in one transaction.
+"""
+from contextlib import nullcontext
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import serializers
+
+from .models import Device
+from .search import index_devices
+from .usage import USAGE_DEVICE_FIELDS, tracking_component_usage
+from .serializers import DeviceCreateSerializer, manufacturer_queryset
+
+DEVICE_BATCH_MAX_SIZE = getattr(settings, 'DEVICE_BATCH_MAX_SIZE', 5000)
+DEVICE_BATCH_WRITE_SIZE = 500
+
+
+class DeviceBatchItemSerializer(DeviceCreateSerializer):
+    """One batch item: creates a device, or updates it (partially) when `id` is given."""
+    id = serializers.IntegerField(required=False)
+    make_id = serializers.IntegerField()
+
+    class Meta(DeviceCreateSerializer.Meta):
+        fields = ['id'] + DeviceCreateSerializer.Meta.fields
+        extra_kwargs = {}
+
+    def validate_id(self, value):
+        if value not in self.context['devices']:
+            raise serializers.ValidationError("Device not found.")
+        return value
+
+    def validate_make_id(self, value):
+        user = self.context['manufacturers'].get(value)
+        if user is None:
+            raise serializers.ValidationError(f'Invalid pk "{value}" - object does not exist.')
+        return super().validate_make_id(user)
+
+
+def _ids(items, key):
+    ids = set()
+    for item in items:
+        try:
+            ids.add(int(item.get(key)))
+        except (TypeError, ValueError):
+            pass
+    return ids
+
+
+def validate_device_batch(items):
+    """
+    Validate raw item dicts. Returns (results, valid, devices): one result dict per item
+    ({'index', 'status', 'errors'?}), (index, validated_data) pairs for the valid items, and
+    the devices being updated by id.
+    """
+    items = [item if isinstance(item, dict) else {} for item in items]
+    context = {
+        'manufacturers': manufacturer_queryset(Device, 'make_id').in_bulk(_ids(items, 'make_id')),
+        'devices': Device.objects.active().in_bulk(_ids(items, 'id')),
+    }
+
+    results, valid, seen_ids = [], [], set()
+    for index, item in enumerate(items):
+        serializer = DeviceBatchItemSerializer(data=item, context=context, partial='id' in item)
+        if not serializer.is_valid():
+            results.append({'index': index, 'status': 'invalid', 'errors': serializer.errors})
+            continue
+        device_id = serializer.validated_data.get('id')
+        if device_id is not None and device_id in seen_ids:
+            results.append({'index': index, 'status': 'invalid', 'errors': {'id': ['Device appears more than once in the batch.']}})
+            continue
+        seen_ids.add(device_id)
+        results.append({'index': index, 'status': 'valid'})
+        valid.append((index, serializer.validated_data))
+    return results, valid, context['devices']
+
+
+def save_device_batch(valid, devices, user):
+    """Write validated items in one transaction; returns {index: (status, device id)}."""
+    now = timezone.now()
+    to_create, to_update, update_fields = [], [], {'updated_at'}
+    for index, data in valid:
+        data = dict(data)
+        device_id = data.pop('id', None)
+        if device_id is None:
+            to_create.append((index, Device(created_by=user, **data)))
+            continue
+        device = devices[device_id]
+        for name, value in data.items():
+            setattr(device, name, value)
+        device.updated_at = now  # bulk_update skips auto_now
+        update_fields.update(data)
+        to_update.append((index, device))
+
+    with transaction.atomic():
+        Device.objects.bulk_create([device for _, device in to_create], batch_size=DEVICE_BATCH_WRITE_SIZE)
+        if to_update:
+            # new devices have no BOM yet; updated ones may move between usage keys
+            tracking = (
+                tracking_component_usage([device.pk for _, device in to_update])
+                if update_fields & USAGE_DEVICE_FIELDS else nullcontext()
+            )
+            with tracking:
+                Device.objects.bulk_update(
+                    [device for _, device in to_update], sorted(update_fields), batch_size=DEVICE_BATCH_WRITE_SIZE
+                )
+        # bulk writes send no post_save signals, so the search index is refreshed here
+        index_devices([device.pk for _, device in to_create + to_update])
+
+    saved = {index: ('created', device.pk) for index, device in to_create}
+    saved.update({index: ('updated', device.pk) for index, device in to_update})
+    return saved
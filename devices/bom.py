@@ -0,0 +1,84 @@
+# devices/bom.py
+"""
+Incremental BOM writes.
+
+Incoming rows are matched to the device's existing entries by a stable key
+(designator + identification mark) and only the differences are written:
+new rows are inserted, changed rows updated, and rows missing from the upload
+deleted. Everything happens in one transaction, so readers never see a
+half-written or empty BOM. The component usage summary is adjusted by the
+same difference.
+
+BOM order is (created_at, id). Matched rows keep their place, so rows new to
+an upload follow all of them, in upload order, rather than sitting where the
+file put them.
+"""
+from collections import defaultdict, deque
+
+from django.db import transaction
+
+from .importers import BOM_FIELDS, BOM_IMPORT_BATCH_SIZE, chunked
+from .models import BOMEntry
+from .usage import apply_usage_delta, device_usage
+
+
+def bom_key(values):
+    """Match key for a row dict or BOMEntry; falls back to the component when both ids are blank."""
+    get = values.get if isinstance(values, dict) else lambda name: getattr(values, name)
+    designator = (get('designator') or '').strip().lower()
+    mark = (get('identification_mark') or '').strip().lower()
+    if not designator and not mark:
+        return ('', '', (get('components_required') or '').strip().lower())
+    return (designator, mark)
+
+
+def sync_bom(device, rows, batch_size=BOM_IMPORT_BATCH_SIZE, on_batch=None):
+    """
+    Make `device`'s BOM equal to the cleaned `rows`, writing only what changed.
+    Returns counts: {'created', 'updated', 'deleted', 'unchanged'}.
+    Rows sharing a key are matched to existing entries in order; created rows are
+    appended after the existing ones (see the module docstring).
+    """
+    changes = {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+    with transaction.atomic():
+        existing = defaultdict(deque)
+        entries = BOMEntry.objects.select_for_update().filter(device=device).order_by('created_at', 'id')
+        for entry in entries.only('id', *BOM_FIELDS):
+            existing[bom_key(entry)].append(entry)
+        usage_before = device_usage([device.pk])
+
+        processed = 0
+        for chunk in chunked(rows, batch_size):
+            to_create, to_update = [], []
+            for row in chunk:
+                matches = existing.get(bom_key(row))
+                if not matches:
+                    to_create.append(BOMEntry(device=device, **row))
+                    continue
+                entry = matches.popleft()
+                if all(getattr(entry, name) == row[name] for name in BOM_FIELDS):
+                    changes['unchanged'] += 1
+                    continue
+                for name in BOM_FIELDS:
+                    setattr(entry, name, row[name])
+                to_update.append(entry)
+
+            if to_create:
+                BOMEntry.objects.bulk_create(to_create)
+            if to_update:
+                BOMEntry.objects.bulk_update(to_update, BOM_FIELDS)
+            changes['created'] += len(to_create)
+            changes['updated'] += len(to_update)
+            processed += len(chunk)
+            if on_batch is not None:
+                on_batch(processed)
+
+        # whatever was not matched by the upload is gone from the BOM
+        stale_ids = [entry.pk for matches in existing.values() for entry in matches]
+        for ids in chunked(stale_ids, batch_size):
+            changes['deleted'] += BOMEntry.objects.filter(pk__in=ids).delete()[0]
+
+        if changes['created'] or changes['updated'] or changes['deleted']:
+            apply_usage_delta(usage_before, device_usage([device.pk]))
+            device.touch()
+    return changes
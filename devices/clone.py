@@ -0,0 +1,67 @@
+# devices/clone.py
+"""
+Device cloning.
+
+A clone copies the device row, its BOM entries and its one-to-one
+sub-components in one transaction, using bulk inserts. The sticker image is
+content-addressed, so the clone points at the same stored file and only its
+reference count goes up; the thumbnail/WebP variants are regenerated for the
+clone by the usual background job rather than shared, since variant files are
+replaced in place when a sticker changes.
+"""
+from django.db import transaction
+from django.db.models.fields.files import FieldFile
+
+from .images import schedule_sticker_variants
+from .importers import BOM_FIELDS, BOM_IMPORT_BATCH_SIZE, chunked
+from .models import BOMEntry, Device, DeviceQuerySet, Sticker
+from .usage import tracking_component_usage
+
+# copied from the source as they are; everything else is reset for the new row
+DEVICE_CLONE_FIELDS = ('make_id', 'model', 'mrp', 'unit_of_measure', 'version', 'variant', 'state_of_supply', 'quantity')
+NOT_COPIED = {'id', 'device', 'created_at', 'updated_at', 'sticker_thumbnail', 'sticker_webp'}
+
+
+def _copy(instance, **values):
+    """Unsaved copy of a sub-component with its concrete fields, minus keys and timestamps."""
+    fields = {
+        field.attname: getattr(instance, field.attname)
+        for field in instance._meta.concrete_fields if field.name not in NOT_COPIED
+    }
+    for name, value in fields.items():
+        if isinstance(value, FieldFile):
+            fields[name] = value.name  # same stored file, no new FieldFile bound to the source
+    fields.update(values)
+    return type(instance)(**fields)
+
+
+def clone_device(source, user, overrides=None):
+    """
+    Copy `source` (loaded with its components, see DeviceQuerySet.with_components) with
+    `overrides` applied to the device fields. Returns the new device.
+    """
+    fields = {name: getattr(source, name) for name in DEVICE_CLONE_FIELDS}
+    fields.update(overrides or {})
+
+    with transaction.atomic():
+        device = Device.objects.create(created_by=user, **fields)
+
+        with tracking_component_usage([device.pk]):
+            rows = BOMEntry.objects.filter(device=source).order_by('created_at', 'id').values_list(*BOM_FIELDS)
+            for chunk in chunked(rows.iterator(chunk_size=BOM_IMPORT_BATCH_SIZE), BOM_IMPORT_BATCH_SIZE):
+                BOMEntry.objects.bulk_create([BOMEntry(device=device, **dict(zip(BOM_FIELDS, row))) for row in chunk])
+
+        sticker = None
+        for relation in DeviceQuerySet.COMPONENT_RELATIONS:
+            component = getattr(source, relation, None)
+            if component is None:
+                continue
+            copy = _copy(component, device=device)
+            type(copy).objects.bulk_create([copy])
+            if isinstance(copy, Sticker):
+                sticker = copy
+
+        if sticker is not None and sticker.sticker_image:
+            sticker.sticker_image.storage.retain(sticker.sticker_image.name)
+            schedule_sticker_variants(sticker)
+    return device
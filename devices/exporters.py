@@ -0,0 +1,88 @@
+# devices/exporters.py
+"""
+Streaming BOM export.
+
+Rows come from a server-side iterator over BOMEntry and are written straight
+out: CSV line by line, XLSX through openpyxl's write-only mode (which spools
+rows to a temporary file) and then sent in fixed-size chunks. A full
+catalogue export never sits in memory.
+"""
+import csv
+import tempfile
+
+from django.conf import settings
+from openpyxl import Workbook
+
+from .models import BOMEntry
+
+# same headers as the sample template, so a single-device export can be re-imported
+BOM_HEADERS = ['IDENTIFICATION MARK', 'COMPONENTS REQUIRED', 'Designator', 'SHIP QTY', 'FP CROSS CHECKED']
+BOM_COLUMNS = ['identification_mark', 'components_required', 'designator', 'ship_qty', 'fp_cross_checked']
+
+CATALOGUE_HEADERS = ['DEVICE ID', 'MODEL', 'VARIANT', 'VERSION', 'MANUFACTURER', 'DEVICE QUANTITY'] + BOM_HEADERS
+CATALOGUE_COLUMNS = [
+    'device_id', 'device__model', 'device__variant', 'device__version', 'device__make_id__username',
+    'device__quantity'
+] + BOM_COLUMNS
+
+EXPORT_ITERATOR_CHUNK_SIZE = getattr(settings, 'BOM_EXPORT_CHUNK_SIZE', 2000)
+STREAM_BLOCK_SIZE = 64 * 1024
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+
+def bom_export_rows(device=None):
+    """(headers, row iterator) for one device's BOM, or every active device's BOM when device is None."""
+    if device is not None:
+        queryset = BOMEntry.objects.filter(device=device)
+        headers, columns = BOM_HEADERS, BOM_COLUMNS
+    else:
+        queryset = BOMEntry.objects.filter(device__status=True)
+        headers, columns = CATALOGUE_HEADERS, CATALOGUE_COLUMNS
+    rows = queryset.order_by('device_id', 'created_at', 'id').values_list(*columns)
+    return headers, rows.iterator(chunk_size=EXPORT_ITERATOR_CHUNK_SIZE)
+
+
+class _Echo:
+    """File-like object whose write() hands the line back, so csv.writer can feed a generator."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(headers, rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow(headers)
+    for row in rows:
+        yield writer.writerow(row)
+
+
+def stream_xlsx(headers, rows, sheet_name='BOM'):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(sheet_name)
+    sheet.append(headers)
+    for row in rows:
+        sheet.append(row)
+    with tempfile.TemporaryFile() as output:
+        workbook.save(output)
+        output.seek(0)
+        while True:
+            block = output.read(STREAM_BLOCK_SIZE)
+            if not block:
+                break
+            yield block
+
+
+STREAMERS = {
+    'csv': stream_csv,
+    'xlsx': stream_xlsx,
+}
+
+
+def stream_bom_export(file_format, device=None):
+    """Byte/str chunks of the export in `file_format` ('csv' or 'xlsx')."""
+    headers, rows = bom_export_rows(device)
+    return STREAMERS[file_format](headers, rows)
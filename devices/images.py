@@ -0,0 +1,105 @@
+# devices/images.py
+"""
+Sticker image pipeline.
+
+Uploads are validated from the image header only (format and pixel size), so
+the request never decodes the full bitmap. A bounded thumbnail and a WebP
+rendition are generated afterwards by the `devices.sticker_variants` job;
+clients pick the variant that fits and only fetch the original when needed.
+"""
+import io
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+from jobs.registry import enqueue
+
+STICKER_IMAGE_FORMATS = {'JPEG', 'PNG', 'WEBP', 'GIF'}
+STICKER_MAX_PIXELS = getattr(settings, 'STICKER_MAX_PIXELS', 40_000_000)
+STICKER_THUMBNAIL_SIZE = getattr(settings, 'STICKER_THUMBNAIL_SIZE', (256, 256))
+STICKER_WEBP_SIZE = getattr(settings, 'STICKER_WEBP_SIZE', (1600, 1600))
+STICKER_WEBP_QUALITY = 80
+
+
+class InvalidImage(ValueError):
+    """Raised when an upload is not an image we accept."""
+
+
+def inspect_image(fileobj):
+    """
+    (format, width, height) read from the image header; the pixel data is not decoded.
+    Leaves the file at position 0.
+    """
+    fileobj.seek(0)
+    try:
+        with Image.open(fileobj) as image:
+            image_format, (width, height) = image.format, image.size
+    except (UnidentifiedImageError, Image.DecompressionBombError, OSError):
+        raise InvalidImage('Upload a valid image. The file you uploaded was either not an image or a corrupted image.')
+    finally:
+        fileobj.seek(0)
+
+    if image_format not in STICKER_IMAGE_FORMATS:
+        raise InvalidImage(f"Unsupported image format '{image_format}'. Use one of: {', '.join(sorted(STICKER_IMAGE_FORMATS))}.")
+    if width * height > STICKER_MAX_PIXELS:
+        raise InvalidImage(f'Image is too large ({width}x{height}); the limit is {STICKER_MAX_PIXELS} pixels.')
+    return image_format, width, height
+
+
+def _render(image, size, image_format, **options):
+    copy = image.copy()
+    copy.thumbnail(size, Image.Resampling.LANCZOS, reducing_gap=3.0)
+    output = io.BytesIO()
+    copy.save(output, format=image_format, **options)
+    return ContentFile(output.getvalue())
+
+
+def render_variants(fileobj):
+    """{'thumbnail': ContentFile, 'webp': ContentFile} for an original image file (both WebP)."""
+    with Image.open(fileobj) as image:
+        # JPEG can decode straight at a reduced scale, which is much cheaper than a full decode
+        image.draft('RGB', STICKER_WEBP_SIZE)
+        image = ImageOps.exif_transpose(image)
+        if image.mode not in ('RGB', 'RGBA'):
+            image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+        return {
+            'webp': _render(image, STICKER_WEBP_SIZE, 'WEBP', quality=STICKER_WEBP_QUALITY, method=4),
+            'thumbnail': _render(image, STICKER_THUMBNAIL_SIZE, 'WEBP', quality=STICKER_WEBP_QUALITY),
+        }
+
+
+def generate_sticker_variants(sticker):
+    """Render and store the sticker's thumbnail and WebP variants, replacing older ones."""
+    # content-addressed originals are named by a 64-char digest; keep variant names within max_length
+    stem = os.path.splitext(os.path.basename(sticker.sticker_image.name))[0][:32]
+    with sticker.sticker_image.open('rb') as original:
+        variants = render_variants(original)
+
+    for field_name, variant, suffix in (('sticker_thumbnail', 'thumbnail', 'thumb'), ('sticker_webp', 'webp', 'full')):
+        field = getattr(sticker, field_name)
+        if field:
+            field.delete(save=False)
+        field.save(f'{stem}_{suffix}.webp', variants[variant], save=False)
+
+    # a plain update, so saving the sticker does not re-run its signals and jobs
+    type(sticker).objects.filter(pk=sticker.pk).update(
+        sticker_thumbnail=sticker.sticker_thumbnail.name, sticker_webp=sticker.sticker_webp.name
+    )
+    # the device's ETag is built from updated_at; clients holding the variant-less copy must refetch
+    sticker.device.touch()
+
+
+def schedule_sticker_variants(sticker):
+    """
+    Queue variant generation after the original changed. The old variants no longer
+    match, so they are cleared now and their files removed by the job.
+    """
+    stale = [name for name in (sticker.sticker_thumbnail.name, sticker.sticker_webp.name) if name]
+    if stale:
+        type(sticker).objects.filter(pk=sticker.pk).update(sticker_thumbnail='', sticker_webp='')
+        sticker.sticker_thumbnail, sticker.sticker_webp = '', ''
+    return enqueue('devices.sticker_variants', {
+        'sticker_id': sticker.pk, 'image': sticker.sticker_image.name, 'stale': stale
+    })
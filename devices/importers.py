@@ -0,0 +1,236 @@
+# devices/importers.py
+"""
+Streaming BOM spreadsheet import.
+
+Files are read lazily in chunks: .xlsx through openpyxl's read-only mode, .csv
+through pandas' chunked reader and .parquet batch by batch. Headers are
+normalized once. Each chunk becomes a DataFrame and is validated column by
+column in one vectorized pass, and the clean rows are yielded for
+devices.bom.sync_bom to write in bounded batches, so memory stays flat however
+large the uploaded file is.
+"""
+import os
+from itertools import islice
+
+import pandas as pd
+import pyarrow.parquet as pq
+from django.conf import settings
+from openpyxl import load_workbook
+
+
+BOM_FIELDS = ('identification_mark', 'components_required', 'designator', 'ship_qty', 'fp_cross_checked')
+TEXT_FIELDS = tuple(name for name in BOM_FIELDS if name != 'ship_qty')
+TEXT_MAX_LENGTH = 255
+
+BOM_IMPORT_BATCH_SIZE = getattr(settings, 'BOM_IMPORT_BATCH_SIZE', 1000)
+
+# rows listed per error in the validation report
+MAX_REPORTED_ROWS = 20
+
+
+class BOMImportError(Exception):
+    """Raised when an uploaded BOM cannot be read."""
+
+
+class BOMValidationError(BOMImportError):
+    """Raised after a full validation pass when rows are invalid; `report` lists them compactly."""
+
+    def __init__(self, report):
+        self.report = report
+        super().__init__(f"{report['invalid_rows']} BOM row(s) are invalid.")
+
+
+def normalize_header(value):
+    """'SHIP QTY' -> 'ship_qty'; same mapping as the sample template headers."""
+    if value is None:
+        return None
+    return str(value).strip().upper().replace(' ', '_').lower()
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _bom_columns(header):
+    columns = [(index, name) for index, name in enumerate(map(normalize_header, header)) if name in BOM_FIELDS]
+    if not columns:
+        raise BOMImportError('No BOM columns found. Expected: ' + ', '.join(BOM_FIELDS))
+    return columns
+
+
+def _frame(records, first_line):
+    """DataFrame of BOM columns indexed by spreadsheet line number."""
+    frame = pd.DataFrame.from_records(records, columns=BOM_FIELDS)
+    frame.index = pd.RangeIndex(first_line, first_line + len(frame))
+    return frame
+
+
+def _frames_from_rows(rows, chunk_size):
+    """Chunk an iterator of raw row tuples (header first) into DataFrames."""
+    try:
+        header = next(rows)
+    except StopIteration:
+        return
+    columns = _bom_columns(header)
+    line = 2  # the header is line 1
+    for chunk in chunked(rows, chunk_size):
+        records = [{name: row[index] if index < len(row) else None for index, name in columns} for row in chunk]
+        yield _frame(records, line)
+        line += len(chunk)
+
+
+def iter_xlsx_frames(fileobj, chunk_size):
+    workbook = load_workbook(fileobj, read_only=True, data_only=True)
+    try:
+        yield from _frames_from_rows(workbook.active.iter_rows(values_only=True), chunk_size)
+    finally:
+        workbook.close()
+
+
+def iter_xls_frames(fileobj, chunk_size):
+    # legacy .xls has no streaming reader; xlrd loads the sheet, rows are still chunked
+    import xlrd
+    sheet = xlrd.open_workbook(file_contents=fileobj.read()).sheet_by_index(0)
+    yield from _frames_from_rows((sheet.row_values(i) for i in range(sheet.nrows)), chunk_size)
+
+
+def _normalize_frame(frame, first_line):
+    frame = frame.rename(columns=normalize_header)
+    if not any(name in frame.columns for name in BOM_FIELDS):
+        raise BOMImportError('No BOM columns found. Expected: ' + ', '.join(BOM_FIELDS))
+    frame = frame.loc[:, ~frame.columns.duplicated()].reindex(columns=BOM_FIELDS)
+    frame.index = pd.RangeIndex(first_line, first_line + len(frame))
+    return frame
+
+
+def iter_csv_frames(fileobj, chunk_size):
+    line = 2
+    reader = pd.read_csv(
+        fileobj, chunksize=chunk_size, dtype=str, keep_default_na=False,
+        encoding='utf-8-sig', skip_blank_lines=False,
+    )
+    for frame in reader:
+        yield _normalize_frame(frame, line)
+        line += len(frame)
+
+
+def iter_parquet_frames(fileobj, chunk_size):
+    line = 2
+    for batch in pq.ParquetFile(fileobj).iter_batches(batch_size=chunk_size):
+        frame = batch.to_pandas()
+        yield _normalize_frame(frame, line)
+        line += len(frame)
+
+
+READERS = {
+    '.xlsx': iter_xlsx_frames,
+    '.xlsm': iter_xlsx_frames,
+    '.xls': iter_xls_frames,
+    '.csv': iter_csv_frames,
+    '.parquet': iter_parquet_frames,
+}
+
+
+def iter_bom_frames(uploaded_file, chunk_size=BOM_IMPORT_BATCH_SIZE):
+    """Yield DataFrame chunks of raw BOM columns from an upload, picking the reader by extension."""
+    extension = os.path.splitext(uploaded_file.name or '')[1].lower()
+    reader = READERS.get(extension)
+    if reader is None:
+        raise BOMImportError(f"Unsupported BOM file type '{extension or uploaded_file.name}'.")
+    uploaded_file.seek(0)
+    try:
+        yield from reader(uploaded_file, chunk_size)
+    except BOMImportError:
+        raise
+    except Exception as e:
+        raise BOMImportError(f'Could not read BOM file: {e}')
+
+
+def iter_record_frames(records, chunk_size=BOM_IMPORT_BATCH_SIZE, first_line=1):
+    """Chunk manually entered row dicts into DataFrames (line numbers count from `first_line`)."""
+    line = first_line
+    for chunk in chunked(records, chunk_size):
+        if not all(isinstance(record, dict) for record in chunk):
+            raise BOMImportError('Each BOM entry must be an object.')
+        yield _frame(chunk, line)
+        line += len(chunk)
+
+
+def validate_frame(frame):
+    """
+    Coerce and validate one chunk column-wise.
+    Returns (clean frame without blank rows, list of (column, message, line numbers)).
+    """
+    text = {}
+    for name in TEXT_FIELDS:
+        column = frame[name].astype('string').str.strip()
+        text[name] = column.mask(column == '')
+
+    raw_qty = frame['ship_qty'].astype('string').str.strip()
+    qty_blank = (raw_qty.isna() | (raw_qty == '')).to_numpy(dtype=bool)
+    qty = pd.to_numeric(raw_qty.mask(qty_blank), errors='coerce')
+
+    blank = qty_blank.copy()
+    for column in text.values():
+        blank &= column.isna().to_numpy(dtype=bool)
+
+    errors = []
+
+    def report(mask, column, message):
+        mask = mask & ~blank
+        if mask.any():
+            errors.append((column, message, frame.index[mask].tolist()))
+
+    report(qty.isna().to_numpy(dtype=bool) & ~qty_blank, 'ship_qty', 'must be a number')
+    report(((qty < 0) | (qty % 1 != 0)).fillna(False).to_numpy(dtype=bool), 'ship_qty', 'must be a whole number >= 0')
+    for name, column in text.items():
+        too_long = column.str.len().gt(TEXT_MAX_LENGTH).fillna(False).to_numpy(dtype=bool)
+        report(too_long, name, f'must be at most {TEXT_MAX_LENGTH} characters')
+
+    clean = pd.DataFrame(text, index=frame.index)
+    clean['ship_qty'] = qty.fillna(0)
+    return clean[~blank], errors
+
+
+def frame_records(frame):
+    """Row dicts ready for BOMEntry(**row): plain Python values, None for missing text."""
+    records = frame.astype(object).where(frame.notna(), None).to_dict('records')
+    for record in records:
+        record['ship_qty'] = int(record['ship_qty'])
+    return records
+
+
+def build_report(grouped):
+    invalid = set()
+    errors = []
+    for (column, message), lines in grouped.items():
+        invalid.update(lines)
+        errors.append({
+            'column': column,
+            'message': message,
+            'count': len(lines),
+            'rows': lines[:MAX_REPORTED_ROWS],
+        })
+    return {'invalid_rows': len(invalid), 'errors': errors}
+
+
+def iter_valid_rows(frames):
+    """
+    Yield validated row dicts chunk by chunk. The first invalid chunk stops the output,
+    but the remaining chunks are still checked so the caller gets one complete report,
+    raised as BOMValidationError once the input is exhausted.
+    """
+    grouped = {}
+    for frame in frames:
+        clean, errors = validate_frame(frame)
+        for column, message, lines in errors:
+            grouped.setdefault((column, message), []).extend(lines)
+        if not grouped:
+            yield from frame_records(clean)
+    if grouped:
+        raise BOMValidationError(build_report(grouped))
@@ -0,0 +1,57 @@
+# devices/jobs.py
+"""Background job handlers for device data (run by `manage.py run_jobs`)."""
+import tempfile
+
+from django.core.files import File
+from django.core.files.storage import default_storage
+
+from jobs.registry import PermanentJobError, register
+
+from .bom import sync_bom
+from .exporters import stream_bom_export
+from .images import generate_sticker_variants
+from .importers import BOMImportError, BOMValidationError, iter_bom_frames, iter_valid_rows
+from .models import Device, Sticker
+
+
+@register('devices.import_bom')
+def import_bom(job):
+    try:
+        device = Device.objects.get(pk=job.payload['device_id'], status=True)
+    except Device.DoesNotExist:
+        raise PermanentJobError('Device not found.')
+    try:
+        with job.input_file.open('rb') as bom_file:
+            changes = sync_bom(device, iter_valid_rows(iter_bom_frames(bom_file)), on_batch=job.set_progress)
+    except BOMValidationError as e:
+        job.result = {'device_id': device.pk, 'errors': e.report}
+        raise PermanentJobError(str(e))
+    except BOMImportError as e:
+        raise PermanentJobError(str(e))
+    return {'device_id': device.pk, **changes}
+
+
+@register('devices.export_bom')
+def export_bom(job):
+    file_format = job.payload.get('file_format', 'csv')
+    with tempfile.TemporaryFile() as output:
+        for chunk in stream_bom_export(file_format):
+            output.write(chunk.encode('utf-8') if isinstance(chunk, str) else chunk)
+        output.seek(0)
+        job.result_file.save(f'bom_catalogue_{job.pk}.{file_format}', File(output), save=False)
+    return {'file_format': file_format}
+
+
+@register('devices.sticker_variants')
+def sticker_variants(job):
+    for name in job.payload.get('stale', []):
+        default_storage.delete(name)
+    sticker = Sticker.objects.filter(pk=job.payload['sticker_id']).first()
+    if sticker is None or sticker.sticker_image.name != job.payload['image']:
+        # deleted or replaced since; a newer job covers the new image
+        return {'skipped': True}
+    try:
+        generate_sticker_variants(sticker)
+    except (OSError, ValueError) as e:
+        raise PermanentJobError(f'Could not process sticker image: {e}')
+    return {'sticker_id': sticker.pk, 'thumbnail': sticker.sticker_thumbnail.name, 'webp': sticker.sticker_webp.name}
@@ -0,0 +1,74 @@
+# devices/management/commands/benchmark_device_search.py
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from accounts.models import User
+from devices.models import Device
+from devices.search import get_search_backend
+
+WORDS = ['tracker', 'panic', 'gps', 'lite', 'pro', 'max', 'nano', 'fleet', 'guard', 'beacon', 'vlt', 'ais']
+
+
+class Command(BaseCommand):
+    help = (
+        "Time ?q= searches through the index against LIKE scans over N synthetic devices. "
+        "Everything runs in a transaction that is rolled back, so the database is left unchanged."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--devices', type=int, default=1_000_000)
+        parser.add_argument('--batch-size', type=int, default=10_000)
+        parser.add_argument('--queries', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rng = random.Random(42)
+        with transaction.atomic():
+            maker = User.objects.create_user(phone_number='0000000000', username='bench-maker', password=None)
+            self.stdout.write(f"Creating {options['devices']} devices...")
+            started = time.perf_counter()
+            for start in range(0, options['devices'], options['batch_size']):
+                count = min(options['batch_size'], options['devices'] - start)
+                Device.objects.bulk_create([
+                    Device(
+                        make_id=maker, model=f"{rng.choice(WORDS)} {rng.choice(WORDS)} {start + i}",
+                        variant=rng.choice(WORDS), version=f"v{rng.randint(1, 9)}", mrp=1000,
+                    )
+                    for i in range(count)
+                ], batch_size=options['batch_size'])
+            self.stdout.write(f"  inserted in {time.perf_counter() - started:.1f}s")
+
+            backend = get_search_backend()
+            started = time.perf_counter()
+            backend.rebuild()
+            self.stdout.write(f"  indexed ({type(backend).__name__}) in {time.perf_counter() - started:.1f}s")
+
+            queries = [f"{rng.choice(WORDS)} {rng.choice(WORDS)[:3]}" for _ in range(options['queries'])]
+            self.report('index', queries, lambda q: backend.search(q, limit=50))
+            self.report('LIKE scan', queries, self.like_search)
+
+            transaction.set_rollback(True)
+
+    def like_search(self, query):
+        queryset = Device.objects.active()
+        for term in query.split():
+            queryset = queryset.filter(
+                Q(model__icontains=term) | Q(variant__icontains=term) | Q(version__icontains=term)
+                | Q(make_id__username__icontains=term)
+            )
+        return list(queryset.values_list('id', flat=True)[:50]), queryset.count()
+
+    def report(self, label, queries, search):
+        timings = []
+        for query in queries:
+            started = time.perf_counter()
+            search(query)
+            timings.append((time.perf_counter() - started) * 1000)
+        timings.sort()
+        self.stdout.write(
+            f"{label:>10}: median {timings[len(timings) // 2]:.1f} ms, "
+            f"p95 {timings[min(len(timings) - 1, int(len(timings) * 0.95))]:.1f} ms over {len(timings)} queries"
+        )
@@ -0,0 +1,12 @@
+# devices/management/commands/rebuild_component_usage.py
+from django.core.management.base import BaseCommand
+
+from devices.usage import rebuild_component_usage
+
+
+class Command(BaseCommand):
+    help = "Recompute the component usage summary from the BOM tables"
+
+    def handle(self, *args, **options):
+        rows = rebuild_component_usage()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt component usage summary ({rows} rows)"))
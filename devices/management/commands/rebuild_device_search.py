@@ -0,0 +1,15 @@
+# devices/management/commands/rebuild_device_search.py
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from devices.search import get_search_backend
+
+
+class Command(BaseCommand):
+    help = "Rebuild the device search index from the devices table"
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        with transaction.atomic():
+            backend.rebuild()
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt device search index ({type(backend).__name__})"))
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:39
+
+import devices.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0009_sticker'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='sticker',
+            name='sticker_thumbnail',
+            field=models.ImageField(blank=True, editable=False, upload_to=devices.models.get_sticker_variant_path),
+        ),
+        migrations.AddField(
+            model_name='sticker',
+            name='sticker_webp',
+            field=models.ImageField(blank=True, editable=False, upload_to=devices.models.get_sticker_variant_path),
+        ),
+    ]
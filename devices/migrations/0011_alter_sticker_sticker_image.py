@@ -0,0 +1,20 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:42
+
+import devices.models
+import filestore.storage
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0010_sticker_variants'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='sticker',
+            name='sticker_image',
+            field=models.ImageField(storage=filestore.storage.content_addressed_storage, upload_to=devices.models.get_sticker_upload_path),
+        ),
+    ]
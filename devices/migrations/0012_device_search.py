@@ -0,0 +1,93 @@
+from django.db import DatabaseError, migrations, transaction
+
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS device_search USING fts5("
+    "model, variant, version, manufacturer, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+
+# pg_trgm must exist before this migration runs; see ensure_pg_trgm()
+POSTGRES_CREATE = [
+    "CREATE TABLE IF NOT EXISTS device_search ("
+    "device_id bigint PRIMARY KEY, document text NOT NULL, vector tsvector NOT NULL)",
+    "CREATE INDEX IF NOT EXISTS device_search_vector_gin ON device_search USING gin (vector)",
+    "CREATE INDEX IF NOT EXISTS device_search_document_trgm ON device_search USING gin (document gin_trgm_ops)",
+]
+
+
+def ensure_pg_trgm(schema_editor):
+    """
+    Creating an extension needs a superuser (or, for trusted extensions, CREATE on the
+    database), which the application role often lacks. Skip it when already installed;
+    otherwise try, and on failure say what a database administrator has to run.
+    """
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        if cursor.fetchone():
+            return
+    try:
+        with transaction.atomic(using=schema_editor.connection.alias):
+            schema_editor.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    except DatabaseError as e:
+        raise DatabaseError(
+            "Device search needs the pg_trgm extension. Have a superuser run "
+            "`CREATE EXTENSION pg_trgm;` in this database, then migrate again."
+        ) from e
+
+
+def _source_sql(apps, connection):
+    # a frozen copy of devices.search._source_sql on the historical models
+    Device = apps.get_model('devices', 'Device')
+    User = apps.get_model('accounts', 'User')
+    qn = connection.ops.quote_name
+    return (
+        f"SELECT d.{qn('id')}, COALESCE(d.{qn('model')}, ''), COALESCE(d.{qn('variant')}, ''), "
+        f"COALESCE(d.{qn('version')}, ''), COALESCE(u.{qn('username')}, '') "
+        f"FROM {qn(Device._meta.db_table)} d "
+        f"LEFT JOIN {qn(User._meta.db_table)} u ON u.{qn('id')} = d.{qn(Device._meta.get_field('make_id').column)} "
+        f"WHERE d.{qn('status')}"
+    )
+
+
+# frozen copies of the search backends' rebuild() statements
+SQLITE_BACKFILL = "INSERT INTO device_search (rowid, model, variant, version, manufacturer) {source}"
+POSTGRES_BACKFILL = (
+    "INSERT INTO device_search (device_id, document, vector) "
+    "SELECT src.id, src.model || ' ' || src.variant || ' ' || src.version || ' ' || src.manufacturer, "
+    "setweight(to_tsvector('simple', src.model), 'A') || "
+    "setweight(to_tsvector('simple', src.manufacturer), 'B') || "
+    "setweight(to_tsvector('simple', src.variant || ' ' || src.version), 'C') "
+    "FROM ({source}) AS src (id, model, variant, version, manufacturer)"
+)
+
+
+def create_search_index(apps, schema_editor):
+    connection = schema_editor.connection
+    source = _source_sql(apps, connection)
+    if connection.vendor == 'sqlite':
+        schema_editor.execute(SQLITE_CREATE)
+        schema_editor.execute(SQLITE_BACKFILL.format(source=source))
+        schema_editor.execute("INSERT INTO device_search (device_search) VALUES ('optimize')")
+    elif connection.vendor == 'postgresql':
+        ensure_pg_trgm(schema_editor)
+        for statement in POSTGRES_CREATE:
+            schema_editor.execute(statement)
+        schema_editor.execute(POSTGRES_BACKFILL.format(source=source))
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor in ('sqlite', 'postgresql'):
+        schema_editor.execute("DROP TABLE IF EXISTS device_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0011_alter_sticker_sticker_image'),
+        ('accounts', '0006_alter_user_gst_upload_alter_user_pan_upload_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:51
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0012_device_search'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='bomentry',
+            index=models.Index(fields=['device', 'created_at', 'id'], name='bom_device_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='device',
+            index=models.Index(condition=models.Q(('status', True)), fields=['-created_at', 'id'], name='devices_active_created_idx'),
+        ),
+    ]
@@ -0,0 +1,70 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:56
+
+from collections import defaultdict
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
+
+
+def backfill_component_usage(apps, schema_editor):
+    # a frozen copy of devices.usage.rebuild_component_usage on the historical models
+    BOMEntry = apps.get_model('devices', 'BOMEntry')
+    ComponentUsage = apps.get_model('devices', 'ComponentUsage')
+    rows = (
+        BOMEntry.objects.filter(device__status=True)
+        .values('device_id', 'components_required', 'device__make_id', 'device__state_of_supply')
+        .annotate(
+            ship_qty_sum=Sum('ship_qty'),
+            weighted=Sum(F('ship_qty') * Coalesce('device__quantity', Value(0))),
+        )
+        .order_by()
+    )
+    usage = defaultdict(lambda: [0, 0])  # key -> [total_ship_qty, weighted_qty]
+    devices = defaultdict(set)
+    for row in rows.iterator(chunk_size=1000):
+        key = ((row['components_required'] or '').strip(), row['device__make_id'], row['device__state_of_supply'])
+        usage[key][0] += row['ship_qty_sum'] or 0
+        usage[key][1] += row['weighted'] or 0
+        devices[key].add(row['device_id'])
+    summary = []
+    for (component, manufacturer_id, state_of_supply), (total_ship_qty, weighted_qty) in usage.items():
+        summary.append(ComponentUsage(
+            component=component, manufacturer_id=manufacturer_id, state_of_supply=state_of_supply,
+            device_count=len(devices[component, manufacturer_id, state_of_supply]),
+            total_ship_qty=total_ship_qty, weighted_qty=weighted_qty,
+        ))
+    ComponentUsage.objects.bulk_create(summary, batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('devices', '0013_bomentry_bom_device_created_idx_and_more'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComponentUsage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('component', models.CharField(max_length=255)),
+                ('state_of_supply', models.CharField(choices=[('RAW_MATERIAL', 'Raw Material'), ('WORK_IN_PROGRESS', 'Work in Progress'), ('FINISHED_GOODS', 'Finished Goods'), ('SEMI_FINISHED', 'Semi-Finished'), ('CONSUMABLE', 'Consumable')], max_length=20)),
+                ('device_count', models.PositiveIntegerField(default=0)),
+                ('total_ship_qty', models.BigIntegerField(default=0)),
+                ('weighted_qty', models.BigIntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('manufacturer', models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='component_usage', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'device_component_usage',
+                'ordering': ['component', 'manufacturer_id', 'state_of_supply'],
+                'indexes': [models.Index(fields=['manufacturer', 'state_of_supply', 'component'], name='component_usage_make_idx'), models.Index(fields=['state_of_supply', 'component', 'manufacturer'], name='component_usage_state_idx')],
+                'constraints': [models.UniqueConstraint(fields=('component', 'manufacturer', 'state_of_supply'), name='component_usage_key')],
+            },
+        ),
+        migrations.RunPython(backfill_component_usage, migrations.RunPython.noop),
+    ]
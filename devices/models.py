@@ -1,6 +1,48 @@
 # devices/models.py
 from django.db import models
+from django.utils import timezone
 from accounts.models import User
+from filestore.storage import content_addressed_storage
+
+
+class DeviceQuerySet(models.QuerySet):
+    """Query helpers that load the device graph in a fixed number of queries."""
+
+    # one-to-one sub-components, each carrying its own `make` user
+    COMPONENT_RELATIONS = ('enclosure', 'wire_harness', 'battery', 'sos_button', 'sticker')
+    GRAPH_RELATIONS = ('make_id', 'bom_entries') + COMPONENT_RELATIONS
+
+    def active(self):
+        return self.filter(status=True)
+
+    def with_components(self, relations=COMPONENT_RELATIONS):
+        """JOIN the manufacturer and the given sub-components (plus their make) in the same query."""
+        related = ['make_id']
+        for relation in relations:
+            related += [relation, f'{relation}__make']
+        return self.select_related(*related)
+
+    def with_bom(self):
+        """Load all BOM entries of the selected devices with one extra query."""
+        return self.prefetch_related(
+            # device_id first lets bom_device_created_idx return the rows already sorted
+            models.Prefetch('bom_entries', queryset=BOMEntry.objects.order_by('device_id', 'created_at', 'id'))
+        )
+
+    def with_graph(self, relations=None):
+        """Load `relations` (a subset of GRAPH_RELATIONS, default all) and nothing else."""
+        if relations is None:
+            relations = self.GRAPH_RELATIONS
+        queryset = self
+        components = [r for r in self.COMPONENT_RELATIONS if r in relations]
+        if components:
+            queryset = queryset.with_components(components)
+        elif 'make_id' in relations:
+            queryset = queryset.select_related('make_id')
+        if 'bom_entries' in relations:
+            queryset = queryset.with_bom()
+        return queryset
+
 
 class Device(models.Model):
     UNIT_OF_MEASURE_CHOICES = [
@@ -56,13 +98,24 @@ class Device(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     status = models.BooleanField(default=True)
+
+    objects = DeviceQuerySet.as_manager()
     
     class Meta:
         db_table = 'devices'
         ordering = ['-created_at']
+        indexes = [
+            # active-device listing in keyset order; partial, since only active devices are listed
+            models.Index(fields=['-created_at', 'id'], condition=models.Q(status=True), name='devices_active_created_idx'),
+        ]
         
     def __str__(self):
         return f"{self.manufacturer_name} - {self.model}"
+
+    def touch(self):
+        """Bump updated_at after a BOM or sub-component write so ETags/Last-Modified change."""
+        self.updated_at = timezone.now()
+        Device.objects.filter(pk=self.pk).update(updated_at=self.updated_at)
     
     @property
     def manufacturer_name(self):
@@ -84,6 +137,10 @@ class BOMEntry(models.Model):
     class Meta:
         db_table = 'device_bom_entries'
         ordering = ['created_at']
+        indexes = [
+            # a device's BOM in entry order, for prefetches, sync and exports
+            models.Index(fields=['device', 'created_at', 'id'], name='bom_device_created_idx'),
+        ]
         verbose_name = "BOM Entry"
         verbose_name_plural = "BOM Entries"
 
@@ -228,6 +285,9 @@ class SOSButton(models.Model):
 def get_sticker_upload_path(instance, filename):
     return f'devices/stickers/device_{instance.device.id}/{filename}'
 
+def get_sticker_variant_path(instance, filename):
+    return f'devices/stickers/device_{instance.device_id}/variants/{filename}'
+
 class Sticker(models.Model):
     """Stores sticker details for a specific device."""
     device = models.OneToOneField(Device, on_delete=models.CASCADE, related_name='sticker')
@@ -244,7 +304,10 @@ class Sticker(models.Model):
     length = models.DecimalField(max_digits=10, decimal_places=2, help_text="in mm")
     breadth = models.DecimalField(max_digits=10, decimal_places=2, help_text="in mm")
     quantity = models.PositiveIntegerField()
-    sticker_image = models.ImageField(upload_to=get_sticker_upload_path)
+    sticker_image = models.ImageField(upload_to=get_sticker_upload_path, storage=content_addressed_storage)
+    # generated by the devices.sticker_variants job; empty until it has run
+    sticker_thumbnail = models.ImageField(upload_to=get_sticker_variant_path, blank=True, editable=False)
+    sticker_webp = models.ImageField(upload_to=get_sticker_variant_path, blank=True, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -254,9 +317,35 @@ class Sticker(models.Model):
 
     def __str__(self):
         return f"Sticker for {self.device.model} - {self.name}"
-    
 
 
+# --- COMPONENT USAGE SUMMARY ---
 
+class ComponentUsage(models.Model):
+    """
+    Usage of each BOM component across active devices, per manufacturer and
+    state of supply. Maintained incrementally by devices/usage.py; never edit by hand.
+    """
+    component = models.CharField(max_length=255)
+    manufacturer = models.ForeignKey(User, on_delete=models.CASCADE, related_name='component_usage', db_index=False)
+    state_of_supply = models.CharField(max_length=20, choices=Device.STATE_OF_SUPPLY_CHOICES)
+    device_count = models.PositiveIntegerField(default=0)
+    total_ship_qty = models.BigIntegerField(default=0)
+    # ship_qty multiplied by each device's BOM quantity (devices without a quantity count as 0)
+    weighted_qty = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        db_table = 'device_component_usage'
+        ordering = ['component', 'manufacturer_id', 'state_of_supply']
+        constraints = [
+            # also serves lookups by component
+            models.UniqueConstraint(fields=['component', 'manufacturer', 'state_of_supply'], name='component_usage_key'),
+        ]
+        indexes = [
+            models.Index(fields=['manufacturer', 'state_of_supply', 'component'], name='component_usage_make_idx'),
+            models.Index(fields=['state_of_supply', 'component', 'manufacturer'], name='component_usage_state_idx'),
+        ]
 
+    def __str__(self):
+        return f"{self.component or 'N/A'} - {self.state_of_supply}: {self.total_ship_qty}"
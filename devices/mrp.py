@@ -0,0 +1,129 @@
+# devices/mrp.py
+"""
+Material requirements explosion.
+
+A production plan ({device id: units to build}) is turned into total
+component requirements. BOM rows for all planned devices are read in one
+query and the one-to-one sub-components (with their per-device quantities)
+in another; the multiplication and group-by run vectorized in pandas, so the
+cost is two queries plus a few array operations however large the plan is.
+"""
+import numpy as np
+import pandas as pd
+from django.conf import settings
+
+from .models import BOMEntry, Device
+
+MRP_MAX_PLAN_SIZE = getattr(settings, 'DEVICE_MRP_MAX_PLAN_SIZE', 10000)
+
+# sub-component relation -> field holding the quantity used per device (None: one per device)
+SUB_COMPONENT_QUANTITIES = {
+    'enclosure': 'quantity',
+    'wire_harness': None,
+    'battery': None,
+    'sos_button': 'quantity_per_set',
+    'sticker': 'quantity',
+}
+
+
+class PlanError(ValueError):
+    """The production plan is malformed; `errors` maps item indexes to messages."""
+
+    def __init__(self, message, errors=None):
+        super().__init__(message)
+        self.errors = errors or {}
+
+
+def parse_plan(items):
+    """
+    Normalize [{'device_id', 'quantity'}, ...] into {device_id: quantity}; repeated
+    devices are summed. Raises PlanError listing every bad item.
+    """
+    if not isinstance(items, list) or not items:
+        raise PlanError('Send a non-empty list of {"device_id", "quantity"} items.')
+    if len(items) > MRP_MAX_PLAN_SIZE:
+        raise PlanError(f'A plan holds at most {MRP_MAX_PLAN_SIZE} items.')
+
+    plan, errors = {}, {}
+    for index, item in enumerate(items):
+        try:
+            device_id, quantity = int(item['device_id']), int(item['quantity'])
+        except (TypeError, KeyError, ValueError):
+            errors[index] = 'Needs an integer device_id and quantity.'
+            continue
+        if quantity <= 0:
+            errors[index] = 'Quantity must be greater than zero.'
+            continue
+        plan[device_id] = plan.get(device_id, 0) + quantity
+    if errors:
+        raise PlanError('Invalid plan items.', errors)
+    return plan
+
+
+def _sub_component_frame(device_ids):
+    """One row per (device, sub-component) present: relation, part_no, per-device quantity."""
+    columns = ['id']
+    for relation, quantity_field in SUB_COMPONENT_QUANTITIES.items():
+        columns.append(f'{relation}__part_no')
+        if quantity_field:
+            columns.append(f'{relation}__{quantity_field}')
+    # the reverse one-to-one lookups LEFT JOIN every sub-component table in the same query
+    devices = pd.DataFrame.from_records(
+        Device.objects.active().filter(id__in=device_ids).order_by().values_list(*columns), columns=columns
+    )
+
+    frames = []
+    for relation, quantity_field in SUB_COMPONENT_QUANTITIES.items():
+        part = devices[['id', f'{relation}__part_no']].rename(columns={f'{relation}__part_no': 'part_no'})
+        part['per_device'] = devices[f'{relation}__{quantity_field}'] if quantity_field else 1
+        part['type'] = relation
+        frames.append(part[part['part_no'].notna()])
+    return devices['id'], pd.concat(frames, ignore_index=True)
+
+
+def explode_requirements(plan):
+    """
+    Total requirements for building plan[device_id] units of each device.
+    Returns {'components': [...], 'sub_components': [...], 'missing_devices': [...]}.
+    """
+    found_ids, sub_components = _sub_component_frame(list(plan))
+    builds = pd.Series(plan, name='build_qty', dtype=np.int64)
+    builds.index.name = 'id'
+
+    entries = pd.DataFrame.from_records(
+        BOMEntry.objects.filter(device_id__in=list(found_ids)).order_by()
+        .values_list('device_id', 'components_required', 'ship_qty'),
+        columns=['id', 'component', 'ship_qty'],
+    )
+    # clean the distinct names only, then broadcast them back by code
+    codes, names = pd.factorize(entries['component'], use_na_sentinel=False)
+    entries['component'] = pd.Series(names, dtype=object).fillna('').str.strip().to_numpy()[codes]
+    entries['required_qty'] = entries['ship_qty'].astype(np.int64) * entries['id'].map(builds)
+    components = (
+        entries.groupby('component', sort=True)
+        .agg(required_qty=('required_qty', 'sum'), device_count=('id', 'nunique'))
+        .reset_index()
+    )
+
+    sub_components['required_qty'] = (
+        pd.to_numeric(sub_components['per_device']).fillna(0).astype(np.int64) * sub_components['id'].map(builds)
+    )
+    sub_totals = (
+        sub_components.groupby(['type', 'part_no'], sort=True)
+        .agg(required_qty=('required_qty', 'sum'), device_count=('id', 'nunique'))
+        .reset_index()
+    )
+
+    return {
+        'components': _records(components),
+        'sub_components': _records(sub_totals),
+        'missing_devices': sorted(set(plan) - set(found_ids.tolist())),
+    }
+
+
+def _records(frame):
+    # numpy integers are not JSON serializable
+    return [
+        {key: value.item() if isinstance(value, np.generic) else value for key, value in row.items()}
+        for row in frame.to_dict('records')
+    ]
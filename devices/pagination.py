@@ -0,0 +1,121 @@
+# devices/pagination.py
+import base64
+import json
+from datetime import datetime
+
+from django.conf import settings
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, _positive_int
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class DeviceCursorPagination(BasePagination):
+    """
+    Keyset pagination over (-created_at, id), the same order as Device.Meta.ordering.
+
+    Each page seeks straight past the last row it returned instead of using OFFSET,
+    so page 1000 costs the same as page 1. Cursors are opaque base64 tokens.
+    The total count is an extra query and can be skipped with ?count=false.
+    """
+    page_size = getattr(settings, 'DEVICE_PAGE_SIZE', 50)
+    max_page_size = getattr(settings, 'DEVICE_MAX_PAGE_SIZE', 500)
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    count_query_param = 'count'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        page_size = self.get_page_size(request)
+        position = self.decode_cursor(request)
+
+        self.count = queryset.count() if self.include_count(request) else None
+
+        if position is None:
+            created_at, pk, reverse = None, None, False
+        else:
+            created_at, pk, reverse = position
+
+        if reverse:
+            # walk backwards: rows that sort *before* the cursor, nearest first
+            queryset = queryset.order_by('created_at', '-id')
+            queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__lt=pk))
+        else:
+            queryset = queryset.order_by('-created_at', 'id')
+            if position is not None:
+                queryset = queryset.filter(Q(created_at__lt=created_at) | Q(created_at=created_at, id__gt=pk))
+
+        # fetch one extra row to know whether another page exists
+        results = list(queryset[:page_size + 1])
+        has_more = len(results) > page_size
+        results = results[:page_size]
+        if reverse:
+            results.reverse()
+
+        self.next_cursor = self.previous_cursor = None
+        if results:
+            if reverse:
+                self.next_cursor = self.encode_cursor(results[-1], reverse=False)
+                if has_more:
+                    self.previous_cursor = self.encode_cursor(results[0], reverse=True)
+            else:
+                if has_more:
+                    self.next_cursor = self.encode_cursor(results[-1], reverse=False)
+                if position is not None:
+                    self.previous_cursor = self.encode_cursor(results[0], reverse=True)
+        return results
+
+    def get_page_size(self, request):
+        try:
+            return _positive_int(
+                request.query_params[self.page_size_query_param],
+                strict=True,
+                cutoff=self.max_page_size
+            )
+        except (KeyError, ValueError):
+            return self.page_size
+
+    def include_count(self, request):
+        return request.query_params.get(self.count_query_param, 'true').lower() not in ('0', 'false', 'no')
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            payload = json.loads(base64.urlsafe_b64decode(encoded.encode('ascii')).decode('utf-8'))
+            return datetime.fromisoformat(payload['t']), int(payload['i']), bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError, UnicodeError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, device, reverse):
+        payload = {'t': device.created_at.isoformat(), 'i': device.pk}
+        if reverse:
+            payload['r'] = 1
+        encoded = base64.urlsafe_b64encode(json.dumps(payload, separators=(',', ':')).encode('utf-8'))
+        return encoded.decode('ascii')
+
+    def get_link(self, cursor):
+        if cursor is None:
+            return None
+        return replace_query_param(self.base_url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self.get_link(self.next_cursor)
+
+    def get_previous_link(self):
+        return self.get_link(self.previous_cursor)
+
+    def get_page_metadata(self):
+        """Keys merged into the view's success envelope next to 'data'."""
+        metadata = {'next': self.get_next_link(), 'previous': self.get_previous_link()}
+        if self.count is not None:
+            metadata['count'] = self.count
+        return metadata
+
+    def get_paginated_response(self, data):
+        return Response({'success': True, 'message': 'Request processed successfully', 'data': data,
+                         **self.get_page_metadata()})
@@ -0,0 +1,209 @@
+# devices/search.py
+"""
+Index-backed device search.
+
+Model, variant, version and the manufacturer's username are copied into a
+`device_search` table that the database can search without scanning
+`devices`:
+
+* SQLite: an FTS5 virtual table (rowid = device id), ranked with bm25().
+* PostgreSQL: a table holding a weighted tsvector (GIN) and the plain text
+  (pg_trgm GIN), ranked by ts_rank plus trigram similarity so typos still match.
+  pg_trgm is a deployment prerequisite: migration 0012 creates it only when the
+  database role may (usually a superuser); otherwise an administrator must run
+  `CREATE EXTENSION pg_trgm;` first.
+
+Other databases fall back to icontains filters. Only active devices are
+indexed. Rows are refreshed by signals on save/delete (see apps.py); bulk
+writes that skip signals must call index_devices() themselves.
+"""
+import re
+
+from django.db import connection as default_connection
+from django.db.models import Q
+
+from accounts.models import User
+from .models import Device
+
+SEARCH_TABLE = 'device_search'
+INDEX_BATCH_SIZE = 500
+TOKEN_RE = re.compile(r'\w+', re.UNICODE)
+
+
+def search_terms(query):
+    """Word tokens of a user query; punctuation and FTS operators are dropped."""
+    return TOKEN_RE.findall(query or '')[:16]
+
+
+def _source_sql(connection):
+    """SELECT of (id, model, variant, version, manufacturer) over active devices; callers append AND filters."""
+    qn = connection.ops.quote_name
+    return (
+        f"SELECT d.{qn('id')}, COALESCE(d.{qn('model')}, ''), COALESCE(d.{qn('variant')}, ''), "
+        f"COALESCE(d.{qn('version')}, ''), COALESCE(u.{qn('username')}, '') "
+        f"FROM {qn(Device._meta.db_table)} d "
+        f"LEFT JOIN {qn(User._meta.db_table)} u ON u.{qn('id')} = d.{qn(Device._meta.get_field('make_id').column)} "
+        f"WHERE d.{qn('status')}"
+    )
+
+
+class BaseSearchBackend:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def index(self, device_ids):
+        pass
+
+    def remove(self, device_ids):
+        pass
+
+    def rebuild(self):
+        pass
+
+    def search(self, query, limit, offset=0):
+        """(ranked device ids for this page, total number of matches)."""
+        raise NotImplementedError
+
+
+class SQLiteFTSBackend(BaseSearchBackend):
+    # bm25 column weights: model, variant, version, manufacturer
+    WEIGHTS = (4.0, 1.0, 1.0, 2.0)
+
+    def match_expression(self, query):
+        # every term must match, each as a quoted prefix so no FTS syntax leaks through
+        return ' '.join(f'"{term}"*' for term in search_terms(query))
+
+    def index(self, device_ids):
+        device_ids = list(device_ids)
+        with self.connection.cursor() as cursor:
+            for start in range(0, len(device_ids), INDEX_BATCH_SIZE):
+                batch = device_ids[start:start + INDEX_BATCH_SIZE]
+                placeholders = ', '.join(['%s'] * len(batch))
+                cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({placeholders})", batch)
+                cursor.execute(
+                    f"INSERT INTO {SEARCH_TABLE} (rowid, model, variant, version, manufacturer) "
+                    f"{_source_sql(self.connection)} AND d.id IN ({placeholders})", batch
+                )
+
+    def remove(self, device_ids):
+        device_ids = list(device_ids)
+        with self.connection.cursor() as cursor:
+            for start in range(0, len(device_ids), INDEX_BATCH_SIZE):
+                batch = device_ids[start:start + INDEX_BATCH_SIZE]
+                cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE rowid IN ({', '.join(['%s'] * len(batch))})", batch)
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE}")
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} (rowid, model, variant, version, manufacturer) {_source_sql(self.connection)}")
+            cursor.execute(f"INSERT INTO {SEARCH_TABLE} ({SEARCH_TABLE}) VALUES ('optimize')")
+
+    def search(self, query, limit, offset=0):
+        expression = self.match_expression(query)
+        if not expression:
+            return [], 0
+        weights = ', '.join(str(weight) for weight in self.WEIGHTS)
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s "
+                f"ORDER BY bm25({SEARCH_TABLE}, {weights}), rowid LIMIT %s OFFSET %s",
+                [expression, limit, offset]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(f"SELECT count(*) FROM {SEARCH_TABLE} WHERE {SEARCH_TABLE} MATCH %s", [expression])
+            total = cursor.fetchone()[0]
+        return ids, total
+
+
+class PostgresSearchBackend(BaseSearchBackend):
+    # tsvector weights: model A, manufacturer B, variant/version C
+    VECTOR_SQL = (
+        "setweight(to_tsvector('simple', src.model), 'A') || "
+        "setweight(to_tsvector('simple', src.manufacturer), 'B') || "
+        "setweight(to_tsvector('simple', src.variant || ' ' || src.version), 'C')"
+    )
+
+    def _insert_sql(self, where=''):
+        return (
+            f"INSERT INTO {SEARCH_TABLE} (device_id, document, vector) "
+            f"SELECT src.id, src.model || ' ' || src.variant || ' ' || src.version || ' ' || src.manufacturer, "
+            f"{self.VECTOR_SQL} FROM ({_source_sql(self.connection)}{where}) AS src (id, model, variant, version, manufacturer)"
+        )
+
+    def tsquery(self, query):
+        return ' & '.join(f'{term}:*' for term in search_terms(query))
+
+    def index(self, device_ids):
+        device_ids = list(device_ids)
+        with self.connection.cursor() as cursor:
+            for start in range(0, len(device_ids), INDEX_BATCH_SIZE):
+                batch = device_ids[start:start + INDEX_BATCH_SIZE]
+                cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE device_id = ANY(%s)", [batch])
+                cursor.execute(self._insert_sql(' AND d.id = ANY(%s)'), [batch])
+
+    def remove(self, device_ids):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {SEARCH_TABLE} WHERE device_id = ANY(%s)", [list(device_ids)])
+
+    def rebuild(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"TRUNCATE {SEARCH_TABLE}")
+            cursor.execute(self._insert_sql())
+
+    def search(self, query, limit, offset=0):
+        tsquery = self.tsquery(query)
+        if not tsquery:
+            return [], 0
+        text = ' '.join(search_terms(query))
+        match = "(vector @@ to_tsquery('simple', %s) OR document %% %s)"
+        with self.connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT device_id FROM {SEARCH_TABLE} WHERE {match} "
+                f"ORDER BY ts_rank(vector, to_tsquery('simple', %s)) + similarity(document, %s) DESC, device_id "
+                f"LIMIT %s OFFSET %s",
+                [tsquery, text, tsquery, text, limit, offset]
+            )
+            ids = [row[0] for row in cursor.fetchall()]
+            cursor.execute(f"SELECT count(*) FROM {SEARCH_TABLE} WHERE {match}", [tsquery, text])
+            total = cursor.fetchone()[0]
+        return ids, total
+
+
+class FallbackSearchBackend(BaseSearchBackend):
+    """No index: icontains on each field, for databases without a supported full-text engine."""
+
+    def search(self, query, limit, offset=0):
+        terms = search_terms(query)
+        if not terms:
+            return [], 0
+        queryset = Device.objects.active()
+        for term in terms:
+            queryset = queryset.filter(
+                Q(model__icontains=term) | Q(variant__icontains=term) | Q(version__icontains=term)
+                | Q(make_id__username__icontains=term)
+            )
+        ids = list(queryset.order_by('-created_at', 'id').values_list('id', flat=True)[offset:offset + limit])
+        return ids, queryset.count()
+
+
+BACKENDS = {
+    'sqlite': SQLiteFTSBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+def get_search_backend(connection=default_connection):
+    return BACKENDS.get(connection.vendor, FallbackSearchBackend)(connection)
+
+
+def index_devices(device_ids):
+    """Refresh the index rows of these devices (inactive ones are dropped)."""
+    get_search_backend().index(device_ids)
+
+
+def remove_devices(device_ids):
+    get_search_backend().remove(device_ids)
+
+
+def search_devices(query, limit, offset=0):
+    return get_search_backend().search(query, limit, offset)
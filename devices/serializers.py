@@ -1,8 +1,19 @@
 # devices/serializers.py
 from rest_framework import serializers
-from .models import Device, BOMEntry, Enclosure, WireHarness, Battery, SOSButton, Sticker
+from .images import InvalidImage, inspect_image
+from .models import Device, BOMEntry, ComponentUsage, Enclosure, WireHarness, Battery, SOSButton, Sticker
 from accounts.models import User
 
+
+def manufacturer_queryset(model, field_name='make'):
+    """
+    Choices for a manufacturer FK: the model field's own limit_choices_to, plus a JOIN
+    of the role, which the validate_make* checks read.
+    """
+    field = model._meta.get_field(field_name)
+    return User.objects.complex_filter(field.get_limit_choices_to()).select_related('role')
+
+
 class ManufacturerSerializer(serializers.ModelSerializer):
     """Serializer for manufacturer dropdown options"""
     display_name = serializers.SerializerMethodField()
@@ -35,6 +46,7 @@ class EnclosureSerializer(serializers.ModelSerializer):
     class Meta:
         model = Enclosure
         exclude = ['device']
+        extra_kwargs = {'make': {'queryset': manufacturer_queryset(Enclosure)}}
     
     def validate_make(self, value):
         if not value.role or value.role.key.lower() != 'manufacturer':
@@ -48,6 +60,7 @@ class WireHarnessSerializer(serializers.ModelSerializer):
     class Meta:
         model = WireHarness
         exclude = ['device']
+        extra_kwargs = {'make': {'queryset': manufacturer_queryset(WireHarness)}}
 
     def validate_make(self, value):
         if not value.role or value.role.key.lower() != 'manufacturer':
@@ -60,6 +73,7 @@ class BatterySerializer(serializers.ModelSerializer):
     class Meta:
         model = Battery
         exclude = ['device']
+        extra_kwargs = {'make': {'queryset': manufacturer_queryset(Battery)}}
     
     def validate_make(self, value):
         if not value.role or value.role.key.lower() != 'manufacturer':
@@ -71,18 +85,32 @@ class SOSButtonSerializer(serializers.ModelSerializer):
     class Meta:
         model = SOSButton
         exclude = ['device']
+        extra_kwargs = {'make': {'queryset': manufacturer_queryset(SOSButton)}}
         
     def validate_make(self, value):
         if not value.role or value.role.key.lower() != 'manufacturer':
             raise serializers.ValidationError("Selected user is not a manufacturer.")
         return value
 
+class StickerImageField(serializers.ImageField):
+    """Image upload checked from its header only; the bitmap is decoded later by the variants job."""
+
+    def to_internal_value(self, data):
+        file_object = serializers.FileField.to_internal_value(self, data)
+        try:
+            inspect_image(file_object)
+        except InvalidImage as e:
+            raise serializers.ValidationError(str(e))
+        return file_object
+
 class StickerSerializer(serializers.ModelSerializer):
     make_name = serializers.CharField(source='make.username', read_only=True)
+    sticker_image = StickerImageField()
 
     class Meta:
         model = Sticker
         exclude = ['device']
+        extra_kwargs = {'make': {'queryset': manufacturer_queryset(Sticker)}}
     
     def validate_make(self, value):
         if not value.role or value.role.key.lower() != 'manufacturer':
@@ -117,6 +145,37 @@ class DeviceSerializer(serializers.ModelSerializer):
             'enclosure', 'wire_harness', 'battery', 'sos_button', 'sticker'
         ]
 
+    # nested relations that can be toggled with ?expand=
+    EXPANDABLE_FIELDS = ('bom_entries', 'enclosure', 'wire_harness', 'battery', 'sos_button', 'sticker')
+
+    @classmethod
+    def resolve_fields(cls, fields=None, expand=None):
+        """
+        Field names to render for a ?fields= / ?expand= selection (None means "not given").
+        ?fields= whitelists top-level fields; ?expand= whitelists the nested relations.
+        """
+        names = list(cls.Meta.fields)
+        if fields is not None:
+            names = [name for name in names if name in fields]
+        if expand is not None:
+            names = [name for name in names if name not in cls.EXPANDABLE_FIELDS or name in expand]
+        return names
+
+    @classmethod
+    def relations_for(cls, names):
+        """The DeviceQuerySet.with_graph() relations needed to render `names`."""
+        relations = {name for name in names if name in cls.EXPANDABLE_FIELDS}
+        if 'manufacturer_name' in names:
+            relations.add('make_id')
+        return relations
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selected = self.context.get('selected_fields')
+        if selected is None:
+            return fields
+        return {name: field for name, field in fields.items() if name in selected}
+
 class DeviceCreateSerializer(serializers.ModelSerializer):
     """Serializer specifically for device creation (Step 1)"""
     class Meta:
@@ -130,6 +189,7 @@ class DeviceCreateSerializer(serializers.ModelSerializer):
             'variant',
             'state_of_supply'
         ]
+        extra_kwargs = {'make_id': {'queryset': manufacturer_queryset(Device, 'make_id')}}
     
     def validate_make_id(self, value):
         if not value.role or value.role.key.lower() != 'manufacturer':
@@ -141,3 +201,20 @@ class DeviceCreateSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("MRP must be greater than 0.")
         return value
 
+
+class ComponentUsageSerializer(serializers.ModelSerializer):
+    manufacturer_name = serializers.CharField(source='manufacturer.username', read_only=True)
+
+    class Meta:
+        model = ComponentUsage
+        fields = [
+            'component',
+            'manufacturer',
+            'manufacturer_name',
+            'state_of_supply',
+            'device_count',
+            'total_ship_qty',
+            'weighted_qty',
+            'updated_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,54 @@
+"""
+Keep derived device data in step with saves and deletes: the search index
+(devices/search.py) and the component usage summary (devices/usage.py).
+"""
+from django.db.models.signals import post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from accounts.models import User
+from .models import Device
+from .search import index_devices, remove_devices
+from .usage import USAGE_DEVICE_FIELDS, apply_usage_delta, device_usage
+
+
+@receiver(post_save, sender=Device, dispatch_uid='devices.index_device')
+def index_saved_device(sender, instance, **kwargs):
+    # soft-deleted devices (status=False) drop out of the index here too
+    index_devices([instance.pk])
+
+
+@receiver(post_delete, sender=Device, dispatch_uid='devices.unindex_device')
+def unindex_deleted_device(sender, instance, **kwargs):
+    remove_devices([instance.pk])
+
+
+@receiver(pre_save, sender=Device, dispatch_uid='devices.usage_before_save')
+def measure_usage_before_save(sender, instance, update_fields=None, **kwargs):
+    # a new device has no BOM yet, so it contributes nothing either way
+    if instance._state.adding or (update_fields is not None and not USAGE_DEVICE_FIELDS & set(update_fields)):
+        return
+    instance._usage_before_save = device_usage([instance.pk])
+
+
+@receiver(post_save, sender=Device, dispatch_uid='devices.usage_after_save')
+def update_usage_after_save(sender, instance, **kwargs):
+    # status, manufacturer, state of supply and quantity all move the device's usage
+    before = instance.__dict__.pop('_usage_before_save', None)
+    if before is not None:
+        apply_usage_delta(before, device_usage([instance.pk]))
+
+
+@receiver(pre_delete, sender=Device, dispatch_uid='devices.usage_before_delete')
+def remove_deleted_device_usage(sender, instance, **kwargs):
+    # runs while the BOM entries still exist, before the cascade removes them
+    apply_usage_delta(device_usage([instance.pk]), {})
+
+
+@receiver(post_save, sender=User, dispatch_uid='devices.reindex_manufacturer')
+def reindex_manufacturer_devices(sender, instance, created, update_fields=None, **kwargs):
+    # the manufacturer's username is indexed; logins only save last_login and are skipped
+    if created or (update_fields is not None and 'username' not in update_fields):
+        return
+    device_ids = list(Device.objects.filter(make_id=instance).values_list('id', flat=True))
+    if device_ids:
+        index_devices(device_ids)
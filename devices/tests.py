@@ -1,3 +1,996 @@
-from django.test import TestCase
+import hashlib
+import io
+import json
+import os
+import shutil
+import tempfile
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import pandas as pd
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from openpyxl import Workbook, load_workbook
+from PIL import Image
+from rest_framework.test import APIClient
+
+from accounts.models import Role, User
+from filestore.models import StoredBlob, UploadSession
+from jobs.models import Job
+from jobs.runner import run_pending
+from .bom import sync_bom
+from .importers import BOMValidationError, iter_bom_frames, iter_valid_rows
+from .models import Device, BOMEntry, ComponentUsage, Enclosure, WireHarness, Battery, SOSButton, Sticker
+from .serializers import BatterySerializer, DeviceCreateSerializer
+from .usage import rebuild_component_usage
+
+BOM_HEADERS = ['IDENTIFICATION MARK', 'COMPONENTS REQUIRED', 'Designator', 'SHIP QTY', 'FP CROSS CHECKED']
+
+
+def xlsx_upload(rows, name='bom.xlsx'):
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(BOM_HEADERS)
+    for row in rows:
+        sheet.append(row)
+    output = io.BytesIO()
+    workbook.save(output)
+    return SimpleUploadedFile(name, output.getvalue())
+
+
+def csv_upload(rows, name='bom.csv'):
+    lines = [','.join(BOM_HEADERS)] + [','.join(str(value) for value in row) for row in rows]
+    return SimpleUploadedFile(name, ('\n'.join(lines) + '\n').encode('utf-8-sig'))
+
+
+class DeviceTestMixin:
+    """Builds a manufacturer and fully populated devices for the API tests."""
+
+    def setUp(self):
+        self.role = Role.objects.create(key='manufacturer', name='Manufacturer')
+        self.manufacturer = User.objects.create_user(
+            phone_number='9000000001', username='maker', password='MakerPass123', role=self.role
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.manufacturer)
+
+    def make_device(self, bom_rows=3, components=True, **kwargs):
+        fields = {
+            'make_id': self.manufacturer,
+            'model': 'Tracker',
+            'mrp': Decimal('1999.00'),
+            'unit_of_measure': 'PCS',
+            'state_of_supply': 'FINISHED_GOODS',
+            'quantity': 10,
+        }
+        fields.update(kwargs)
+        device = Device.objects.create(**fields)
+        BOMEntry.objects.bulk_create([
+            BOMEntry(device=device, designator=f'R{i}', components_required=f'Resistor {i}', ship_qty=i + 1)
+            for i in range(bom_rows)
+        ])
+        if components:
+            make = self.manufacturer
+            Enclosure.objects.create(
+                device=device, make=make, part_no='EN-1', length=10, breadth=10, height=5,
+                color='Black', material='ABS', quantity=1,
+            )
+            WireHarness.objects.create(
+                device=device, make=make, part_no='WH-1', no_of_wires=4, color='Red', length=100,
+                no_of_connectors=2, pin_type='4 Pin',
+            )
+            Battery.objects.create(
+                device=device, make=make, part_no='BT-1', capacity='850 mAh', length=30, breadth=20, height=5,
+            )
+            SOSButton.objects.create(device=device, make=make, part_no='SOS-1', total_length=50, quantity_per_set=1)
+            Sticker.objects.create(
+                device=device, make=make, name='Front', part_no='ST-1', length=20, breadth=10, quantity=2,
+                sticker_image='devices/stickers/front.png',
+            )
+        return device
+
+
+class MediaRootMixin:
+    """Point MEDIA_ROOT at a throwaway directory for tests that store files."""
+
+    def setUp(self):
+        super().setUp()
+        self.media_root = tempfile.mkdtemp()
+        self.media_override = override_settings(
+            MEDIA_ROOT=self.media_root, UPLOAD_SESSION_ROOT=os.path.join(self.media_root, 'sessions')
+        )
+        self.media_override.enable()
+
+    def tearDown(self):
+        self.media_override.disable()
+        shutil.rmtree(self.media_root, ignore_errors=True)
+        super().tearDown()
+
+
+class DeviceQueryBudgetTests(DeviceTestMixin, TestCase):
+    """Pin the number of queries per endpoint so N+1 regressions are caught."""
+
+    def test_list_query_count_is_constant(self):
+        for _ in range(5):
+            self.make_device()
+        # count, devices + joined manufacturer/sub-components, then BOM prefetch; the ETag is hashed from the page
+        with self.assertNumQueries(3):
+            resp = self.client.get('/api/devices/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(len(resp.data['data']), 5)
+
+        for _ in range(5):
+            self.make_device()
+        with self.assertNumQueries(3):
+            resp = self.client.get('/api/devices/')
+        self.assertEqual(len(resp.data['data']), 10)
+
+    def test_list_without_count_skips_count_query(self):
+        self.make_device()
+        with self.assertNumQueries(2):
+            resp = self.client.get('/api/devices/?count=false')
+        self.assertNotIn('count', resp.data)
+
+    def test_list_serializes_missing_components_as_null(self):
+        self.make_device(components=False)
+        resp = self.client.get('/api/devices/')
+        item = resp.data['data'][0]
+        self.assertIsNone(item['enclosure'])
+        self.assertIsNone(item['sticker'])
+        self.assertEqual(len(item['bom_entries']), 3)
+
+    def test_retrieve_query_count(self):
+        device = self.make_device(bom_rows=20)
+        with self.assertNumQueries(3):
+            resp = self.client.get(f'/api/devices/{device.pk}/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['data']['enclosure']['make_name'], 'maker')
+        self.assertEqual(len(resp.data['data']['bom_entries']), 20)
+
+    def test_add_component_query_count_is_independent_of_bom_size(self):
+        small = self.make_device(bom_rows=1, components=False)
+        large = self.make_device(bom_rows=50, components=False)
+        payload = {'make': self.manufacturer.pk, 'part_no': 'BT-2', 'capacity': '2000 mAh',
+                   'length': 40, 'breadth': 20, 'height': 6}
+
+        with self.assertNumQueries(11) as small_ctx:
+            self.client.post(f'/api/devices/{small.pk}/add-battery/', payload, format='json')
+        with self.assertNumQueries(len(small_ctx.captured_queries)):
+            resp = self.client.post(f'/api/devices/{large.pk}/add-battery/', payload, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['data']['battery']['part_no'], 'BT-2')
+
+
+class DevicePaginationTests(DeviceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.devices = [self.make_device(bom_rows=0, components=False, model=f'M{i}') for i in range(7)]
+        # force a tie on created_at so the id tiebreaker is exercised
+        tied = self.devices[2].created_at
+        Device.objects.filter(pk__in=[self.devices[3].pk, self.devices[4].pk]).update(created_at=tied)
+
+    def expected_order(self):
+        return list(Device.objects.order_by('-created_at', 'id').values_list('id', flat=True))
+
+    def walk(self, url, key):
+        ids = []
+        while url:
+            resp = self.client.get(url)
+            self.assertEqual(resp.status_code, 200)
+            ids.extend(item['id'] for item in resp.data['data'])
+            url = resp.data[key]
+        return ids, resp
+
+    def test_forward_walk_visits_every_device_once_in_order(self):
+        ids, last = self.walk('/api/devices/?page_size=3', 'next')
+        self.assertEqual(ids, self.expected_order())
+        self.assertEqual(last.data['count'], 7)
+
+    def test_previous_links_walk_back_to_first_page(self):
+        resp = self.client.get('/api/devices/?page_size=3')
+        self.assertIsNone(resp.data['previous'])
+        second = self.client.get(resp.data['next'])
+        third = self.client.get(second.data['next'])
+        back = self.client.get(third.data['previous'])
+        self.assertEqual([d['id'] for d in back.data['data']], [d['id'] for d in second.data['data']])
+        first = self.client.get(back.data['previous'])
+        self.assertEqual([d['id'] for d in first.data['data']], [d['id'] for d in resp.data['data']])
+        self.assertIsNone(first.data['previous'])
+
+    def test_invalid_cursor_returns_404(self):
+        resp = self.client.get('/api/devices/?cursor=not-a-cursor')
+        self.assertEqual(resp.status_code, 404)
+
+
+class DeviceFieldSelectionTests(DeviceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.device = self.make_device()
+
+    def test_fields_limits_payload_and_skips_nested_queries(self):
+        with self.assertNumQueries(1):
+            resp = self.client.get('/api/devices/?fields=id,model,manufacturer_name&count=false')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(set(resp.data['data'][0]), {'id', 'model', 'manufacturer_name'})
+
+    def test_expand_limits_nested_relations(self):
+        with self.assertNumQueries(3):
+            resp = self.client.get(f'/api/devices/{self.device.pk}/?expand=bom_entries')
+        data = resp.data['data']
+        self.assertIn('bom_entries', data)
+        self.assertIn('model', data)
+        for name in ('enclosure', 'wire_harness', 'battery', 'sos_button', 'sticker'):
+            self.assertNotIn(name, data)
+
+    def test_empty_expand_drops_all_nested_relations(self):
+        resp = self.client.get(f'/api/devices/{self.device.pk}/?expand=')
+        self.assertNotIn('bom_entries', resp.data['data'])
+        self.assertNotIn('sticker', resp.data['data'])
+
+    def test_unknown_field_is_rejected(self):
+        resp = self.client.get('/api/devices/?fields=id,bogus')
+        self.assertEqual(resp.status_code, 400)
+
+    def test_unknown_field_on_a_write_is_rejected_before_saving(self):
+        url = f'/api/devices/{self.device.pk}/add-bom/?fields=id,bogus'
+        resp = self.client.post(url, {
+            'bom_upload_type': 'Individual entry', 'quantity': 99,
+            'manual_entries': [{'designator': 'C1', 'components_required': 'Capacitor', 'ship_qty': 1}],
+        }, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.device.refresh_from_db()
+        self.assertEqual(self.device.quantity, 10)
+        self.assertFalse(self.device.bom_entries.filter(designator='C1').exists())
+
+        resp = self.client.post('/api/devices/?expand=bogus', {'model': 'Other'}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Device.objects.filter(model='Other').exists())
+
+
+class BOMImportTests(MediaRootMixin, DeviceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.device = self.make_device(bom_rows=2, components=False)
+
+    def upload(self, bom_file):
+        return self.client.post(
+            f'/api/devices/{self.device.pk}/add-bom/',
+            {'bom_upload_type': 'Bulk upload', 'bom_file': bom_file},
+            format='multipart',
+        )
+
+    def test_xlsx_upload_replaces_bom(self):
+        resp = self.upload(xlsx_upload([['U1', 'MCU', 'U1', 1, 'Yes'], ['C1', 'Capacitor', 'C1', 4, None]]))
+        self.assertEqual(resp.status_code, 201)
+        entries = list(self.device.bom_entries.order_by('id').values_list('designator', 'ship_qty'))
+        self.assertEqual(entries, [('U1', 1), ('C1', 4)])
+
+    def test_bulk_upload_accepts_chunked_upload_session(self):
+        content = csv_upload([['U1', 'MCU', 'U1', 1, 'Yes']]).read()
+        session = UploadSession.objects.create(filename='bom.csv', size=len(content), created_by=self.manufacturer)
+        for offset in range(0, len(content), 16):
+            session.append(offset, io.BytesIO(content[offset:offset + 16]))
+        session.finalize(hashlib.sha256(content).hexdigest())
+
+        resp = self.client.post(
+            f'/api/devices/{self.device.pk}/add-bom/',
+            {'bom_upload_type': 'Bulk upload', 'bom_upload_id': str(session.pk)},
+            format='json',
+        )
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(self.device.bom_entries.get().designator, 'U1')
+        self.assertFalse(os.path.exists(session.path))
+
+    def test_failed_import_of_chunked_upload_releases_the_file(self):
+        content = csv_upload([['R1', 'Resistor', 'R1', 'ten', 'No']]).read()
+        session = UploadSession.objects.create(filename='bom.csv', size=len(content), created_by=self.manufacturer)
+        session.append(0, io.BytesIO(content))
+        session.finalize(hashlib.sha256(content).hexdigest())
+
+        opened = []
+        real_open = UploadSession.open
+
+        def tracking_open(upload_session):
+            opened.append(real_open(upload_session))
+            return opened[-1]
+
+        with mock.patch.object(UploadSession, 'open', tracking_open):
+            resp = self.client.post(
+                f'/api/devices/{self.device.pk}/add-bom/',
+                {'bom_upload_type': 'Bulk upload', 'bom_upload_id': str(session.pk)},
+                format='json',
+            )
+        self.assertEqual(resp.status_code, 400)
+        self.assertTrue(opened[0].closed)
+        self.assertFalse(os.path.exists(session.path))
+
+    def test_unknown_upload_session_is_rejected(self):
+        resp = self.client.post(
+            f'/api/devices/{self.device.pk}/add-bom/',
+            {'bom_upload_type': 'Bulk upload', 'bom_upload_id': 'not-a-session'},
+            format='json',
+        )
+        self.assertEqual(resp.status_code, 400)
+
+    def test_csv_upload_skips_blank_rows(self):
+        resp = self.upload(csv_upload([['R1', 'Resistor', 'R1', 10, 'No'], ['', '', '', '', '']]))
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(self.device.bom_entries.get().components_required, 'Resistor')
+
+    def test_invalid_rows_are_reported_and_keep_previous_bom(self):
+        resp = self.upload(csv_upload([
+            ['R1', 'Resistor', 'R1', 'ten', 'No'],
+            ['R2', 'Resistor', 'R2', 3, 'No'],
+            ['R3', 'Resistor', 'R3', -1, 'No'],
+            ['R4', 'Resistor', 'R4', 2.5, 'No'],
+        ]))
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.data['errors'], {
+            'invalid_rows': 3,
+            'errors': [
+                {'column': 'ship_qty', 'message': 'must be a number', 'count': 1, 'rows': [2]},
+                {'column': 'ship_qty', 'message': 'must be a whole number >= 0', 'count': 2, 'rows': [4, 5]},
+            ],
+        })
+        self.assertEqual(self.device.bom_entries.count(), 2)
+
+    def test_errors_in_later_chunks_are_reported(self):
+        rows = [[f'R{i}', 'Resistor', f'R{i}', 1, ''] for i in range(5)] + [['X', 'Bad', 'X', 'x', '']]
+        with self.assertRaises(BOMValidationError) as ctx:
+            sync_bom(self.device, iter_valid_rows(iter_bom_frames(csv_upload(rows), 2)), batch_size=2)
+        self.assertEqual(ctx.exception.report['errors'][0]['rows'], [7])
+        self.assertEqual(self.device.bom_entries.count(), 2)
+
+    def test_parquet_upload_is_imported(self):
+        frame = pd.DataFrame([[f'R{i}', 'Resistor', f'R{i}', i + 1, 'Yes'] for i in range(5)], columns=BOM_HEADERS)
+        buffer = io.BytesIO()
+        frame.to_parquet(buffer, index=False, row_group_size=2)
+        resp = self.upload(SimpleUploadedFile('bom.parquet', buffer.getvalue()))
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(
+            sorted(self.device.bom_entries.values_list('designator', 'ship_qty', 'fp_cross_checked')),
+            [(f'R{i}', i + 1, 'Yes') for i in range(5)],
+        )
+
+    def test_import_inserts_in_bounded_batches(self):
+        rows = [[f'R{i}', 'Resistor', f'R{i}', 1, ''] for i in range(5)]
+        with CaptureQueriesContext(connection) as queries:
+            changes = sync_bom(self.device, iter_valid_rows(iter_bom_frames(csv_upload(rows), 2)), batch_size=2)
+        self.assertEqual(changes['created'], 5)
+        inserts = [q for q in queries.captured_queries if q['sql'].startswith('INSERT INTO "device_bom_entries"')]
+        self.assertEqual(len(inserts), 3)
+
+    def test_new_rows_follow_matched_rows_in_upload_order(self):
+        kept = self.device.bom_entries.order_by('created_at', 'id').first()
+        self.upload(csv_upload([
+            ['N2', 'Capacitor', 'N2', 1, ''],
+            ['', kept.components_required, kept.designator, kept.ship_qty, ''],
+            ['N1', 'Capacitor', 'N1', 1, ''],
+        ]))
+        entries = self.device.bom_entries.order_by('created_at', 'id')
+        self.assertEqual(list(entries.values_list('designator', flat=True)), [kept.designator, 'N2', 'N1'])
+        self.assertEqual(entries.first().pk, kept.pk)
+
+    def test_unsupported_extension_is_rejected(self):
+        self.assertEqual(self.upload(SimpleUploadedFile('bom.txt', b'x')).status_code, 400)
+        self.assertEqual(self.device.bom_entries.count(), 2)
+
+
+class AsyncBOMImportTests(MediaRootMixin, DeviceTestMixin, TestCase):
+
+    def test_async_upload_returns_job_and_worker_imports_rows(self):
+        device = self.make_device(bom_rows=1, components=False)
+        resp = self.client.post(
+            f'/api/devices/{device.pk}/add-bom/?async=true',
+            {'bom_upload_type': 'Bulk upload', 'bom_file': xlsx_upload([['U1', 'MCU', 'U1', 2, 'Yes']])},
+            format='multipart',
+        )
+        self.assertEqual(resp.status_code, 202)
+        job_id = resp.data['data']['id']
+        self.assertEqual(device.bom_entries.count(), 1)
+
+        run_pending()
+        job = Job.objects.get(pk=job_id)
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {'device_id': device.pk, 'created': 1, 'updated': 0, 'deleted': 1, 'unchanged': 0})
+        self.assertEqual(device.bom_entries.get().designator, 'U1')
+
+    def test_invalid_file_fails_job_without_retry(self):
+        device = self.make_device(bom_rows=1, components=False)
+        resp = self.client.post(
+            f'/api/devices/{device.pk}/add-bom/?async=true',
+            {'bom_upload_type': 'Bulk upload', 'bom_file': csv_upload([['U1', 'MCU', 'U1', -1, '']])},
+            format='multipart',
+        )
+        run_pending()
+        job = Job.objects.get(pk=resp.data['data']['id'])
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertEqual(job.result['errors']['errors'][0]['rows'], [2])
+        self.assertEqual(device.bom_entries.count(), 1)
+
+
+class BOMSyncTests(DeviceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.device = self.make_device(bom_rows=3, components=False)  # R0..R2, ship_qty 1..3
+
+    def post_manual(self, entries):
+        return self.client.post(
+            f'/api/devices/{self.device.pk}/add-bom/',
+            {'bom_upload_type': 'Individual entry', 'manual_entries': entries},
+            format='json',
+        )
+
+    def test_only_changed_rows_are_written(self):
+        before = dict(self.device.bom_entries.values_list('designator', 'id'))
+        resp = self.post_manual([
+            {'designator': 'R0', 'components_required': 'Resistor 0', 'ship_qty': 1},
+            {'designator': 'R1', 'components_required': 'Resistor 1', 'ship_qty': 5},
+            {'designator': 'C1', 'components_required': 'Capacitor', 'ship_qty': 2},
+        ])
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['changes'], {'created': 1, 'updated': 1, 'deleted': 1, 'unchanged': 1})
+
+        after = dict(self.device.bom_entries.values_list('designator', 'id'))
+        self.assertEqual(set(after), {'R0', 'R1', 'C1'})
+        # matched rows keep their primary keys
+        self.assertEqual(after['R0'], before['R0'])
+        self.assertEqual(after['R1'], before['R1'])
+        self.assertEqual(self.device.bom_entries.get(designator='R1').ship_qty, 5)
+
+    def test_resubmitting_same_bom_writes_nothing(self):
+        entries = [
+            {'designator': f'R{i}', 'components_required': f'Resistor {i}', 'ship_qty': i + 1} for i in range(3)
+        ]
+        resp = self.post_manual(entries)
+        self.assertEqual(resp.data['changes'], {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 3})
+
+
+class BOMExportTests(MediaRootMixin, DeviceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.device = self.make_device(bom_rows=3, components=False, model='Alpha')
+        self.other = self.make_device(bom_rows=2, components=False, model='Beta')
+        self.deleted = self.make_device(bom_rows=4, components=False, model='Gone', status=False)
+
+    def test_device_csv_export_streams_template_layout(self):
+        resp = self.client.get(f'/api/devices/{self.device.pk}/export-bom/?file_format=csv')
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.streaming)
+        lines = b''.join(resp.streaming_content).decode().splitlines()
+        self.assertEqual(lines[0], ','.join(BOM_HEADERS))
+        self.assertEqual(lines[1:], [',Resistor 0,R0,1,', ',Resistor 1,R1,2,', ',Resistor 2,R2,3,'])
+
+    def test_exported_csv_reimports_without_changes(self):
+        resp = self.client.get(f'/api/devices/{self.device.pk}/export-bom/')
+        exported = SimpleUploadedFile('bom.csv', b''.join(resp.streaming_content))
+        resp = self.client.post(
+            f'/api/devices/{self.device.pk}/add-bom/',
+            {'bom_upload_type': 'Bulk upload', 'bom_file': exported},
+            format='multipart',
+        )
+        self.assertEqual(resp.data['changes'], {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 3})
+
+    def test_catalogue_xlsx_export_covers_active_devices(self):
+        resp = self.client.get('/api/devices/export-bom/?file_format=xlsx')
+        self.assertEqual(resp.status_code, 200)
+        sheet = load_workbook(io.BytesIO(b''.join(resp.streaming_content)), read_only=True).active
+        rows = list(sheet.iter_rows(values_only=True))
+        self.assertEqual(rows[0][:2], ('DEVICE ID', 'MODEL'))
+        self.assertEqual(sorted({row[1] for row in rows[1:]}), ['Alpha', 'Beta'])
+        self.assertEqual(len(rows) - 1, 5)
+
+    def test_unknown_format_is_rejected(self):
+        resp = self.client.get('/api/devices/export-bom/?file_format=pdf')
+        self.assertEqual(resp.status_code, 400)
+
+    def test_async_catalogue_export_writes_result_file(self):
+        resp = self.client.get('/api/devices/export-bom/?async=true')
+        self.assertEqual(resp.status_code, 202)
+        run_pending()
+        job = Job.objects.get(pk=resp.data['data']['id'])
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        with job.result_file.open('rb') as result:
+            self.assertEqual(len(result.read().decode().splitlines()), 6)
+
+
+class DeviceConditionalGetTests(DeviceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.device = self.make_device()
+
+    def test_unchanged_detail_returns_304_without_serializing(self):
+        url = f'/api/devices/{self.device.pk}/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(1):
+            resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 304)
+        self.assertEqual(resp['ETag'], etag)
+
+    def test_if_modified_since_on_detail(self):
+        url = f'/api/devices/{self.device.pk}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_bom_write_changes_detail_etag(self):
+        url = f'/api/devices/{self.device.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.client.post(
+            f'/api/devices/{self.device.pk}/add-bom/',
+            {'bom_upload_type': 'Individual entry', 'manual_entries': [{'designator': 'U9', 'ship_qty': 1}]},
+            format='json',
+        )
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_list_etag_tracks_deletions_and_query(self):
+        other = self.make_device()
+        etag = self.client.get('/api/devices/')['ETag']
+        self.assertEqual(self.client.get('/api/devices/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.client.get('/api/devices/?fields=id', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+        self.client.delete(f'/api/devices/{other.pk}/')
+        self.assertEqual(self.client.get('/api/devices/', HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_manufacturer_rename_changes_etags(self):
+        url = f'/api/devices/{self.device.pk}/'
+        detail_etag = self.client.get(url)['ETag']
+        list_etag = self.client.get('/api/devices/')['ETag']
+
+        self.manufacturer.username = 'maker-renamed'
+        self.manufacturer.save()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=detail_etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['data']['manufacturer_name'], 'maker-renamed')
+        resp = self.client.get('/api/devices/', HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(resp.status_code, 200)
+
+    def test_component_make_rename_changes_detail_etag(self):
+        url = f'/api/devices/{self.device.pk}/'
+        other = User.objects.create_user(phone_number='9000000002', username='supplier', password='SupplierPass123')
+        Battery.objects.filter(device=self.device).update(make=other)
+        etag = self.client.get(url)['ETag']
+
+        other.username = 'supplier-renamed'
+        other.save()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['data']['battery']['make_name'], 'supplier-renamed')
+
+    def test_missing_device_is_still_404(self):
+        self.assertEqual(self.client.get('/api/devices/999999/', HTTP_IF_NONE_MATCH='"x"').status_code, 404)
+
+
+class DeviceComponentsTests(MediaRootMixin, DeviceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.device = self.make_device(bom_rows=2, components=False)
+        self.url = f'/api/devices/{self.device.pk}/components/'
+        make = self.manufacturer.pk
+        self.battery = {'make': make, 'part_no': 'BT-9', 'capacity': '900 mAh', 'length': 30, 'breadth': 20, 'height': 5}
+        self.enclosure = {'make': make, 'part_no': 'EN-9', 'length': 10, 'breadth': 10, 'height': 5,
+                          'color': 'Grey', 'material': 'ABS', 'quantity': 1}
+
+    def test_saves_several_components_in_one_request(self):
+        resp = self.client.post(self.url, {'battery': self.battery, 'enclosure': self.enclosure}, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['changes'], {'enclosure': 'created', 'battery': 'created'})
+        self.assertEqual(resp.data['data']['battery']['part_no'], 'BT-9')
+        self.assertEqual(resp.data['data']['enclosure']['part_no'], 'EN-9')
+
+        self.battery['part_no'] = 'BT-10'
+        resp = self.client.post(self.url, {'battery': self.battery}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['changes'], {'battery': 'updated'})
+
+        # one new component is enough for a 201
+        resp = self.client.post(self.url, {'battery': self.battery, 'enclosure': self.enclosure}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        sos = {'make': self.manufacturer.pk, 'part_no': 'SOS-9', 'total_length': 50, 'quantity_per_set': 1}
+        resp = self.client.post(self.url, {'battery': self.battery, 'sos_button': sos}, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp.data['changes'], {'battery': 'updated', 'sos_button': 'created'})
+
+    def test_one_invalid_component_writes_nothing(self):
+        enclosure = dict(self.enclosure, quantity=-1)
+        resp = self.client.post(self.url, {'battery': self.battery, 'enclosure': enclosure}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('enclosure', resp.data['errors'])
+        self.assertFalse(Battery.objects.filter(device=self.device).exists())
+
+    def test_multipart_with_sticker_image(self):
+        image = io.BytesIO()
+        Image.new('RGB', (4, 4), 'red').save(image, format='PNG')
+        sticker = {'make': self.manufacturer.pk, 'name': 'Back', 'part_no': 'ST-9', 'length': 20, 'breadth': 10, 'quantity': 1}
+        resp = self.client.post(self.url, {
+            'sticker': json.dumps(sticker),
+            'battery': json.dumps(self.battery),
+            'sticker_image': SimpleUploadedFile('sticker.png', image.getvalue(), content_type='image/png'),
+        }, format='multipart')
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(resp.data['changes'], {'battery': 'created', 'sticker': 'created'})
+        self.assertTrue(Sticker.objects.get(device=self.device).sticker_image.name.endswith('.png'))
+
+    def test_empty_request_is_rejected(self):
+        self.assertEqual(self.client.post(self.url, {}, format='json').status_code, 400)
+
+    def test_make_choices_keep_the_manufacturer_restriction(self):
+        seller = User.objects.create_user(
+            phone_number='9000000003', username='seller', password='SellerPass123',
+            role=Role.objects.create(key='sales', name='Sales'),
+        )
+        for serializer_class in (BatterySerializer, DeviceCreateSerializer):
+            name = 'make_id' if serializer_class is DeviceCreateSerializer else 'make'
+            choices = serializer_class().fields[name].get_queryset()
+            self.assertIn(self.manufacturer, choices)
+            self.assertNotIn(seller, choices)
+
+        resp = self.client.post(self.url, {'battery': dict(self.battery, make=seller.pk)}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(Battery.objects.filter(device=self.device).exists())
+
+    def test_list_body_is_rejected(self):
+        resp = self.client.post(self.url, [self.battery], format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertFalse(resp.data['success'])
+
+    def test_minimal_response_returns_only_written_components(self):
+        resp = self.client.post(self.url + '?response=minimal', {'battery': self.battery}, format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual(resp['Preference-Applied'], 'return=minimal')
+        self.assertEqual(set(resp.data['data']), {'device_id', 'updated_at', 'battery'})
+
+
+class MinimalResponseTests(DeviceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.device = self.make_device(bom_rows=50, components=False)
+        self.url = f'/api/devices/{self.device.pk}/add-battery/'
+        self.payload = {'make': self.manufacturer.pk, 'part_no': 'BT-3', 'capacity': '1000 mAh',
+                        'length': 40, 'breadth': 20, 'height': 6}
+
+    def test_prefer_header_skips_device_reload(self):
+        with self.assertNumQueries(9):
+            resp = self.client.post(self.url, self.payload, format='json', HTTP_PREFER='return=minimal')
+        self.assertEqual(resp.status_code, 201)
+        data = resp.data['data']
+        self.assertEqual(data['device_id'], self.device.pk)
+        self.assertEqual(data['battery']['part_no'], 'BT-3')
+        self.assertNotIn('bom_entries', data)
+
+        self.device.refresh_from_db()
+        self.assertEqual(data['updated_at'], self.device.updated_at.isoformat().replace('+00:00', 'Z'))
+
+    def test_version_stamp_matches_full_response(self):
+        minimal = self.client.post(self.url + '?response=minimal', self.payload, format='json')
+        full = self.client.get(f'/api/devices/{self.device.pk}/')
+        self.assertEqual(minimal.data['data']['updated_at'], full.data['data']['updated_at'])
+
+    def test_default_response_is_unchanged(self):
+        resp = self.client.post(self.url, self.payload, format='json')
+        self.assertIn('bom_entries', resp.data['data'])
+        self.assertNotIn('Preference-Applied', resp)
+
+
+def image_upload(name='sticker.jpg', size=(2000, 1000), image_format='JPEG', color='blue'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, format=image_format)
+    return SimpleUploadedFile(name, buffer.getvalue(), content_type=f'image/{image_format.lower()}')
+
+
+class StickerImageTests(MediaRootMixin, DeviceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.device = self.make_device(bom_rows=1, components=False)
+        self.url = f'/api/devices/{self.device.pk}/add-sticker/'
+
+    def post_sticker(self, image):
+        return self.client.post(self.url, {
+            'make': self.manufacturer.pk, 'name': 'Front', 'part_no': 'ST-1',
+            'length': 20, 'breadth': 10, 'quantity': 1, 'sticker_image': image,
+        }, format='multipart')
+
+    def test_variants_are_generated_by_job(self):
+        resp = self.post_sticker(image_upload())
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(resp.data['data']['sticker']['sticker_thumbnail'], None)
+        job = Job.objects.get(kind='devices.sticker_variants')
+
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED, job.error)
+        sticker = Sticker.objects.get(device=self.device)
+        with sticker.sticker_thumbnail.open('rb') as thumb, Image.open(thumb) as image:
+            self.assertEqual(image.format, 'WEBP')
+            self.assertEqual(image.size, (256, 128))
+        with sticker.sticker_webp.open('rb') as webp, Image.open(webp) as image:
+            self.assertLessEqual(max(image.size), 1600)
+
+        data = self.client.get(f'/api/devices/{self.device.pk}/').data['data']['sticker']
+        self.assertTrue(data['sticker_thumbnail'].endswith('_thumb.webp'))
+        self.assertTrue(data['sticker_webp'].endswith('_full.webp'))
+
+    def test_variants_change_the_device_etag(self):
+        self.post_sticker(image_upload())
+        url = f'/api/devices/{self.device.pk}/'
+        etag = self.client.get(url)['ETag']
+
+        run_pending()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertTrue(resp.data['data']['sticker']['sticker_thumbnail'].endswith('_thumb.webp'))
+
+    def test_replacing_image_clears_old_variants(self):
+        self.post_sticker(image_upload())
+        run_pending()
+        old = Sticker.objects.get(device=self.device).sticker_thumbnail
+        old_path = old.path
+
+        self.post_sticker(image_upload('second.png', image_format='PNG', color='red'))
+        sticker = Sticker.objects.get(device=self.device)
+        self.assertEqual(sticker.sticker_thumbnail.name, '')
+        run_pending()
+        sticker.refresh_from_db()
+        self.assertTrue(sticker.sticker_thumbnail.name)
+        self.assertNotEqual(sticker.sticker_thumbnail.name, old.name)
+        self.assertFalse(os.path.exists(old_path))
+
+    def test_non_image_is_rejected_from_header(self):
+        resp = self.post_sticker(SimpleUploadedFile('sticker.png', b'not an image', content_type='image/png'))
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('sticker_image', resp.data['errors'])
+
+    def test_oversized_image_is_rejected_without_decoding(self):
+        with mock.patch('devices.images.STICKER_MAX_PIXELS', 100):
+            resp = self.post_sticker(image_upload(size=(20, 20)))
+        self.assertEqual(resp.status_code, 400)
+        self.assertIn('too large', str(resp.data['errors']['sticker_image']))
+
+
+class DeviceSearchTests(DeviceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.gps = self.make_device(bom_rows=0, components=False, model='GPS Tracker', variant='Fleet')
+        self.panic = self.make_device(bom_rows=0, components=False, model='Panic Button', variant='Tracker add-on')
+        self.other = self.make_device(bom_rows=0, components=False, model='Beacon', variant='Indoor')
+
+    def search(self, query, **params):
+        return self.client.get('/api/devices/', {'q': query, **params})
+
+    def test_results_are_ranked_by_field_weight(self):
+        resp = self.search('track')
+        self.assertEqual(resp.status_code, 200)
+        # a model match outranks a variant match
+        self.assertEqual([d['id'] for d in resp.data['data']], [self.gps.pk, self.panic.pk])
+        self.assertEqual(resp.data['count'], 2)
+
+    def test_all_terms_must_match_and_operators_are_ignored(self):
+        self.assertEqual([d['id'] for d in self.search('gps fleet').data['data']], [self.gps.pk])
+        self.assertEqual(self.search('"beacon" (*').data['count'], 1)
+        self.assertEqual(self.search('maker').data['count'], 3)
+
+    def test_index_follows_saves_and_soft_deletes(self):
+        self.other.model = 'Beacon Tracker'
+        self.other.save()
+        self.assertEqual(self.search('tracker').data['count'], 3)
+
+        self.client.delete(f'/api/devices/{self.gps.pk}/')
+        self.assertNotIn(self.gps.pk, [d['id'] for d in self.search('tracker').data['data']])
+
+        self.manufacturer.username = 'acme'
+        self.manufacturer.save()
+        self.assertEqual(self.search('acme').data['count'], 2)
+
+    def test_offset_paging(self):
+        resp = self.search('tracker', page_size=1)
+        self.assertEqual(len(resp.data['data']), 1)
+        self.assertIn('offset=1', resp.data['next'])
+        resp = self.client.get(resp.data['next'])
+        self.assertEqual(resp.data['data'][0]['id'], self.panic.pk)
+        self.assertIsNone(resp.data['next'])
+
+    def test_rebuild_command(self):
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM device_search')
+        call_command('rebuild_device_search', stdout=io.StringIO())
+        self.assertEqual(self.search('beacon').data['count'], 1)
+
+
+class DeviceBatchTests(DeviceTestMixin, TestCase):
+    url = '/api/devices/batch/'
+
+    def item(self, **kwargs):
+        item = {'make_id': self.manufacturer.pk, 'model': 'Batch', 'mrp': '999.00',
+                'unit_of_measure': 'PCS', 'state_of_supply': 'FINISHED_GOODS'}
+        item.update(kwargs)
+        return item
+
+    def test_creates_and_updates_with_constant_queries(self):
+        existing = self.make_device(bom_rows=0, components=False)
+        small = [self.item(model='A'), {'id': existing.pk, 'mrp': '1500.00'}]
+        large = [self.item(model=f'Model {i}') for i in range(50)] + [{'id': existing.pk, 'variant': 'X'}]
+
+        with self.assertNumQueries(8) as ctx:
+            resp = self.client.post(self.url, small, format='json')
+        self.assertEqual(resp.status_code, 201, resp.data)
+        self.assertEqual(resp.data['data']['created'], 1)
+        self.assertEqual(resp.data['data']['results'][1], {'index': 1, 'status': 'updated', 'id': existing.pk})
+        existing.refresh_from_db()
+        self.assertEqual(existing.mrp, Decimal('1500.00'))
+
+        with self.assertNumQueries(len(ctx.captured_queries)):
+            resp = self.client.post(self.url, {'devices': large}, format='json')
+        self.assertEqual(resp.data['data']['created'], 50)
+        self.assertEqual(self.client.get('/api/devices/', {'q': 'model'}).data['count'], 50)
+
+    def test_invalid_item_rejects_batch_by_default(self):
+        other = User.objects.create_user(phone_number='9000000020', username='buyer', password='BuyerPass123')
+        resp = self.client.post(self.url, [self.item(), self.item(make_id=other.pk), self.item(mrp='0')], format='json')
+        self.assertEqual(resp.status_code, 400)
+        results = resp.data['data']['results']
+        self.assertEqual([r['status'] for r in results], ['valid', 'invalid', 'invalid'])
+        self.assertIn('make_id', results[1]['errors'])
+        self.assertIn('mrp', results[2]['errors'])
+        self.assertFalse(Device.objects.filter(model='Batch').exists())
+
+    def test_allow_partial_saves_valid_items(self):
+        resp = self.client.post(self.url + '?allow_partial=true', [self.item(), {'id': 999999}], format='json')
+        self.assertEqual(resp.status_code, 201)
+        self.assertEqual((resp.data['data']['created'], resp.data['data']['failed']), (1, 1))
+        self.assertEqual(Device.objects.get(model='Batch').created_by, self.manufacturer)
+
+
+class ComponentUsageTests(DeviceTestMixin, TestCase):
+    url = '/api/devices/component-usage/'
+
+    def setUp(self):
+        super().setUp()
+        self.device = self.make_device(bom_rows=0, components=False, quantity=10)
+        self.raw = self.make_device(bom_rows=0, components=False, quantity=2, state_of_supply='RAW_MATERIAL')
+        self.post_bom(self.device, [('R1', 'Resistor', 3), ('R2', 'Resistor ', 1), ('C1', 'Capacitor', 2)])
+        self.post_bom(self.raw, [('R1', 'Resistor', 4)])
+
+    def post_bom(self, device, rows):
+        resp = self.client.post(f'/api/devices/{device.pk}/add-bom/', {
+            'bom_upload_type': 'Individual entry',
+            'manual_entries': [{'designator': d, 'components_required': c, 'ship_qty': q} for d, c, q in rows],
+        }, format='json')
+        self.assertEqual(resp.status_code, 201, resp.data)
+
+    def usage(self):
+        return {
+            (row.component, row.state_of_supply): (row.device_count, row.total_ship_qty, row.weighted_qty)
+            for row in ComponentUsage.objects.all()
+        }
+
+    def assertMatchesRebuild(self):
+        incremental = self.usage()
+        rebuild_component_usage()
+        self.assertEqual(incremental, self.usage())
+
+    def test_bom_writes_update_summary(self):
+        self.assertEqual(self.usage(), {
+            ('Resistor', 'FINISHED_GOODS'): (1, 4, 40),
+            ('Capacitor', 'FINISHED_GOODS'): (1, 2, 20),
+            ('Resistor', 'RAW_MATERIAL'): (1, 4, 8),
+        })
+        self.post_bom(self.device, [('R1', 'Resistor', 5)])
+        self.assertEqual(self.usage()[('Resistor', 'FINISHED_GOODS')], (1, 5, 50))
+        self.assertNotIn(('Capacitor', 'FINISHED_GOODS'), self.usage())
+        self.assertMatchesRebuild()
+
+    def test_device_changes_and_deletes_update_summary(self):
+        self.client.patch(f'/api/devices/{self.device.pk}/', {'quantity': 1, 'state_of_supply': 'RAW_MATERIAL'}, format='json')
+        self.assertEqual(self.usage()[('Resistor', 'RAW_MATERIAL')], (2, 8, 12))
+        self.assertMatchesRebuild()
+
+        self.client.delete(f'/api/devices/{self.device.pk}/')
+        self.assertEqual(self.usage(), {('Resistor', 'RAW_MATERIAL'): (1, 4, 8)})
+        self.raw.delete()
+        self.assertEqual(self.usage(), {})
+
+    def test_api_filters_and_totals(self):
+        resp = self.client.get(self.url, {'component': 'Resistor'})
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['count'], 2)
+        self.assertEqual(resp.data['data']['totals'], {'device_count': 2, 'total_ship_qty': 8, 'weighted_qty': 48})
+
+        with self.assertNumQueries(2):
+            resp = self.client.get(self.url, {'manufacturer': self.manufacturer.pk, 'state_of_supply': 'RAW_MATERIAL'})
+        self.assertEqual([row['component'] for row in resp.data['data']['results']], ['Resistor'])
+        self.assertEqual(resp.data['data']['results'][0]['manufacturer_name'], 'maker')
+
+        self.assertEqual(self.client.get(self.url, {'state_of_supply': 'SOLD'}).status_code, 400)
+
+
+class MaterialRequirementsTests(DeviceTestMixin, TestCase):
+    url = '/api/devices/requirements/'
+
+    def test_explodes_bom_and_sub_components(self):
+        tracker = self.make_device(bom_rows=2)  # Resistor 0 x1, Resistor 1 x2, full sub-components
+        bare = self.make_device(bom_rows=1, components=False)
+        plan = [
+            {'device_id': tracker.pk, 'quantity': 5},
+            {'device_id': bare.pk, 'quantity': 3},
+            {'device_id': tracker.pk, 'quantity': 1},
+            {'device_id': 999999, 'quantity': 2},
+        ]
+        with self.assertNumQueries(2):
+            resp = self.client.post(self.url, {'plan': plan}, format='json')
+        self.assertEqual(resp.status_code, 200)
+        data = resp.data['data']
+        self.assertEqual(data['components'], [
+            {'component': 'Resistor 0', 'required_qty': 9, 'device_count': 2},
+            {'component': 'Resistor 1', 'required_qty': 12, 'device_count': 1},
+        ])
+        sub_components = {row['type']: row['required_qty'] for row in data['sub_components']}
+        # enclosure x1, sticker x2 per device; harness and battery one each
+        self.assertEqual(sub_components, {'enclosure': 6, 'sticker': 12, 'sos_button': 6, 'wire_harness': 6, 'battery': 6})
+        self.assertEqual(data['missing_devices'], [999999])
+
+    def test_invalid_plan_items_are_reported(self):
+        resp = self.client.post(self.url, [{'device_id': 1, 'quantity': 0}, {'device_id': 'x'}], format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(set(resp.data['errors']), {0, 1})
+        self.assertEqual(self.client.post(self.url, [], format='json').status_code, 400)
+
+
+class DeviceCloneTests(MediaRootMixin, DeviceTestMixin, TestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.device = self.make_device(bom_rows=3, components=True, variant='V1')
+        resp = self.client.post(f'/api/devices/{self.device.pk}/add-sticker/', {
+            'make': self.manufacturer.pk, 'name': 'Front', 'part_no': 'ST-1',
+            'length': 20, 'breadth': 10, 'quantity': 2, 'sticker_image': image_upload(),
+        }, format='multipart')
+        self.assertEqual(resp.status_code, 200, resp.data)  # replaces the fixture sticker's image
+        run_pending()
+        self.sticker = Sticker.objects.get(device=self.device)
+
+    def test_clone_copies_bom_and_components(self):
+        resp = self.client.post(f'/api/devices/{self.device.pk}/clone/', {'variant': 'V2'}, format='json')
+        self.assertEqual(resp.status_code, 201, resp.data)
+        data = resp.data['data']
+        clone = Device.objects.get(pk=data['id'])
+        self.assertEqual((clone.model, clone.variant, clone.quantity), ('Tracker', 'V2', 10))
+        self.assertEqual(
+            list(clone.bom_entries.values_list('designator', 'ship_qty')),
+            list(self.device.bom_entries.values_list('designator', 'ship_qty')),
+        )
+        for relation in ('enclosure', 'wire_harness', 'battery', 'sos_button', 'sticker'):
+            self.assertEqual(data[relation]['part_no'], getattr(self.device, relation).part_no)
+        self.assertEqual(self.client.get('/api/devices/', {'q': 'V2'}).data['count'], 1)
+
+    def test_sticker_image_is_shared_not_copied(self):
+        resp = self.client.post(f'/api/devices/{self.device.pk}/clone/', {}, format='json')
+        sticker = Sticker.objects.get(device_id=resp.data['data']['id'])
+        self.assertEqual(sticker.sticker_image.name, self.sticker.sticker_image.name)
+        self.assertEqual(StoredBlob.objects.get(name=sticker.sticker_image.name).ref_count, 2)
+        self.assertFalse(sticker.sticker_thumbnail)
+
+        # the variants are rendered for the clone, and the original keeps its file when the clone goes
+        run_pending()
+        sticker.refresh_from_db()
+        self.assertTrue(sticker.sticker_thumbnail)
+        self.assertNotEqual(sticker.sticker_thumbnail.name, self.sticker.sticker_thumbnail.name)
+        sticker.delete()
+        self.assertTrue(self.sticker.sticker_image.storage.exists(self.sticker.sticker_image.name))
+        self.assertEqual(StoredBlob.objects.get(name=self.sticker.sticker_image.name).ref_count, 1)
+
+    def test_invalid_override_is_rejected(self):
+        resp = self.client.post(f'/api/devices/{self.device.pk}/clone/', {'mrp': '0'}, format='json')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(Device.objects.count(), 1)
@@ -0,0 +1,133 @@
+# devices/usage.py
+"""
+Incrementally maintained component usage (the ComponentUsage table).
+
+A device contributes to one summary row per distinct BOM component, keyed by
+(component, manufacturer, state of supply), while it is active. Every write
+that can change a contribution - BOM syncs, device saves and soft deletes,
+batch updates, hard deletes - measures the devices' contributions before and
+after and applies only the difference, so the summary never needs a scan of
+`device_bom_entries`. `manage.py rebuild_component_usage` recomputes it from
+scratch should it ever drift (e.g. after raw SQL edits).
+"""
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.db import transaction
+from django.db.models import F, Sum, Value
+from django.db.models.functions import Coalesce
+
+from .importers import chunked
+from .models import BOMEntry, ComponentUsage
+
+# summary columns in the order contribution tuples carry them
+USAGE_FIELDS = ('device_count', 'total_ship_qty', 'weighted_qty')
+# device columns a contribution depends on
+USAGE_DEVICE_FIELDS = {'status', 'make_id', 'state_of_supply', 'quantity'}
+REBUILD_BATCH_SIZE = 1000
+
+
+def _contribution_rows(entries):
+    """Aggregate BOM entries of active devices per (device, component, manufacturer, state)."""
+    return (
+        entries.filter(device__status=True)
+        .values('device_id', 'components_required', 'device__make_id', 'device__state_of_supply')
+        .annotate(
+            ship_qty_sum=Sum('ship_qty'),
+            weighted=Sum(F('ship_qty') * Coalesce('device__quantity', Value(0))),
+        )
+        .order_by()
+    )
+
+
+def _accumulate(rows):
+    """{key: [device_count, total_ship_qty, weighted_qty]} from _contribution_rows()."""
+    usage = defaultdict(lambda: [0, 0, 0])
+    devices = defaultdict(set)
+    for row in rows:
+        key = ((row['components_required'] or '').strip(), row['device__make_id'], row['device__state_of_supply'])
+        totals = usage[key]
+        totals[1] += row['ship_qty_sum'] or 0
+        totals[2] += row['weighted'] or 0
+        # rows differing only in surrounding whitespace collapse into one key
+        devices[key].add(row['device_id'])
+    for key, device_ids in devices.items():
+        usage[key][0] = len(device_ids)
+    return dict(usage)
+
+
+def device_usage(device_ids):
+    """Current contribution of these devices to the summary, read in one query."""
+    if not device_ids:
+        return {}
+    return _accumulate(_contribution_rows(BOMEntry.objects.filter(device_id__in=device_ids)))
+
+
+def apply_usage_delta(before, after):
+    """Move the summary from the `before` contributions to `after`, touching only changed keys."""
+    for key in before.keys() | after.keys():
+        old, new = before.get(key, (0, 0, 0)), after.get(key, (0, 0, 0))
+        delta = dict(zip(USAGE_FIELDS, (n - o for n, o in zip(new, old))))
+        if not any(delta.values()):
+            continue
+        component, manufacturer_id, state_of_supply = key
+        rows = ComponentUsage.objects.filter(
+            component=component, manufacturer_id=manufacturer_id, state_of_supply=state_of_supply
+        )
+        increments = {name: F(name) + value for name, value in delta.items()}
+        if not rows.update(**increments):
+            if key not in after:
+                continue  # nothing left to subtract from
+            _, created = ComponentUsage.objects.get_or_create(
+                component=component, manufacturer_id=manufacturer_id, state_of_supply=state_of_supply,
+                defaults=delta
+            )
+            if not created:  # a concurrent writer inserted the row first
+                rows.update(**increments)
+        if key not in after:
+            rows.filter(device_count__lte=0).delete()
+
+
+def filter_component_usage(component=None, manufacturer_id=None, state_of_supply=None):
+    """
+    Summary rows matching the given filters, ordered to follow whichever index
+    leads with the most selective filter, so reads cost O(result).
+    """
+    queryset = ComponentUsage.objects.select_related('manufacturer')
+    if component is not None:
+        queryset = queryset.filter(component=component.strip())
+    if manufacturer_id is not None:
+        queryset = queryset.filter(manufacturer_id=manufacturer_id)
+    if state_of_supply is not None:
+        queryset = queryset.filter(state_of_supply=state_of_supply)
+
+    if component is not None or (manufacturer_id is None and state_of_supply is None):
+        return queryset.order_by('component', 'manufacturer_id', 'state_of_supply')
+    if manufacturer_id is not None:
+        return queryset.order_by('manufacturer_id', 'state_of_supply', 'component')
+    return queryset.order_by('state_of_supply', 'component', 'manufacturer_id')
+
+
+@contextmanager
+def tracking_component_usage(device_ids):
+    """Apply the usage change made by the wrapped block to these devices, in the same transaction."""
+    device_ids = list(device_ids)
+    with transaction.atomic():
+        before = device_usage(device_ids)
+        yield
+        apply_usage_delta(before, device_usage(device_ids))
+
+
+def rebuild_component_usage():
+    """Recompute the whole summary from the BOM tables."""
+    usage = _accumulate(_contribution_rows(BOMEntry.objects.all()).iterator(chunk_size=REBUILD_BATCH_SIZE))
+    rows = (
+        ComponentUsage(component=component, manufacturer_id=manufacturer_id, state_of_supply=state_of_supply,
+                       **dict(zip(USAGE_FIELDS, totals)))
+        for (component, manufacturer_id, state_of_supply), totals in usage.items()
+    )
+    with transaction.atomic():
+        ComponentUsage.objects.all().delete()
+        for batch in chunked(rows, REBUILD_BATCH_SIZE):
+            ComponentUsage.objects.bulk_create(batch)
+    return len(usage)
@@ -1,33 +1,167 @@
 # devices/views.py
 import pandas as pd
 import io
-from django.http import HttpResponse
-from rest_framework import viewsets, status
+import json
+from importlib import import_module
+from django.db.models import Count, Sum
+from django.http import HttpResponse, StreamingHttpResponse
+from rest_framework import serializers, viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 from django.db import transaction
 
-from .models import Device, BOMEntry, Enclosure, WireHarness, Battery, SOSButton, Sticker
+from .batch import DEVICE_BATCH_MAX_SIZE, save_device_batch, validate_device_batch
+from .bom import sync_bom
+from .clone import clone_device
+from .exporters import CONTENT_TYPES as EXPORT_CONTENT_TYPES, stream_bom_export
+from .images import schedule_sticker_variants
+from .mrp import PlanError, explode_requirements, parse_plan
+from .importers import BOMImportError, BOMValidationError, iter_bom_frames, iter_record_frames, iter_valid_rows
+from .pagination import DeviceCursorPagination
+from .search import search_devices
+from .usage import USAGE_FIELDS, filter_component_usage
+from .models import Device, DeviceQuerySet, BOMEntry, Enclosure, WireHarness, Battery, SOSButton, Sticker
 from .serializers import (
     DeviceSerializer, 
     DeviceCreateSerializer, 
     ManufacturerSerializer, 
     BOMEntrySerializer,
+    ComponentUsageSerializer,
     EnclosureSerializer,
     WireHarnessSerializer,
     BatterySerializer,
     SOSButtonSerializer,
     StickerSerializer
 )
-from accounts.models import User
+from accounts.models import Role, User
+from filestore.models import UploadSession, UploadSessionError
+from jobs.registry import enqueue
+from jobs.serializers import JobSerializer
+
+# `global` is a keyword, so the shared helpers package is loaded by name
+conditional_get = import_module('global.conditional').conditional_get
+
+# sub-components accepted by the composite `components` action: key -> (model, serializer)
+DEVICE_COMPONENTS = {
+    'enclosure': (Enclosure, EnclosureSerializer),
+    'wire_harness': (WireHarness, WireHarnessSerializer),
+    'battery': (Battery, BatterySerializer),
+    'sos_button': (SOSButton, SOSButtonSerializer),
+    'sticker': (Sticker, StickerSerializer),
+}
+
 
 class DeviceViewSet(viewsets.ModelViewSet):
     """ViewSet for Device CRUD operations"""
-    queryset = Device.objects.filter(status=True)
+    queryset = Device.objects.active()
     serializer_class = DeviceSerializer
     permission_classes = [IsAuthenticated]
+    pagination_class = DeviceCursorPagination
+
+    # read actions whose payload honours ?fields= / ?expand=
+    SELECTABLE_ACTIONS = {'list', 'retrieve'}
+    # actions that serialize the full device graph straight from get_object()
+    GRAPH_ACTIONS = {'update', 'partial_update'}
+    # the device plus every related row its payload embeds, for detail ETags (global/conditional.py)
+    conditional_timestamp_fields = ('updated_at', 'make_id__updated_at') + tuple(
+        field for relation in DeviceQuerySet.COMPONENT_RELATIONS
+        for field in (f'{relation}__updated_at', f'{relation}__make__updated_at')
+    )
+    # writes that answer with the device re-read through _serialize_device()
+    WRITE_ACTIONS = {
+        'create', 'clone', 'add_bom', 'save_components', 'add_enclosure',
+        'add_wire_harness', 'add_battery', 'add_sos_button', 'add_sticker',
+    }
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.action in self.WRITE_ACTIONS:
+            # a bad ?fields= / ?expand= must fail before the write, not after it
+            self.get_field_selection()
+
+    def get_queryset(self):
+        queryset = Device.objects.active()
+        if self.action in self.SELECTABLE_ACTIONS:
+            return queryset.with_graph(self._selected_relations())
+        if self.action in self.GRAPH_ACTIONS:
+            return queryset.with_graph()
+        if self.action == 'clone':
+            return queryset.with_components()
+        # write actions only need the bare row; they re-read the graph once after saving
+        return queryset
+
+    def _query_list(self, name):
+        value = self.request.query_params.get(name)
+        if value is None:
+            return None
+        return {item.strip() for item in value.split(',') if item.strip()}
+
+    def get_field_selection(self):
+        """DeviceSerializer field names picked by ?fields= / ?expand=, or None for all of them."""
+        fields = self._query_list('fields')
+        expand = self._query_list('expand')
+        if fields is None and expand is None:
+            return None
+        unknown = (fields or set()) - set(DeviceSerializer.Meta.fields)
+        unknown |= (expand or set()) - set(DeviceSerializer.EXPANDABLE_FIELDS)
+        if unknown:
+            raise ValidationError(f"Unknown fields: {', '.join(sorted(unknown))}")
+        return DeviceSerializer.resolve_fields(fields, expand)
+
+    def _selected_relations(self):
+        selection = self.get_field_selection()
+        return None if selection is None else DeviceSerializer.relations_for(selection)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in self.SELECTABLE_ACTIONS:
+            context['selected_fields'] = self.get_field_selection()
+        return context
+
+    def _serialize_device(self, device):
+        """Load the device graph in a constant number of queries and serialize it."""
+        device = Device.objects.with_graph(self._selected_relations()).get(pk=device.pk)
+        context = self.get_serializer_context()
+        context['selected_fields'] = self.get_field_selection()
+        return DeviceSerializer(device, context=context).data
     
+    def _wants_minimal(self, request):
+        """Sub-resource writes return only what changed for ?response=minimal or `Prefer: return=minimal`."""
+        if request.query_params.get('response', '').lower() == 'minimal':
+            return True
+        prefer = request.headers.get('Prefer', '')
+        return any(part.strip().lower() == 'return=minimal' for part in prefer.split(','))
+
+    def _component_response(self, request, device, instances, message, status_code, **extra):
+        """
+        Response for a sub-component write. Full mode re-serializes the whole device;
+        minimal mode returns just the written components, the device id and its version stamp.
+        """
+        if not self._wants_minimal(request):
+            return Response({'success': True, 'message': message, 'data': self._serialize_device(device), **extra}, status=status_code)
+
+        context = self.get_serializer_context()
+        data = {'device_id': device.pk, 'updated_at': serializers.DateTimeField().to_representation(device.updated_at)}
+        for name, instance in instances.items():
+            data[name] = DEVICE_COMPONENTS[name][1](instance, context=context).data
+        response = Response({'success': True, 'message': message, 'data': data, **extra}, status=status_code)
+        response['Preference-Applied'] = 'return=minimal'
+        return response
+
+    def _discard_upload(self, upload_session, upload):
+        """A chunked upload is single-use: drop its part file once the import has it."""
+        if upload_session is not None:
+            upload.close()
+            upload_session.discard()
+
+    def _wants_async(self, request):
+        """Heavy work runs as a background job when ?async=true (or async=true in the body)."""
+        value = request.query_params.get('async', request.data.get('async', ''))
+        return str(value).lower() in ('1', 'true', 'yes')
+
     def get_serializer_class(self):
         if self.action == 'create':
             return DeviceCreateSerializer
@@ -39,22 +173,53 @@ class DeviceViewSet(viewsets.ModelViewSet):
             try:
                 with transaction.atomic():
                     device = serializer.save(created_by=self.request.user)
-                    response_serializer = DeviceSerializer(device)
                     return Response({
                         'success': True,
                         'message': 'Device created successfully. Please proceed to BOM Entry.',
-                        'data': response_serializer.data
+                        'data': self._serialize_device(device)
                     }, status=status.HTTP_201_CREATED)
             except Exception as e:
                 return Response({'success': False, 'message': 'Failed to create device', 'error': str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         else:
             return Response({'success': False, 'message': 'Validation failed', 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
     
+    @conditional_get
     def list(self, request, *args, **kwargs):
-        queryset = self.get_queryset()
-        serializer = self.get_serializer(queryset, many=True)
-        return Response({'success': True, 'message': 'Devices retrieved successfully', 'data': serializer.data, 'count': queryset.count()})
+        query = request.query_params.get('q', '').strip()
+        if query:
+            return self._search_response(request, query)
+        page = self.paginate_queryset(self.get_queryset())
+        serializer = self.get_serializer(page, many=True)
+        return Response({
+            'success': True,
+            'message': 'Devices retrieved successfully',
+            'data': serializer.data,
+            **self.paginator.get_page_metadata()
+        })
     
+    def _search_response(self, request, query):
+        """Ranked ?q= results from the search index, paged with ?offset= (best matches first)."""
+        page_size = self.paginator.get_page_size(request)
+        try:
+            offset = max(0, int(request.query_params.get('offset', 0)))
+        except ValueError:
+            raise ValidationError({'offset': 'Must be a non-negative integer.'})
+
+        ids, total = search_devices(query, limit=page_size, offset=offset)
+        devices = self.get_queryset().in_bulk(ids)
+        serializer = self.get_serializer([devices[pk] for pk in ids if pk in devices], many=True)
+
+        url = request.build_absolute_uri()
+        return Response({
+            'success': True,
+            'message': 'Devices retrieved successfully',
+            'data': serializer.data,
+            'count': total,
+            'next': replace_query_param(url, 'offset', offset + page_size) if offset + page_size < total else None,
+            'previous': replace_query_param(url, 'offset', max(0, offset - page_size)) if offset else None,
+        })
+
+    @conditional_get
     def retrieve(self, request, *args, **kwargs):
         instance = self.get_object()
         serializer = self.get_serializer(instance)
@@ -80,10 +245,80 @@ class DeviceViewSet(viewsets.ModelViewSet):
         instance.save()
         return Response({'success': True, 'message': 'Device deleted successfully'}, status=status.HTTP_200_OK)
 
+    @action(detail=False, methods=['post'], url_path='batch')
+    def batch(self, request):
+        """
+        Create or update many devices at once. Body: a list of device objects (or {"devices": [...]});
+        items with an `id` update that device. With ?allow_partial=true the valid items are saved
+        even when others fail; by default any invalid item rejects the whole batch.
+        """
+        items = request.data.get('devices') if isinstance(request.data, dict) else request.data
+        if not isinstance(items, list) or not items:
+            return Response({'success': False, 'message': 'Send a non-empty list of devices.'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(items) > DEVICE_BATCH_MAX_SIZE:
+            return Response({'success': False, 'message': f'A batch holds at most {DEVICE_BATCH_MAX_SIZE} devices.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        results, valid, devices = validate_device_batch(items)
+        failed = len(items) - len(valid)
+        allow_partial = request.query_params.get('allow_partial', '').lower() in ('1', 'true', 'yes')
+        if failed and not allow_partial:
+            return Response({
+                'success': False,
+                'message': f'{failed} device(s) failed validation; nothing was saved.',
+                'data': {'results': results, 'created': 0, 'updated': 0, 'failed': failed}
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        saved = save_device_batch(valid, devices, request.user)
+        for result in results:
+            if result['index'] in saved:
+                result['status'], result['id'] = saved[result['index']]
+        created = sum(1 for result in results if result['status'] == 'created')
+        updated = sum(1 for result in results if result['status'] == 'updated')
+        return Response({
+            'success': True,
+            'message': f'{created} device(s) created, {updated} updated, {failed} failed.',
+            'data': {'results': results, 'created': created, 'updated': updated, 'failed': failed}
+        }, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    @action(detail=False, methods=['post'], url_path='requirements')
+    def requirements(self, request):
+        """
+        Material requirements for a production plan. Body: a list of {"device_id", "quantity"}
+        (or {"plan": [...]}); returns BOM components and sub-components needed to build it.
+        """
+        items = request.data.get('plan') if isinstance(request.data, dict) else request.data
+        try:
+            plan = parse_plan(items)
+        except PlanError as e:
+            return Response({'success': False, 'message': str(e), 'errors': e.errors}, status=status.HTTP_400_BAD_REQUEST)
+        return Response({
+            'success': True,
+            'message': 'Material requirements calculated successfully',
+            'data': explode_requirements(plan)
+        })
+
+    @action(detail=True, methods=['post'], url_path='clone')
+    def clone(self, request, pk=None):
+        """
+        Copy the device with its BOM and sub-components. Any device fields in the body
+        (model, variant, version, mrp, ...) replace the copied values.
+        """
+        source = self.get_object()
+        serializer = DeviceCreateSerializer(source, data=request.data, partial=True)
+        if not serializer.is_valid():
+            return Response({'success': False, 'message': 'Validation failed', 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
+        device = clone_device(source, request.user, serializer.validated_data)
+        return Response({
+            'success': True,
+            'message': 'Device cloned successfully',
+            'data': self._serialize_device(device)
+        }, status=status.HTTP_201_CREATED)
+
     @action(detail=False, methods=['get'], url_path='manufacturers')
     def get_manufacturers(self, request):
         try:
-            manufacturers = User.objects.filter(role__key__iexact='manufacturer', is_active=True)
+            # the role subquery lets the users.role_id index drive the lookup
+            manufacturers = User.objects.filter(role__in=Role.objects.filter(key__iexact='manufacturer'), is_active=True)
             serializer = ManufacturerSerializer(manufacturers, many=True)
             return Response({'success': True, 'message': 'Manufacturers retrieved successfully', 'data': serializer.data})
         except Exception as e:
@@ -103,6 +338,7 @@ class DeviceViewSet(viewsets.ModelViewSet):
 
     @action(detail=True, methods=['post'], url_path='add-bom')
     def add_bom(self, request, pk=None):
+        upload_session = bom_file = None
         try:
             device = self.get_object()
             upload_type = request.data.get('bom_upload_type')
@@ -115,35 +351,93 @@ class DeviceViewSet(viewsets.ModelViewSet):
                 except (ValueError, TypeError):
                     return Response({'success': False, 'message': 'Invalid quantity provided.'}, status=status.HTTP_400_BAD_REQUEST)
             
-            BOMEntry.objects.filter(device=device).delete()
-            bom_entries_to_create = []
-
             if upload_type == 'Individual entry':
                 manual_entries = request.data.get('manual_entries', [])
                 if not isinstance(manual_entries, list):
                      return Response({'success': False, 'message': "'manual_entries' must be a list."}, status=status.HTTP_400_BAD_REQUEST)
-                for entry in manual_entries:
-                    bom_entries_to_create.append(BOMEntry(device=device, **entry))
+                rows = iter_valid_rows(iter_record_frames(manual_entries))
 
             elif upload_type == 'Bulk upload':
                 bom_file = request.FILES.get('bom_file')
+                if not bom_file and request.data.get('bom_upload_id'):
+                    # a file sent earlier through the chunked upload API
+                    try:
+                        upload_session = UploadSession.get_completed(request.data['bom_upload_id'], request.user)
+                    except UploadSessionError as e:
+                        return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+                    bom_file = upload_session.open()
                 if not bom_file:
                     return Response({'success': False, 'message': 'BOM file is required for bulk upload.'}, status=status.HTTP_400_BAD_REQUEST)
-                df = pd.read_excel(bom_file)
-                df.columns = [c.strip().upper().replace(' ', '_').lower() for c in df.columns]
-                for index, row in df.iterrows():
-                    bom_entries_to_create.append(BOMEntry(device=device, **row.to_dict()))
+                if self._wants_async(request):
+                    job = enqueue('devices.import_bom', {'device_id': device.pk}, input_file=bom_file, created_by=request.user)
+                    return Response({
+                        'success': True,
+                        'message': 'BOM upload queued for processing.',
+                        'data': JobSerializer(job, context=self.get_serializer_context()).data
+                    }, status=status.HTTP_202_ACCEPTED)
+                rows = iter_valid_rows(iter_bom_frames(bom_file))
             else:
                 return Response({'success': False, 'message': 'Invalid BOM Upload Type.'}, status=status.HTTP_400_BAD_REQUEST)
 
-            if bom_entries_to_create:
-                BOMEntry.objects.bulk_create(bom_entries_to_create)
-            
-            device.refresh_from_db()
-            serializer = self.get_serializer(device)
-            return Response({'success': True, 'message': 'BOM entries saved successfully.', 'data': serializer.data}, status=status.HTTP_201_CREATED)
+            # only the changed rows are written, in one transaction; a bad row keeps the previous BOM
+            changes = sync_bom(device, rows)
+            return Response({
+                'success': True,
+                'message': 'BOM entries saved successfully.',
+                'data': self._serialize_device(device),
+                'changes': changes
+            }, status=status.HTTP_201_CREATED)
+        except BOMValidationError as e:
+            return Response({'success': False, 'message': str(e), 'errors': e.report}, status=status.HTTP_400_BAD_REQUEST)
+        except BOMImportError as e:
+            return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
         except Exception as e:
             return Response({'success': False, 'message': f'Error processing request: {str(e)}'}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        finally:
+            # on every path, failed imports included: close the handle and drop the part file
+            self._discard_upload(upload_session, bom_file)
+
+    @action(detail=False, methods=['get'], url_path='component-usage')
+    def component_usage(self, request):
+        """
+        Usage of BOM components across active devices, read from the ComponentUsage summary.
+        Filters: ?component= (exact), ?manufacturer= (user id), ?state_of_supply=. Paged with ?offset=.
+        """
+        params = request.query_params
+        errors = {}
+        manufacturer_id = params.get('manufacturer')
+        if manufacturer_id is not None and not manufacturer_id.isdigit():
+            errors['manufacturer'] = 'Must be a user id.'
+        state_of_supply = params.get('state_of_supply')
+        if state_of_supply is not None and state_of_supply not in dict(Device.STATE_OF_SUPPLY_CHOICES):
+            errors['state_of_supply'] = f'"{state_of_supply}" is not a valid choice.'
+        try:
+            offset = max(0, int(params.get('offset', 0)))
+        except ValueError:
+            errors['offset'] = 'Must be a non-negative integer.'
+        if errors:
+            return Response({'success': False, 'message': 'Invalid filters', 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        usage = filter_component_usage(
+            component=params.get('component'),
+            manufacturer_id=int(manufacturer_id) if manufacturer_id is not None else None,
+            state_of_supply=state_of_supply,
+        )
+        page_size = self.paginator.get_page_size(request)
+        totals = usage.aggregate(rows=Count('id'), **{name: Sum(name) for name in USAGE_FIELDS})
+        total_rows = totals.pop('rows')
+        url = request.build_absolute_uri()
+        return Response({
+            'success': True,
+            'message': 'Component usage retrieved successfully',
+            'data': {
+                'totals': {name: value or 0 for name, value in totals.items()},
+                'results': ComponentUsageSerializer(usage[offset:offset + page_size], many=True).data,
+            },
+            'count': total_rows,
+            'next': replace_query_param(url, 'offset', offset + page_size) if offset + page_size < total_rows else None,
+            'previous': replace_query_param(url, 'offset', max(0, offset - page_size)) if offset else None,
+        })
 
     @action(detail=False, methods=['get'], url_path='download-sample-bom')
     def download_sample_bom(self, request):
@@ -157,6 +451,91 @@ class DeviceViewSet(viewsets.ModelViewSet):
         response['Content-Disposition'] = 'attachment; filename="bom_sample.xlsx"'
         return response
 
+    def _bom_export_response(self, request, device=None):
+        file_format = request.query_params.get('file_format', 'csv').lower()
+        if file_format not in EXPORT_CONTENT_TYPES:
+            return Response({'success': False, 'message': f"Unsupported file_format '{file_format}'. Use csv or xlsx."}, status=status.HTTP_400_BAD_REQUEST)
+
+        if device is None and self._wants_async(request):
+            job = enqueue('devices.export_bom', {'file_format': file_format}, created_by=request.user)
+            return Response({
+                'success': True,
+                'message': 'BOM export queued for processing.',
+                'data': JobSerializer(job, context=self.get_serializer_context()).data
+            }, status=status.HTTP_202_ACCEPTED)
+
+        filename = f'bom_device_{device.pk}.{file_format}' if device is not None else f'bom_catalogue.{file_format}'
+        response = StreamingHttpResponse(stream_bom_export(file_format, device), content_type=EXPORT_CONTENT_TYPES[file_format])
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    @action(detail=False, methods=['get'], url_path='export-bom', url_name='export-catalogue-bom')
+    def export_catalogue_bom(self, request):
+        """Stream the BOMs of all active devices as CSV/XLSX (?file_format=, ?async=true for a job)."""
+        return self._bom_export_response(request)
+
+    @action(detail=True, methods=['get'], url_path='export-bom')
+    def export_bom(self, request, pk=None):
+        """Stream one device's BOM as CSV/XLSX, in the sample template layout."""
+        return self._bom_export_response(request, device=self.get_object())
+
+    @action(detail=True, methods=['post'], url_path='components')
+    def save_components(self, request, pk=None):
+        """
+        Create or update any subset of the sub-components in one request and one transaction.
+        JSON body: {"enclosure": {...}, "battery": {...}, ...}. For multipart (sticker image),
+        send each component as a JSON string and the image as `sticker_image`.
+        """
+        device = self.get_object()
+        if not isinstance(request.data, dict):
+            return Response({'success': False, 'message': 'Send an object keyed by component name.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        payloads, errors = {}, {}
+        for name in DEVICE_COMPONENTS:
+            value = request.data.get(name)
+            if value in (None, ''):
+                continue
+            if isinstance(value, str):
+                try:
+                    value = json.loads(value)
+                except ValueError:
+                    value = None
+            if not isinstance(value, dict):
+                errors[name] = ['Must be an object.']
+                continue
+            payloads[name] = dict(value)
+        if 'sticker' in payloads and 'sticker_image' in request.FILES:
+            payloads['sticker']['sticker_image'] = request.FILES['sticker_image']
+
+        if not payloads and not errors:
+            return Response({'success': False, 'message': f"Provide at least one of: {', '.join(DEVICE_COMPONENTS)}."}, status=status.HTTP_400_BAD_REQUEST)
+
+        # validate everything before writing anything
+        serializers_by_name = {}
+        for name, data in payloads.items():
+            serializer = DEVICE_COMPONENTS[name][1](data=data)
+            if serializer.is_valid():
+                serializers_by_name[name] = serializer
+            else:
+                errors[name] = serializer.errors
+        if errors:
+            return Response({'success': False, 'message': 'Validation failed', 'errors': errors}, status=status.HTTP_400_BAD_REQUEST)
+
+        instances, changes = {}, {}
+        with transaction.atomic():
+            for name, serializer in serializers_by_name.items():
+                model = DEVICE_COMPONENTS[name][0]
+                instances[name], created = model.objects.update_or_create(device=device, defaults=serializer.validated_data)
+                changes[name] = 'created' if created else 'updated'
+            if 'sticker' in instances:
+                schedule_sticker_variants(instances['sticker'])
+            device.touch()
+
+        status_code = status.HTTP_201_CREATED if 'created' in changes.values() else status.HTTP_200_OK
+        return self._component_response(
+            request, device, instances, 'Components saved successfully.', status_code, changes=changes
+        )
+
     @action(detail=True, methods=['post'], url_path='add-enclosure')
     def add_enclosure(self, request, pk=None):
         try:
@@ -167,11 +546,10 @@ class DeviceViewSet(viewsets.ModelViewSet):
         serializer = EnclosureSerializer(data=request.data)
         if serializer.is_valid():
             enclosure, created = Enclosure.objects.update_or_create(device=device, defaults=serializer.validated_data)
-            device.refresh_from_db()
-            device_serializer = self.get_serializer(device)
+            device.touch()
             message = 'Enclosure created successfully.' if created else 'Enclosure updated successfully.'
             status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
-            return Response({'success': True, 'message': message, 'data': device_serializer.data}, status=status_code)
+            return self._component_response(request, device, {'enclosure': enclosure}, message, status_code)
         else:
             return Response({'success': False, 'message': 'Validation failed', 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -185,11 +563,10 @@ class DeviceViewSet(viewsets.ModelViewSet):
         serializer = WireHarnessSerializer(data=request.data)
         if serializer.is_valid():
             harness, created = WireHarness.objects.update_or_create(device=device, defaults=serializer.validated_data)
-            device.refresh_from_db()
-            device_serializer = self.get_serializer(device)
+            device.touch()
             message = 'Wire Harness created successfully.' if created else 'Wire Harness updated successfully.'
             status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
-            return Response({'success': True, 'message': message, 'data': device_serializer.data}, status=status_code)
+            return self._component_response(request, device, {'wire_harness': harness}, message, status_code)
         else:
             return Response({'success': False, 'message': 'Validation failed', 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -203,11 +580,10 @@ class DeviceViewSet(viewsets.ModelViewSet):
         serializer = BatterySerializer(data=request.data)
         if serializer.is_valid():
             battery, created = Battery.objects.update_or_create(device=device, defaults=serializer.validated_data)
-            device.refresh_from_db()
-            device_serializer = self.get_serializer(device)
+            device.touch()
             status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
             message = 'Battery created successfully.' if created else 'Battery updated successfully.'
-            return Response({'success': True, 'message': message, 'data': device_serializer.data}, status=status_code)
+            return self._component_response(request, device, {'battery': battery}, message, status_code)
         else:
             return Response({'success': False, 'message': 'Validation failed', 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
 
@@ -221,11 +597,10 @@ class DeviceViewSet(viewsets.ModelViewSet):
         serializer = SOSButtonSerializer(data=request.data)
         if serializer.is_valid():
             sos_button, created = SOSButton.objects.update_or_create(device=device, defaults=serializer.validated_data)
-            device.refresh_from_db()
-            device_serializer = self.get_serializer(device)
+            device.touch()
             status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
             message = 'SOS Button created successfully.' if created else 'SOS Button updated successfully.'
-            return Response({'success': True, 'message': message, 'data': device_serializer.data}, status=status_code)
+            return self._component_response(request, device, {'sos_button': sos_button}, message, status_code)
         else:
             return Response({'success': False, 'message': 'Validation failed', 'errors': serializer.errors}, status=status.HTTP_400_BAD_REQUEST)
     
@@ -247,18 +622,13 @@ class DeviceViewSet(viewsets.ModelViewSet):
                 device=device,
                 defaults=serializer.validated_data
             )
-            
-            device.refresh_from_db()
-            device_serializer = self.get_serializer(device)
+            schedule_sticker_variants(sticker)
+            device.touch()
             
             status_code = status.HTTP_201_CREATED if created else status.HTTP_200_OK
             message = 'Sticker created successfully.' if created else 'Sticker updated successfully.'
             
-            return Response({
-                'success': True, 
-                'message': message, 
-                'data': device_serializer.data
-            }, status=status_code)
+            return self._component_response(request, device, {'sticker': sticker}, message, status_code)
         else:
             return Response({
                 'success': False, 
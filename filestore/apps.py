@@ -0,0 +1,10 @@
+from django.apps import AppConfig
+
+
+class FilestoreConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'filestore'
+
+    def ready(self):
+        from .signals import connect_tracked_fields
+        connect_tracked_fields()
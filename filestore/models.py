@@ -0,0 +1,165 @@
+# filestore/models.py
+import hashlib
+import os
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.db import models
+from django.utils import timezone
+
+# bytes read from the request body / part file per iteration
+UPLOAD_READ_SIZE = 64 * 1024
+
+
+class StoredBlob(models.Model):
+    """
+    One file in content-addressed storage. `name` is derived from the SHA-256 of the
+    content, so identical uploads share a single file; `ref_count` counts the
+    field values pointing at it and the file is removed when it drops to zero.
+    """
+    name = models.CharField(max_length=255, unique=True, help_text="Storage path, e.g. cas/ab/cd/abcd….pdf")
+    digest = models.CharField(max_length=64, db_index=True, help_text="SHA-256 of the content (hex)")
+    size = models.BigIntegerField()
+    ref_count = models.PositiveIntegerField(default=1)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'stored_blobs'
+
+    def __str__(self):
+        return f"{self.name} ({self.ref_count} refs)"
+
+
+class UploadSessionError(Exception):
+    """Raised for uploads that cannot be written, finalized or used."""
+
+
+class UploadOffsetMismatch(UploadSessionError):
+    """The chunk does not start where the server's copy ends; the client should resume from `offset`."""
+
+    def __init__(self, offset):
+        self.offset = offset
+        super().__init__(f'Expected a chunk at offset {offset}.')
+
+
+class UploadSession(models.Model):
+    """
+    A file uploaded in chunks. Each PUT appends at the current offset to a part file
+    on disk, so a dropped connection only loses the chunk in flight; finalize
+    checks the SHA-256 of the assembled file. A complete session can then be passed
+    by id wherever an endpoint accepts the file itself.
+    """
+    OPEN = 'open'
+    COMPLETE = 'complete'
+
+    STATUS_CHOICES = [
+        (OPEN, 'Open'),
+        (COMPLETE, 'Complete'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    filename = models.CharField(max_length=255)
+    size = models.BigIntegerField(help_text="Declared total size in bytes")
+    received = models.BigIntegerField(default=0, help_text="Bytes written so far; the next chunk starts here")
+    sha256 = models.CharField(max_length=64, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=OPEN)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='upload_sessions')
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    class Meta:
+        db_table = 'upload_sessions'
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size})"
+
+    @property
+    def path(self):
+        return os.path.join(settings.UPLOAD_SESSION_ROOT, f'{self.pk}.part')
+
+    def save(self, *args, **kwargs):
+        if self.expires_at is None:
+            self.expires_at = timezone.now() + timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+        super().save(*args, **kwargs)
+
+    def append(self, offset, stream):
+        """Write the bytes read from `stream` at `offset`; returns the new offset."""
+        if self.status != self.OPEN:
+            raise UploadSessionError('Upload is already finalized.')
+        if offset != self.received:
+            raise UploadOffsetMismatch(self.received)
+
+        os.makedirs(settings.UPLOAD_SESSION_ROOT, exist_ok=True)
+        position = offset
+        with open(self.path, 'r+b' if os.path.exists(self.path) else 'wb') as part:
+            part.seek(offset)
+            while True:
+                chunk = stream.read(UPLOAD_READ_SIZE)
+                if not chunk:
+                    break
+                if position + len(chunk) > self.size:
+                    raise UploadSessionError(f'Chunk runs past the declared size of {self.size} bytes.')
+                part.write(chunk)
+                position += len(chunk)
+
+        # compare-and-set, so two clients writing the same offset cannot both advance it
+        advanced = UploadSession.objects.filter(pk=self.pk, status=self.OPEN, received=offset).update(
+            received=position, updated_at=timezone.now()
+        )
+        if not advanced:
+            self.refresh_from_db(fields=['received'])
+            raise UploadOffsetMismatch(self.received)
+        self.received = position
+        return position
+
+    def finalize(self, sha256):
+        """Check the assembled file against the client's SHA-256 and mark the session complete."""
+        if self.status == self.COMPLETE:
+            return
+        if self.received != self.size:
+            raise UploadSessionError(f'Upload is incomplete: {self.received} of {self.size} bytes received.')
+
+        digest = hashlib.sha256()
+        with open(self.path, 'r+b') as part:
+            part.truncate(self.size)
+            for chunk in iter(lambda: part.read(UPLOAD_READ_SIZE), b''):
+                digest.update(chunk)
+        if digest.hexdigest() != (sha256 or '').strip().lower():
+            # the assembled bytes are wrong somewhere; the client has to send them again
+            UploadSession.objects.filter(pk=self.pk).update(received=0)
+            self.received = 0
+            raise UploadSessionError('Checksum mismatch; the upload has been reset.')
+
+        self.sha256 = digest.hexdigest()
+        self.status = self.COMPLETE
+        self.save(update_fields=['sha256', 'status', 'updated_at'])
+
+    def open(self):
+        """The assembled file as a django File named after the original upload."""
+        return File(open(self.path, 'rb'), name=self.filename)
+
+    def discard(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        self.delete()
+
+    @classmethod
+    def get_completed(cls, upload_id, user):
+        """The caller's finalized, unexpired session `upload_id`, or UploadSessionError."""
+        try:
+            return cls.objects.get(pk=upload_id, created_by=user, status=cls.COMPLETE, expires_at__gt=timezone.now())
+        except (cls.DoesNotExist, ValueError, ValidationError):
+            raise UploadSessionError('Upload session not found or not finalized.')
+
+    @classmethod
+    def purge_expired(cls):
+        expired = list(cls.objects.filter(expires_at__lt=timezone.now()))
+        for session in expired:
+            session.discard()
+        return len(expired)
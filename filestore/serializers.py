@@ -0,0 +1,55 @@
+# filestore/serializers.py
+import os
+
+from django.conf import settings
+from rest_framework import serializers
+
+from .models import UploadSession, UploadSessionError
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    offset = serializers.IntegerField(source='received', read_only=True)
+
+    class Meta:
+        model = UploadSession
+        fields = ['id', 'filename', 'size', 'offset', 'sha256', 'status', 'created_at', 'expires_at']
+        read_only_fields = ['id', 'sha256', 'status', 'created_at', 'expires_at']
+
+    def validate_filename(self, value):
+        name = os.path.basename(value.replace('\\', '/')).strip()
+        if not name:
+            raise serializers.ValidationError("A file name is required.")
+        return name
+
+    def validate_size(self, value):
+        if value <= 0:
+            raise serializers.ValidationError("Size must be greater than zero.")
+        if value > settings.UPLOAD_SESSION_MAX_SIZE:
+            raise serializers.ValidationError(f"Uploads are limited to {settings.UPLOAD_SESSION_MAX_SIZE} bytes.")
+        return value
+
+
+class UploadSessionFileField(serializers.FileField):
+    """
+    FileField that also accepts the id of a finalized upload session owned by the caller.
+    Used sessions are collected in context['upload_sessions'] so the view can discard them.
+    """
+
+    def to_internal_value(self, data):
+        if isinstance(data, str) and data:
+            request = self.context.get('request')
+            try:
+                session = UploadSession.get_completed(data, getattr(request, 'user', None))
+            except UploadSessionError as e:
+                raise serializers.ValidationError(str(e))
+            upload = session.open()
+            self.context.setdefault('upload_sessions', []).append((session, upload))
+            return upload
+        return super().to_internal_value(data)
+
+
+def discard_used_uploads(context):
+    """Sessions are single-use: remove the part files once the model has saved its copy."""
+    for session, upload in context.pop('upload_sessions', []):
+        upload.close()
+        session.discard()
@@ -0,0 +1,91 @@
+# filestore/signals.py
+"""
+Keep StoredBlob reference counts in step with model rows.
+
+Every FileField backed by ContentAddressedStorage is tracked: the file names a
+row was loaded with are remembered, and when a save replaces one, or the row is
+deleted, the old reference is released. Storing identical bytes again keeps the
+name but still adds a reference, so writes through the field are marked and the
+surplus reference is released too. Only names already stored are tracked: a
+pending upload's name is just the client's file name. QuerySet.update()
+bypasses this.
+"""
+from django.apps import apps
+from django.db.models import FileField
+from django.db.models.fields.files import FieldFile, ImageFieldFile
+from django.db.models.signals import post_delete, post_init, post_save, pre_save
+
+from .storage import ContentAddressedStorage
+
+
+class StoreMarkingMixin:
+    """Marks the instance whenever the field stores a file, so post_save can tell a rewrite from no change."""
+
+    def save(self, name, content, save=True):
+        self.instance.__dict__.setdefault('_stored_file_writes', set()).add(self.field.attname)
+        super().save(name, content, save)
+
+
+class TrackedFieldFile(StoreMarkingMixin, FieldFile):
+    pass
+
+
+class TrackedImageFieldFile(StoreMarkingMixin, ImageFieldFile):
+    pass
+
+
+# module-level classes, so instances still pickle (e.g. users in the authentication cache)
+TRACKED_FILE_CLASSES = {FieldFile: TrackedFieldFile, ImageFieldFile: TrackedImageFieldFile}
+
+
+def tracked_fields(model):
+    return [
+        field for field in model._meta.concrete_fields
+        if isinstance(field, FileField) and isinstance(field.storage, ContentAddressedStorage)
+    ]
+
+
+def _loaded_names(instance, fields):
+    # deferred fields are skipped: reading them here would cost a query per row
+    files = {field.attname: getattr(instance, field.attname) for field in fields if field.attname in instance.__dict__}
+    # an uncommitted file is an upload not stored yet; its name points at nothing of ours
+    return {attname: file.name for attname, file in files.items() if file._committed}
+
+
+def connect_tracked_fields():
+    for model in apps.get_models():
+        fields = tracked_fields(model)
+        if not fields:
+            continue
+        for field in fields:
+            field.attr_class = TRACKED_FILE_CLASSES.get(field.attr_class, field.attr_class)
+
+        def remember(sender, instance, fields=fields, **kwargs):
+            instance._stored_file_names = _loaded_names(instance, fields)
+
+        def forget_unsaved(sender, instance, **kwargs):
+            # a row not loaded from the database replaces nothing, whatever names it was built with
+            if instance._state.adding:
+                instance._stored_file_names = {}
+
+        def release_replaced(sender, instance, created, fields=fields, **kwargs):
+            current = _loaded_names(instance, fields)
+            written = instance.__dict__.pop('_stored_file_writes', set())
+            previous = {} if created else getattr(instance, '_stored_file_names', {})
+            instance._stored_file_names = current
+            for field in fields:
+                old = previous.get(field.attname)
+                # same name after a write: the content was stored again and counted twice
+                if old and (old != current.get(field.attname) or field.attname in written):
+                    field.storage.delete(old)
+
+        def release_deleted(sender, instance, fields=fields, **kwargs):
+            for field in fields:
+                name = _loaded_names(instance, [field]).get(field.attname)
+                if name:
+                    field.storage.delete(name)
+
+        post_init.connect(remember, sender=model, weak=False, dispatch_uid=f'filestore.remember.{model._meta.label}')
+        pre_save.connect(forget_unsaved, sender=model, weak=False, dispatch_uid=f'filestore.unsaved.{model._meta.label}')
+        post_save.connect(release_replaced, sender=model, weak=False, dispatch_uid=f'filestore.save.{model._meta.label}')
+        post_delete.connect(release_deleted, sender=model, weak=False, dispatch_uid=f'filestore.delete.{model._meta.label}')
@@ -0,0 +1,119 @@
+# filestore/storage.py
+"""
+Content-addressed file storage.
+
+Uploads are streamed chunk by chunk into a temporary file while their SHA-256
+is computed, then moved to a path derived from the digest and sharded into
+two levels of subdirectories (cas/ab/cd/abcd….ext), so no directory grows
+without bound. Identical uploads resolve to the same path and are stored
+once; a StoredBlob row counts the references and the file is deleted when
+the last one goes away.
+"""
+import hashlib
+import os
+import tempfile
+
+from django.core.files.storage import FileSystemStorage, storages
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from .models import StoredBlob
+
+ROOT = 'cas'
+SHARD_LEVELS = 2
+SHARD_WIDTH = 2
+
+
+def content_path(digest, extension=''):
+    """'cas/ab/cd/abcdef….pdf' for a hex digest."""
+    shards = [digest[level * SHARD_WIDTH:(level + 1) * SHARD_WIDTH] for level in range(SHARD_LEVELS)]
+    return '/'.join([ROOT, *shards, digest + extension])
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """FileSystemStorage that names files by content and reference-counts them."""
+
+    def get_available_name(self, name, max_length=None):
+        # the real name is chosen from the content in _save, and may already exist
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        tmp_dir = self.path(os.path.join(ROOT, 'tmp'))
+        os.makedirs(tmp_dir, exist_ok=True)
+
+        sha256, size = hashlib.sha256(), 0
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            with os.fdopen(fd, 'wb') as output:
+                for chunk in content.chunks():
+                    if isinstance(chunk, str):
+                        chunk = chunk.encode('utf-8')
+                    sha256.update(chunk)
+                    output.write(chunk)
+                    size += len(chunk)
+            digest = sha256.hexdigest()
+            name = content_path(digest, extension)
+            path = self.path(name)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            os.chmod(tmp_path, self.file_permissions_mode if self.file_permissions_mode is not None else 0o644)
+            # same content, same bytes: replacing an existing copy is harmless and atomic
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+        self._add_reference(name, digest, size)
+        return name
+
+    def _add_reference(self, name, digest, size):
+        if StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1):
+            return
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.create(name=name, digest=digest, size=size)
+        except IntegrityError:
+            # stored concurrently by another request
+            StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+    def retain(self, name):
+        """Add a reference to an already stored file (e.g. a copied row) without copying its bytes."""
+        if not name or StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1):
+            return
+        if not self.exists(name):
+            return
+        # stored before reference counting existed: count the original holder and the new one
+        sha256 = hashlib.sha256()
+        with self.open(name, 'rb') as content:
+            for chunk in content.chunks():
+                sha256.update(chunk)
+        try:
+            with transaction.atomic():
+                StoredBlob.objects.create(name=name, digest=sha256.hexdigest(), size=self.size(name), ref_count=2)
+        except IntegrityError:
+            StoredBlob.objects.filter(name=name).update(ref_count=F('ref_count') + 1)
+
+    def delete(self, name):
+        """Drop one reference; the file itself goes once nothing points at it."""
+        if not name:
+            return
+        with transaction.atomic():
+            blob = StoredBlob.objects.select_for_update().filter(name=name).first()
+            if blob is None:
+                # not one of ours (e.g. written before this storage existed): never unlink it
+                return
+            if blob.ref_count > 1:
+                StoredBlob.objects.filter(pk=blob.pk).update(ref_count=F('ref_count') - 1)
+                return
+            blob.delete()
+            transaction.on_commit(lambda: self._delete_unreferenced(name))
+
+    def _delete_unreferenced(self, name):
+        # the same content may have been saved again since; its blob row means the file is live
+        if not StoredBlob.objects.filter(name=name).exists():
+            super().delete(name)
+
+
+def content_addressed_storage():
+    """Storage callable for FileField(storage=...); resolves the STORAGES['content_addressed'] alias."""
+    return storages['content_addressed']
@@ -0,0 +1,211 @@
+import hashlib
+import os
+import shutil
+import tempfile
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import storages
+from django.test import TestCase, override_settings
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .models import StoredBlob, UploadSession
+from .storage import content_path
+
+
+class ContentAddressedStorageTests(TestCase):
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=media_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.storage = storages['content_addressed']
+
+    def test_identical_content_is_stored_once(self):
+        first = self.storage.save('uploads/gst/a.pdf', ContentFile(b'%PDF same bytes'))
+        second = self.storage.save('uploads/pan/b.pdf', ContentFile(b'%PDF same bytes'))
+        self.assertEqual(first, second)
+        self.assertRegex(first, r'^cas/[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.pdf$')
+        self.assertEqual(first, content_path(first.split('/')[-1][:64], '.pdf'))
+        self.assertEqual(StoredBlob.objects.get(name=first).ref_count, 2)
+        self.assertEqual(os.listdir(self.storage.path('cas/tmp')), [])
+
+    def test_file_is_removed_with_its_last_reference(self):
+        name = self.storage.save('a.txt', ContentFile(b'hello'))
+        self.storage.save('b.txt', ContentFile(b'hello'))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+        self.assertTrue(self.storage.exists(name))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+        self.assertFalse(self.storage.exists(name))
+        self.assertFalse(StoredBlob.objects.filter(name=name).exists())
+
+    def test_file_saved_again_before_the_unlink_survives(self):
+        name = self.storage.save('a.txt', ContentFile(b'again'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete(name)
+            # a concurrent upload of the same bytes lands before the deferred unlink runs
+            self.storage.save('b.txt', ContentFile(b'again'))
+        self.assertTrue(self.storage.exists(name))
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 1)
+
+    def test_retain_adds_a_reference_without_copying(self):
+        name = self.storage.save('a.txt', ContentFile(b'shared'))
+        self.storage.retain(name)
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 2)
+        self.assertEqual(len(os.listdir(os.path.dirname(self.storage.path(name)))), 1)
+
+        # a file stored before reference counting gets a blob for both holders
+        legacy = 'uploads/gst/legacy.pdf'
+        os.makedirs(os.path.dirname(self.storage.path(legacy)))
+        with open(self.storage.path(legacy), 'wb') as legacy_file:
+            legacy_file.write(b'legacy')
+        self.storage.retain(legacy)
+        blob = StoredBlob.objects.get(name=legacy)
+        self.assertEqual((blob.ref_count, blob.digest), (2, hashlib.sha256(b'legacy').hexdigest()))
+
+    def test_model_fields_release_replaced_and_deleted_files(self):
+        user = User.objects.create_user(phone_number='9000000010', username='kyc', password='KycPass123')
+        user.gst_upload.save('gst.pdf', ContentFile(b'gst v1'))
+        user.pan_upload.save('pan.pdf', ContentFile(b'gst v1'))
+        first = user.gst_upload.name
+        self.assertEqual(first, user.pan_upload.name)
+        self.assertEqual(StoredBlob.objects.get(name=first).ref_count, 2)
+
+        user = User.objects.get(pk=user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.gst_upload.save('gst.pdf', ContentFile(b'gst v2'))
+        self.assertEqual(StoredBlob.objects.get(name=first).ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.delete()
+        self.assertFalse(StoredBlob.objects.exists())
+        self.assertFalse(self.storage.exists(first))
+
+    def test_saving_identical_content_again_keeps_one_reference(self):
+        user = User.objects.create_user(phone_number='9000000011', username='kyc2', password='KycPass123')
+        user.gst_upload.save('gst.pdf', ContentFile(b'same gst'))
+        name = user.gst_upload.name
+
+        user = User.objects.get(pk=user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.gst_upload.save('gst.pdf', ContentFile(b'same gst'))
+        user = User.objects.get(pk=user.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            user.gst_upload = ContentFile(b'same gst', name='gst.pdf')
+            user.save()
+        self.assertEqual(user.gst_upload.name, name)
+        self.assertEqual(StoredBlob.objects.get(name=name).ref_count, 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user.delete()
+        self.assertFalse(StoredBlob.objects.filter(name=name).exists())
+        self.assertFalse(self.storage.exists(name))
+
+    def test_creating_a_row_leaves_unrelated_media_files_alone(self):
+        existing = self.storage.path('doc.pdf')
+        with open(existing, 'wb') as unrelated:
+            unrelated.write(b'someone else')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            user = User.objects.create(
+                phone_number='9000000012', username='kyc3', gst_upload=ContentFile(b'new gst', name='doc.pdf')
+            )
+        self.assertTrue(os.path.exists(existing))
+        self.assertEqual(StoredBlob.objects.get(name=user.gst_upload.name).ref_count, 1)
+
+        # a row built around a name we never stored does not release it either
+        with self.captureOnCommitCallbacks(execute=True):
+            User.objects.create(phone_number='9000000013', username='kyc4', pan_upload='doc.pdf')
+        self.assertTrue(os.path.exists(existing))
+
+    def test_names_without_a_blob_are_never_unlinked(self):
+        legacy = self.storage.path('legacy.pdf')
+        with open(legacy, 'wb') as legacy_file:
+            legacy_file.write(b'legacy')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.storage.delete('legacy.pdf')
+        self.assertTrue(os.path.exists(legacy))
+
+
+class UploadSessionTests(TestCase):
+
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root, ignore_errors=True)
+        settings_override = override_settings(MEDIA_ROOT=os.path.join(root, 'media'),
+                                               UPLOAD_SESSION_ROOT=os.path.join(root, 'sessions'))
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.user = User.objects.create_user(phone_number='9000000011', username='uploader', password='UpPass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def start(self, content, filename='scan.pdf'):
+        resp = self.client.post('/api/uploads/', {'filename': filename, 'size': len(content)}, format='json')
+        self.assertEqual(resp.status_code, 201, resp.data)
+        return resp.data['data']['id']
+
+    def put(self, upload_id, offset, chunk):
+        return self.client.put(f'/api/uploads/{upload_id}/', chunk, content_type='application/octet-stream',
+                               HTTP_UPLOAD_OFFSET=str(offset))
+
+    def finalize(self, upload_id, content):
+        return self.client.post(f'/api/uploads/{upload_id}/finalize/',
+                                {'sha256': hashlib.sha256(content).hexdigest()}, format='json')
+
+    def test_chunks_assemble_and_resume_from_server_offset(self):
+        content = os.urandom(10_000)
+        upload_id = self.start(content)
+        self.assertEqual(self.put(upload_id, 0, content[:4000]).data['data']['offset'], 4000)
+
+        # a retried or out-of-order chunk is refused with the offset to resume from
+        resp = self.put(upload_id, 0, content[:4000])
+        self.assertEqual(resp.status_code, 409)
+        self.assertEqual(resp['Upload-Offset'], '4000')
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/').data['data']['offset'], 4000)
+
+        self.put(upload_id, 4000, content[4000:])
+        resp = self.finalize(upload_id, content)
+        self.assertEqual(resp.status_code, 200, resp.data)
+        self.assertEqual(resp.data['data']['status'], UploadSession.COMPLETE)
+        with UploadSession.objects.get(pk=upload_id).open() as assembled:
+            self.assertEqual(assembled.read(), content)
+
+    def test_checksum_mismatch_resets_session(self):
+        upload_id = self.start(b'abcdef')
+        self.put(upload_id, 0, b'abcdeX')
+        resp = self.finalize(upload_id, b'abcdef')
+        self.assertEqual(resp.status_code, 400)
+        self.assertEqual(resp.data['data']['offset'], 0)
+
+    def test_chunk_past_declared_size_is_rejected(self):
+        upload_id = self.start(b'abc')
+        self.assertEqual(self.put(upload_id, 0, b'abcdef').status_code, 400)
+
+    def test_sessions_are_private(self):
+        upload_id = self.start(b'abc')
+        other = User.objects.create_user(phone_number='9000000012', username='other', password='OtherPass123')
+        self.client.force_authenticate(other)
+        self.assertEqual(self.client.get(f'/api/uploads/{upload_id}/').status_code, 404)
+
+    def test_kyc_document_accepts_upload_session_id(self):
+        content = b'%PDF-1.4 scanned gst certificate'
+        upload_id = self.start(content, filename='gst.pdf')
+        self.put(upload_id, 0, content)
+        self.finalize(upload_id, content)
+
+        resp = self.client.patch(f'/api/accounts/users/{self.user.pk}/', {'gstUpload': upload_id}, format='json')
+        self.assertEqual(resp.status_code, 200, resp.data)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.gst_upload.name.endswith('.pdf'))
+        with self.user.gst_upload.open('rb') as stored:
+            self.assertEqual(stored.read(), content)
+        # single use
+        self.assertFalse(UploadSession.objects.filter(pk=upload_id).exists())
@@ -0,0 +1,10 @@
+# filestore/urls.py
+from rest_framework.routers import DefaultRouter
+from .views import UploadSessionViewSet
+
+router = DefaultRouter()
+
+router.register(r'', UploadSessionViewSet, basename="upload-session")
+
+
+urlpatterns = router.urls
@@ -0,0 +1,78 @@
+# filestore/views.py
+import io
+
+from rest_framework import mixins, status, viewsets
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .models import UploadOffsetMismatch, UploadSession, UploadSessionError
+from .serializers import UploadSessionSerializer
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, mixins.DestroyModelMixin,
+                           viewsets.GenericViewSet):
+    """
+    Resumable chunked uploads.
+
+    POST   /api/uploads/                  {"filename", "size"} -> session with offset 0
+    PUT    /api/uploads/<id>/             raw bytes, Upload-Offset header (or ?offset=)
+    GET    /api/uploads/<id>/             current offset, to resume after a dropped connection
+    POST   /api/uploads/<id>/finalize/    {"sha256"} -> complete; the id can then replace the file
+    DELETE /api/uploads/<id>/             abandon the upload
+    """
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(created_by=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        UploadSession.purge_expired()
+        serializer = self.get_serializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({'success': False, 'message': 'Validation failed', 'errors': serializer.errors},
+                            status=status.HTTP_400_BAD_REQUEST)
+        serializer.save(created_by=request.user)
+        return Response({'success': True, 'message': 'Upload session created.', 'data': serializer.data},
+                        status=status.HTTP_201_CREATED)
+
+    def retrieve(self, request, *args, **kwargs):
+        session = self.get_object()
+        return Response({'success': True, 'message': 'Upload session retrieved.', 'data': self.get_serializer(session).data},
+                        headers={'Upload-Offset': str(session.received)})
+
+    def update(self, request, *args, **kwargs):
+        session = self.get_object()
+        offset = request.headers.get('Upload-Offset', request.query_params.get('offset'))
+        try:
+            offset = int(offset)
+        except (TypeError, ValueError):
+            return Response({'success': False, 'message': 'An integer Upload-Offset header (or ?offset=) is required.'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            # read straight from the request body stream; nothing is spooled
+            session.append(offset, request.stream or io.BytesIO())
+        except UploadOffsetMismatch as e:
+            return Response({'success': False, 'message': str(e), 'data': {'offset': e.offset}},
+                            status=status.HTTP_409_CONFLICT, headers={'Upload-Offset': str(e.offset)})
+        except UploadSessionError as e:
+            return Response({'success': False, 'message': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({'success': True, 'message': 'Chunk stored.', 'data': self.get_serializer(session).data},
+                        headers={'Upload-Offset': str(session.received)})
+
+    def destroy(self, request, *args, **kwargs):
+        self.get_object().discard()
+        return Response({'success': True, 'message': 'Upload session deleted.'}, status=status.HTTP_200_OK)
+
+    @action(detail=True, methods=['post'], url_path='finalize')
+    def finalize(self, request, pk=None):
+        session = self.get_object()
+        try:
+            session.finalize(request.data.get('sha256'))
+        except UploadSessionError as e:
+            return Response({'success': False, 'message': str(e), 'data': self.get_serializer(session).data},
+                            status=status.HTTP_400_BAD_REQUEST)
+        return Response({'success': True, 'message': 'Upload complete.', 'data': self.get_serializer(session).data})
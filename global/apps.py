@@ -0,0 +1,6 @@
+from django.apps import AppConfig
+
+
+class GlobalConfig(AppConfig):
+    """Project-wide helpers and commands that span the other apps (e.g. explain_queries)."""
+    name = 'global'
@@ -0,0 +1,102 @@
+# global/management/commands/explain_queries.py
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from accounts.hierarchy import team_of
+from accounts.models import Role, User, UserHierarchy
+from devices.models import BOMEntry, Device
+from devices.usage import filter_component_usage
+from jobs.models import Job
+from locations.models import District
+
+
+def hot_queries():
+    """(label, queryset) for the project's busiest read paths, as the views build them."""
+    now = timezone.now()
+    return [
+        ('device list page', Device.objects.active().order_by('-created_at', 'id')[:51]),
+        ('device list next page', Device.objects.active().filter(
+            Q(created_at__lt=now) | Q(created_at=now, id__gt=1)
+        ).order_by('-created_at', 'id')[:51]),
+        ('device BOM prefetch', BOMEntry.objects.filter(device_id__in=[1, 2, 3]).order_by('device_id', 'created_at', 'id')),
+        ('device BOM sync', BOMEntry.objects.filter(device_id=1).order_by('created_at', 'id')),
+        ('manufacturer dropdown', User.objects.filter(
+            role__in=Role.objects.filter(key__iexact='manufacturer'), is_active=True
+        )),
+        ('component usage by component', filter_component_usage(component='Resistor')),
+        ('component usage by manufacturer', filter_component_usage(manufacturer_id=1, state_of_supply='RAW_MATERIAL')),
+        ('component usage by state', filter_component_usage(state_of_supply='RAW_MATERIAL')),
+        ('manager check', UserHierarchy.objects.filter(ancestor_id=1, descendant_id=2, depth__gt=0)),
+        ('team of a manager', team_of(1, max_depth=3)[:50]),
+        ('managers of a user', UserHierarchy.objects.filter(descendant_id=2).order_by('depth')),
+        ('districts of a state', District.objects.filter(state_id=1).order_by('name')),
+        ('district list', District.objects.select_related('state').order_by('state__name', 'name')),
+        ('job queue claim', Job.objects.filter(status=Job.QUEUED, run_after__lte=now).order_by('run_after', 'id')[:10]),
+    ]
+
+
+# plan lines that mean "no index served this": full table scans and sorts done after the fact
+WARNING_PATTERNS = {
+    'sqlite': [
+        (re.compile(r'\bSCAN (?!.*USING (?:COVERING )?INDEX)(\w+)'), 'full scan of {0}'),
+        (re.compile(r'USE TEMP B-TREE FOR (.+)'), 'temp B-tree for {0}'),
+    ],
+    'postgresql': [
+        (re.compile(r'Seq Scan on (\w+)'), 'full scan of {0}'),
+        (re.compile(r'^\s*(?:->\s*)?Sort\b'), 'explicit sort'),
+    ],
+}
+
+# small lookup tables are scanned by design
+IGNORED_TABLES = {'accounts_role', 'accounts_state'}
+
+
+class Command(BaseCommand):
+    help = (
+        "EXPLAIN the project's hot queries and flag full table scans and sorts that no index serves. "
+        "Exits with an error under --strict so CI can catch index regressions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--strict', action='store_true', help='Fail when any query is flagged')
+        parser.add_argument('--verbose-plans', action='store_true', help='Print every plan, not only flagged ones')
+
+    def handle(self, *args, **options):
+        patterns = WARNING_PATTERNS.get(connection.vendor)
+        if patterns is None:
+            raise CommandError(f"EXPLAIN analysis is not supported on {connection.vendor}.")
+
+        flagged = 0
+        for label, queryset in hot_queries():
+            plan = self.explain(queryset)
+            warnings = []
+            for line in plan.splitlines():
+                for pattern, message in patterns:
+                    match = pattern.search(line)
+                    if match and not set(match.groups()) & IGNORED_TABLES:
+                        warnings.append(message.format(*match.groups()))
+
+            if warnings:
+                flagged += 1
+                self.stdout.write(self.style.WARNING(f"[!] {label}: {', '.join(warnings)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"[ok] {label}"))
+            if warnings or options['verbose_plans']:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+
+        if flagged and options['strict']:
+            raise CommandError(f"{flagged} hot query plan(s) flagged.")
+
+    def explain(self, queryset):
+        if connection.vendor != 'postgresql':
+            return queryset.explain()
+        # on small tables PostgreSQL prefers seq scans anyway; disabling them shows whether
+        # an index *could* serve the query, which is what a regression check needs
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+            return queryset.explain()
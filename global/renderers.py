@@ -13,8 +13,8 @@ class CustomRenderer(JSONRenderer):
                     "msg": data.get("message", "Request processed successfully"),
                     "data": data.get("data", None),  # only actual payload
                 }
-                # keep extra keys like 'count' if they exist
-                for key in ["count", "error", "errors"]:
+                # keep extra keys like 'count' or pagination links if they exist
+                for key in ["count", "next", "previous", "changes", "error", "errors"]:
                     if key in data:
                         final_data[key] = data[key]
                 data = final_data
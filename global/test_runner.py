@@ -0,0 +1,24 @@
+# global/test_runner.py
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+# tests clear and fill the cache freely, so they never touch the configured (shared) one
+TEST_CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "tests",
+    }
+}
+
+
+class TestRunner(DiscoverRunner):
+    """DiscoverRunner with a private in-memory cache for the whole run."""
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._cache_override = override_settings(CACHES=TEST_CACHES)
+        self._cache_override.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._cache_override.disable()
+        super().teardown_test_environment(**kwargs)
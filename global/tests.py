@@ -0,0 +1,12 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+
+class ExplainQueriesCommandTests(TestCase):
+
+    def test_hot_queries_are_served_by_indexes(self):
+        out = StringIO()
+        call_command('explain_queries', strict=True, stdout=out)
+        self.assertNotIn('[!]', out.getvalue())
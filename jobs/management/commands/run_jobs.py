@@ -0,0 +1,110 @@
+# jobs/management/commands/run_jobs.py
+import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, BrokenExecutor, ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from jobs.models import Job
+from jobs.runner import init_worker_process, run_job_by_id, worker_name
+
+logger = logging.getLogger(__name__)
+
+# seconds between sweeps for jobs left RUNNING by workers that died
+JOB_REQUEUE_INTERVAL = getattr(settings, 'JOB_REQUEUE_INTERVAL', 60)
+
+
+class Command(BaseCommand):
+    help = "Run queued background jobs on a local thread or process pool (no broker needed)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=2, help='Jobs run concurrently (default 2)')
+        parser.add_argument('--pool', choices=['thread', 'process'], default='thread')
+        parser.add_argument('--poll-interval', type=float, default=2.0, help='Seconds between queue polls when idle')
+        parser.add_argument(
+            '--stale-after', type=int, default=3600,
+            help='Re-queue RUNNING jobs without a heartbeat for this many seconds (crashed workers); '
+                 'checked at start and every JOB_REQUEUE_INTERVAL seconds, failing jobs out of attempts'
+        )
+        parser.add_argument('--once', action='store_true', help='Drain the queue, then exit')
+
+    def handle(self, *args, **options):
+        workers = max(1, options['workers'])
+        poll_interval = options['poll_interval']
+        worker = worker_name()
+
+        self.stdout.write(self.style.SUCCESS(f"Worker {worker} started ({workers} {options['pool']}s)"))
+        executor = self.make_executor(options['pool'], workers)
+        in_flight = set()
+        processed = 0
+        next_sweep = 0
+        try:
+            while True:
+                # jobs of workers that died while this one kept running are picked up here too
+                if time.monotonic() >= next_sweep:
+                    self.requeue_stale(options['stale_after'])
+                    next_sweep = time.monotonic() + JOB_REQUEUE_INTERVAL
+
+                finished = {future for future in in_flight if future.done()}
+                broken = False
+                for future in finished:
+                    processed += 1
+                    try:
+                        future.result()
+                    except BrokenExecutor:
+                        # a pool process died (e.g. killed for memory); its jobs go stale and are re-queued
+                        logger.exception("Job worker pool broke")
+                        broken = True
+                    except Exception:
+                        # e.g. a lost database connection; the job stays RUNNING until it goes stale
+                        logger.exception("Job worker failed outside the job handler")
+                in_flight -= finished
+                if broken:
+                    executor = self.replace_executor(executor, options['pool'], workers)
+
+                claimed = False
+                while len(in_flight) < workers:
+                    job = Job.claim_next(worker)
+                    if job is None:
+                        break
+                    try:
+                        future = executor.submit(run_job_by_id, job.pk)
+                    except BrokenExecutor:
+                        executor = self.replace_executor(executor, options['pool'], workers)
+                        future = executor.submit(run_job_by_id, job.pk)
+                    in_flight.add(future)
+                    claimed = True
+
+                if claimed:
+                    continue
+                if in_flight:
+                    wait(in_flight, timeout=poll_interval, return_when=FIRST_COMPLETED)
+                elif options['once']:
+                    break
+                else:
+                    time.sleep(poll_interval)
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping; waiting for running jobs to finish...")
+        finally:
+            executor.shutdown(wait=True)
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)"))
+
+    def make_executor(self, pool, workers):
+        if pool == 'process':
+            # children start lazily, after the parent reconnected; each drops the inherited connection
+            return ProcessPoolExecutor(max_workers=workers, initializer=init_worker_process)
+        return ThreadPoolExecutor(max_workers=workers)
+
+    def replace_executor(self, executor, pool, workers):
+        executor.shutdown(wait=False)
+        self.stdout.write(self.style.WARNING("Worker pool broke; starting a new one"))
+        return self.make_executor(pool, workers)
+
+    def requeue_stale(self, stale_after):
+        requeued, failed = Job.requeue_stale(stale_after)
+        if requeued:
+            self.stdout.write(self.style.WARNING(f"Re-queued {requeued} stale job(s)"))
+        if failed:
+            self.stdout.write(self.style.WARNING(f"Failed {failed} stale job(s) out of attempts"))
@@ -0,0 +1,136 @@
+# jobs/models.py
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import models
+from django.db.models import F
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    A unit of background work stored in the database.
+
+    Workers (`manage.py run_jobs`) claim queued jobs with a conditional UPDATE,
+    so no external broker is needed and two workers never run the same job.
+    """
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+
+    kind = models.CharField(max_length=100, help_text="Registered handler name, e.g. 'devices.import_bom'")
+    payload = models.JSONField(default=dict, blank=True)
+    input_file = models.FileField(upload_to='jobs/inputs/', null=True, blank=True)
+
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED)
+    progress = models.PositiveIntegerField(default=0, help_text="Units of work done so far")
+    progress_total = models.PositiveIntegerField(null=True, blank=True, help_text="Total units, when known")
+    result = models.JSONField(null=True, blank=True)
+    result_file = models.FileField(upload_to='jobs/results/', null=True, blank=True)
+    error = models.TextField(blank=True)
+
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=255, blank=True)
+
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='jobs'
+    )
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='jobs_status_run_after_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} #{self.pk} ({self.status})"
+
+    @property
+    def is_finished(self):
+        return self.status in (self.SUCCEEDED, self.FAILED)
+
+    @classmethod
+    def claim_next(cls, worker):
+        """Atomically move the oldest due job to RUNNING for `worker`; None when the queue is empty."""
+        now = timezone.now()
+        candidates = (
+            cls.objects.filter(status=cls.QUEUED, run_after__lte=now)
+            .order_by('run_after', 'id')
+            .values_list('id', flat=True)[:10]
+        )
+        for job_id in candidates:
+            # the status guard makes this a compare-and-set; a racing worker updates 0 rows
+            claimed = cls.objects.filter(pk=job_id, status=cls.QUEUED).update(
+                status=cls.RUNNING,
+                locked_by=worker,
+                started_at=now,
+                attempts=F('attempts') + 1,
+                updated_at=now,
+            )
+            if claimed:
+                return cls.objects.get(pk=job_id)
+        return None
+
+    @classmethod
+    def requeue_stale(cls, timeout):
+        """
+        Put RUNNING jobs whose worker vanished more than `timeout` seconds ago back in the queue,
+        or fail them once they have used up max_attempts (a job that keeps killing its worker,
+        e.g. by running out of memory, must not be retried forever). Workers heartbeat
+        updated_at every JOB_HEARTBEAT_INTERVAL seconds, so only dead ones go stale.
+        Returns (requeued, failed).
+        """
+        now = timezone.now()
+        stale = cls.objects.filter(status=cls.RUNNING, updated_at__lt=now - timedelta(seconds=timeout))
+        failed = stale.filter(attempts__gte=F('max_attempts')).update(
+            status=cls.FAILED, locked_by='', finished_at=now, updated_at=now,
+            error='Worker stopped responding on the final attempt.',
+        )
+        requeued = stale.update(status=cls.QUEUED, locked_by='', run_after=now, updated_at=now)
+        return requeued, failed
+
+    def set_progress(self, done, total=None):
+        """
+        Record progress without touching the rest of the row (safe to call from handlers).
+        Under a worker's heartbeat (jobs/runner.py) the heartbeat thread publishes it on its
+        own connection, so progress shows even while the handler is inside a transaction.
+        """
+        self.progress = done
+        if total is not None:
+            self.progress_total = total
+        heartbeat = getattr(self, '_heartbeat', None)
+        if heartbeat is not None:
+            heartbeat.nudge()
+            return
+        fields = {'progress': done, 'updated_at': timezone.now()}
+        if total is not None:
+            fields['progress_total'] = total
+        Job.objects.filter(pk=self.pk).update(**fields)
+
+    def retry(self):
+        """Re-queue a failed job for another full set of attempts."""
+        self.status = self.QUEUED
+        self.attempts = 0
+        self.error = ''
+        self.run_after = timezone.now()
+        self.finished_at = None
+        self.save(update_fields=['status', 'attempts', 'error', 'run_after', 'finished_at', 'updated_at'])
@@ -0,0 +1,52 @@
+# jobs/registry.py
+"""
+Job handler registry.
+
+Apps declare handlers in a `jobs.py` module (discovered at startup, like admin.py):
+
+    from jobs.registry import register
+
+    @register('devices.import_bom')
+    def import_bom(job):
+        ...
+        return {'created': 10}
+
+A handler receives the Job, may call job.set_progress(), and returns a
+JSON-serializable result. Raising marks the attempt as failed and it is retried
+until max_attempts; raise PermanentJobError for errors a retry cannot fix.
+"""
+from .models import Job
+
+_handlers = {}
+
+
+class UnknownJobKind(Exception):
+    pass
+
+
+class PermanentJobError(Exception):
+    """Fails the job immediately, without further retries (e.g. invalid input data)."""
+
+
+def register(kind):
+    def decorator(func):
+        _handlers[kind] = func
+        return func
+    return decorator
+
+
+def get_handler(kind):
+    try:
+        return _handlers[kind]
+    except KeyError:
+        raise UnknownJobKind(f"No job handler registered for '{kind}'.")
+
+
+def enqueue(kind, payload=None, input_file=None, created_by=None, max_attempts=3):
+    """Create a queued job; `input_file` (an uploaded file) is saved to storage first."""
+    get_handler(kind)
+    job = Job(kind=kind, payload=payload or {}, created_by=created_by, max_attempts=max_attempts)
+    if input_file is not None:
+        job.input_file.save(input_file.name, input_file, save=False)
+    job.save()
+    return job
@@ -0,0 +1,149 @@
+# jobs/runner.py
+import logging
+import os
+import socket
+import threading
+import traceback
+from datetime import timedelta
+
+import django
+from django.conf import settings
+from django.db import DatabaseError, close_old_connections, connection, connections
+from django.utils import timezone
+
+from .models import Job
+from .registry import PermanentJobError, get_handler
+
+logger = logging.getLogger(__name__)
+
+# seconds to wait before retry n is JOB_RETRY_BACKOFF * 2 ** (n - 1)
+JOB_RETRY_BACKOFF = getattr(settings, 'JOB_RETRY_BACKOFF', 30)
+# seconds between heartbeats of a running job; keep well under run_jobs --stale-after
+JOB_HEARTBEAT_INTERVAL = getattr(settings, 'JOB_HEARTBEAT_INTERVAL', 30)
+
+
+def worker_name():
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobHeartbeat:
+    """
+    Keep a running job's row fresh from a side thread while its handler works.
+
+    The thread has its own DB connection, so the heartbeat (updated_at) and the
+    handler's progress are committed even while the handler sits inside a long
+    transaction, and requeue_stale never mistakes a busy job for a dead one.
+    Job.set_progress wakes the thread instead of writing the row itself.
+    """
+
+    def __init__(self, job, interval=JOB_HEARTBEAT_INTERVAL):
+        self.job = job
+        self.interval = interval
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'job-{job.pk}-heartbeat', daemon=True)
+
+    def __enter__(self):
+        self.job._heartbeat = self
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._wake.set()
+        self._thread.join()
+        self.job._heartbeat = None
+
+    def nudge(self):
+        self._wake.set()
+
+    def beat(self):
+        job = self.job
+        try:
+            Job.objects.filter(pk=job.pk, status=Job.RUNNING, locked_by=job.locked_by).update(
+                updated_at=timezone.now(), progress=job.progress, progress_total=job.progress_total
+            )
+        except DatabaseError:
+            # e.g. SQLite's single writer is busy; the next beat tries again
+            logger.warning("Heartbeat for job %s failed", job.pk, exc_info=True)
+
+    def _run(self):
+        try:
+            while not self._stopped.is_set():
+                self._wake.wait(self.interval)
+                self._wake.clear()
+                if self._stopped.is_set():
+                    break
+                self.beat()
+                # progress nudges are published at most once a second
+                self._stopped.wait(1)
+        finally:
+            connection.close()
+
+
+def run_job(job, heartbeat=False):
+    """
+    Run one claimed job and record success, a scheduled retry, or final failure.
+    Workers pass heartbeat=True so the job row stays fresh while the handler runs.
+    """
+    try:
+        handler = get_handler(job.kind)
+        if heartbeat:
+            with JobHeartbeat(job):
+                result = handler(job)
+        else:
+            result = handler(job)
+    except PermanentJobError as e:
+        job.error = str(e)
+        job.locked_by = ''
+        job.status = Job.FAILED
+        job.finished_at = timezone.now()
+    except Exception:
+        job.error = traceback.format_exc()
+        job.locked_by = ''
+        if job.attempts < job.max_attempts:
+            job.status = Job.QUEUED
+            job.run_after = timezone.now() + timedelta(seconds=JOB_RETRY_BACKOFF * 2 ** (job.attempts - 1))
+        else:
+            job.status = Job.FAILED
+            job.finished_at = timezone.now()
+        logger.warning("Job %s (%s) attempt %s failed", job.pk, job.kind, job.attempts)
+    else:
+        job.status = Job.SUCCEEDED
+        job.result = result
+        job.error = ''
+        job.finished_at = timezone.now()
+        if job.progress_total:
+            job.progress = job.progress_total
+        if job.input_file:
+            job.input_file.delete(save=False)
+    job.save()
+    return job
+
+
+def run_job_by_id(job_id):
+    """Entry point for pool workers (threads or processes) that only receive the job id."""
+    close_old_connections()
+    try:
+        return run_job(Job.objects.get(pk=job_id), heartbeat=True).status
+    finally:
+        close_old_connections()
+
+
+def init_worker_process():
+    """ProcessPoolExecutor initializer: set Django up and drop any DB connection inherited from the parent."""
+    django.setup()
+    connections.close_all()
+
+
+def run_pending(worker=None, limit=None):
+    """Claim and run due jobs inline until the queue is empty (or `limit` is reached)."""
+    worker = worker or worker_name()
+    processed = 0
+    while limit is None or processed < limit:
+        job = Job.claim_next(worker)
+        if job is None:
+            break
+        run_job(job)
+        processed += 1
+    return processed
@@ -0,0 +1,17 @@
+# jobs/serializers.py
+from rest_framework import serializers
+from .models import Job
+
+
+class JobSerializer(serializers.ModelSerializer):
+    status_display = serializers.CharField(source='get_status_display', read_only=True)
+    result_file = serializers.FileField(read_only=True, use_url=True)
+
+    class Meta:
+        model = Job
+        fields = [
+            'id', 'kind', 'status', 'status_display', 'progress', 'progress_total',
+            'result', 'result_file', 'error', 'attempts', 'max_attempts', 'run_after',
+            'created_at', 'started_at', 'finished_at'
+        ]
+        read_only_fields = fields
@@ -0,0 +1,179 @@
+import threading
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError, connection, transaction
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from accounts.models import User
+from .management.commands import run_jobs
+from .models import Job
+from .registry import PermanentJobError, enqueue, register
+from .runner import JobHeartbeat, run_pending
+
+calls = []
+
+
+@register('tests.echo')
+def echo(job):
+    job.set_progress(1, total=2)
+    return {'echo': job.payload.get('value')}
+
+
+@register('tests.flaky')
+def flaky(job):
+    calls.append(job.attempts)
+    if job.attempts < 2:
+        raise RuntimeError('temporary failure')
+    return {'ok': True}
+
+
+@register('tests.invalid')
+def invalid(job):
+    raise PermanentJobError('bad input')
+
+
+def committed_progress(job_id):
+    """Job.progress as another connection (a status poller) sees it."""
+    seen = []
+
+    def read():
+        try:
+            seen.append(Job.objects.values_list('progress', flat=True).get(pk=job_id))
+        finally:
+            connection.close()
+
+    thread = threading.Thread(target=read)
+    thread.start()
+    thread.join()
+    return seen[0]
+
+
+class JobQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+        self.user = User.objects.create_user(phone_number='9000000002', username='jobs', password='JobsPass123')
+
+    def test_job_runs_and_records_result(self):
+        job = enqueue('tests.echo', {'value': 42}, created_by=self.user)
+        self.assertEqual(run_pending(), 1)
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.result, {'echo': 42})
+        self.assertEqual((job.progress, job.progress_total), (2, 2))
+
+    def test_failed_attempt_is_retried_after_backoff(self):
+        job = enqueue('tests.flaky')
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.QUEUED)
+        self.assertIn('temporary failure', job.error)
+        # the retry is scheduled in the future, so it is not picked up yet
+        self.assertEqual(run_pending(), 0)
+
+        Job.objects.filter(pk=job.pk).update(run_after=job.created_at)
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(calls, [1, 2])
+
+    def test_exhausted_attempts_fail_the_job(self):
+        job = enqueue('tests.flaky', max_attempts=1)
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.FAILED)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_permanent_error_skips_retries(self):
+        job = enqueue('tests.invalid')
+        run_pending()
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error, job.attempts), (Job.FAILED, 'bad input', 1))
+
+    def test_claim_is_exclusive(self):
+        job = enqueue('tests.echo')
+        self.assertEqual(Job.claim_next('a').pk, job.pk)
+        self.assertIsNone(Job.claim_next('b'))
+
+    def test_status_endpoint_is_scoped_to_owner(self):
+        job = enqueue('tests.echo', created_by=self.user)
+        other = User.objects.create_user(phone_number='9000000003', username='other', password='OtherPass123')
+        client = APIClient()
+
+        client.force_authenticate(self.user)
+        resp = client.get(f'/api/jobs/{job.pk}/')
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['data']['status'], Job.QUEUED)
+
+        client.force_authenticate(other)
+        self.assertEqual(client.get(f'/api/jobs/{job.pk}/').status_code, 404)
+
+
+class WorkerCommandTests(TransactionTestCase):
+    # the pool threads use their own DB connections, so the jobs must be committed
+
+    def test_worker_command_drains_queue(self):
+        jobs = [enqueue('tests.echo', {'value': i}) for i in range(3)]
+        call_command('run_jobs', once=True, workers=1, stdout=StringIO())
+        self.assertEqual(Job.objects.filter(pk__in=[j.pk for j in jobs], status=Job.SUCCEEDED).count(), 3)
+
+    def test_stale_jobs_are_requeued_until_out_of_attempts(self):
+        retried, exhausted = enqueue('tests.echo'), enqueue('tests.echo')
+        for job in (retried, exhausted):
+            Job.claim_next('dead-worker')
+        Job.objects.filter(pk=exhausted.pk).update(attempts=3)
+        Job.objects.update(updated_at=timezone.now() - timedelta(hours=2))
+
+        self.assertEqual(Job.requeue_stale(timeout=60), (1, 1))
+        retried.refresh_from_db()
+        exhausted.refresh_from_db()
+        self.assertEqual((retried.status, retried.locked_by), (Job.QUEUED, ''))
+        self.assertEqual(exhausted.status, Job.FAILED)
+        self.assertIsNotNone(exhausted.finished_at)
+
+    def test_worker_survives_errors_outside_the_handler(self):
+        jobs = [enqueue('tests.echo', {'value': i}) for i in range(2)]
+        real_run = run_jobs.run_job_by_id
+
+        def run_or_lose_connection(job_id):
+            if job_id == jobs[0].pk:
+                raise OperationalError('server closed the connection unexpectedly')
+            return real_run(job_id)
+
+        with mock.patch.object(run_jobs, 'run_job_by_id', run_or_lose_connection), \
+                self.assertLogs('jobs.management.commands.run_jobs', 'ERROR'):
+            call_command('run_jobs', once=True, workers=1, stdout=StringIO())
+        self.assertEqual(Job.objects.get(pk=jobs[0].pk).status, Job.RUNNING)
+        self.assertEqual(Job.objects.get(pk=jobs[1].pk).status, Job.SUCCEEDED)
+
+    def test_worker_sweeps_for_stale_jobs_while_running(self):
+        for i in range(3):
+            enqueue('tests.echo', {'value': i})
+        with mock.patch.object(run_jobs, 'JOB_REQUEUE_INTERVAL', 0), \
+                mock.patch.object(Job, 'requeue_stale', return_value=(0, 0)) as requeue_stale:
+            call_command('run_jobs', once=True, workers=1, stdout=StringIO())
+        self.assertGreater(requeue_stale.call_count, 1)
+
+    def test_heartbeat_publishes_progress_from_inside_a_transaction(self):
+        enqueue('tests.echo')
+        job = Job.claim_next('worker-a')
+        Job.objects.filter(pk=job.pk).update(updated_at=timezone.now() - timedelta(hours=2))
+
+        with JobHeartbeat(job, interval=60):
+            with transaction.atomic():
+                job.set_progress(2, total=5)
+                # pollers on other connections see it while this one is still mid-transaction
+                deadline = time.monotonic() + 5
+                while committed_progress(job.pk) != 2 and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                self.assertEqual(committed_progress(job.pk), 2)
+
+        job.refresh_from_db()
+        self.assertEqual((job.progress, job.progress_total), (2, 5))
+        self.assertEqual(Job.requeue_stale(timeout=60), (0, 0))
@@ -0,0 +1,50 @@
+# jobs/views.py
+from django.http import FileResponse
+from rest_framework import viewsets, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from .models import Job
+from .serializers import JobSerializer
+
+
+class JobViewSet(viewsets.ReadOnlyModelViewSet):
+    """Status, progress and results of background jobs submitted by the caller."""
+    serializer_class = JobSerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        user = self.request.user
+        queryset = Job.objects.all()
+        if user.is_superuser or (user.role and user.role.key.lower() == 'admin'):
+            return queryset
+        return queryset.filter(created_by=user)
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.get_queryset()
+        job_status = request.query_params.get('status')
+        if job_status:
+            queryset = queryset.filter(status=job_status)
+        serializer = self.get_serializer(queryset[:100], many=True)
+        return Response({'success': True, 'message': 'Jobs retrieved successfully', 'data': serializer.data})
+
+    def retrieve(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_object())
+        return Response({'success': True, 'message': 'Job retrieved successfully', 'data': serializer.data})
+
+    @action(detail=True, methods=['get'], url_path='result')
+    def download_result(self, request, pk=None):
+        job = self.get_object()
+        if job.status != Job.SUCCEEDED or not job.result_file:
+            return Response({'success': False, 'message': 'Job has no result file yet.'}, status=status.HTTP_404_NOT_FOUND)
+        return FileResponse(job.result_file.open('rb'), as_attachment=True, filename=job.result_file.name.rsplit('/', 1)[-1])
+
+    @action(detail=True, methods=['post'], url_path='retry')
+    def retry(self, request, pk=None):
+        job = self.get_object()
+        if job.status != Job.FAILED:
+            return Response({'success': False, 'message': 'Only failed jobs can be retried.'}, status=status.HTTP_400_BAD_REQUEST)
+        job.retry()
+        return Response({'success': True, 'message': 'Job queued for retry.', 'data': self.get_serializer(job).data},
+                        status=status.HTTP_202_ACCEPTED)
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.5 on 2026-10-16 22:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_role_accounts_role_key_upper_idx'),
+        ('locations', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='district',
+            index=models.Index(fields=['state', 'name'], name='district_state_name_idx'),
+        ),
+    ]
@@ -16,6 +16,10 @@ class District(models.Model):
     class Meta:
         ordering = ["state__name", "name"]
         unique_together = ("state", "code")  # optional: ensure unique code per state
+        indexes = [
+            # districts of a state by name; with the unique State.name index this also serves the default ordering
+            models.Index(fields=["state", "name"], name="district_state_name_idx"),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.code})"
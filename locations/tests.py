@@ -1,3 +1,35 @@
 from django.test import TestCase
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from accounts.models import State, User
+from .models import District
+
+
+class LocationConditionalGetTests(TestCase):
+
+    def setUp(self):
+        self.user = User.objects.create_superuser(phone_number='9000000010', username='admin', password='AdminPass123')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+        self.state = State.objects.create(name='Assam')
+        self.district = District.objects.create(name='Guwahati', code='GUW', state=self.state)
+
+    def test_state_list_returns_304_when_unchanged(self):
+        etag = self.client.get('/api/locations/states/')['ETag']
+        self.assertEqual(self.client.get('/api/locations/states/', HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+    def test_district_etag_changes_with_embedded_state(self):
+        url = f'/api/locations/districts/{self.district.pk}/'
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        self.state.name = 'Assam (IN)'
+        self.state.save()
+        resp = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
+        self.assertEqual(resp.data['state']['name'], 'Assam (IN)')
+
+    def test_district_list_etag_depends_on_search(self):
+        etag = self.client.get('/api/locations/districts/')['ETag']
+        resp = self.client.get('/api/locations/districts/?search=guw', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(resp.status_code, 200)
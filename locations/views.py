@@ -1,3 +1,5 @@
+from importlib import import_module
+
 from rest_framework import viewsets, status, filters
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -12,6 +14,9 @@ from accounts.serializers import StateSerializer
 # If HasCapability lives in accounts.permissions, import that instead.
 from accounts.permissions import HasCapability
 
+# `global` is a keyword, so the shared helpers package is loaded by name
+conditional_get = import_module('global.conditional').conditional_get
+
 
 class DistrictViewSet(viewsets.ModelViewSet):
     """
@@ -25,6 +30,16 @@ class DistrictViewSet(viewsets.ModelViewSet):
     filter_backends = [filters.SearchFilter, filters.OrderingFilter]
     search_fields = ["name", "code", "state__name"]
     ordering_fields = ["name", "code", "state__name"]
+    # the payload embeds the state, so its updated_at is part of the validators
+    conditional_timestamp_fields = ("updated_at", "state__updated_at")
+
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
 
     def perform_create(self, serializer):
         # Only superuser or role=admin allowed to create
@@ -66,6 +81,14 @@ class StateViewSet(viewsets.ModelViewSet):
     search_fields = ["name"]
     ordering_fields = ["name"]
 
+    @conditional_get
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
+
+    @conditional_get
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
     def create(self, request, *args, **kwargs):
         caller = request.user
         if not (caller.is_superuser or (caller.role and caller.role.key.lower() == "admin")):
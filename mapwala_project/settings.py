@@ -50,7 +50,10 @@ INSTALLED_APPS = [
     "accounts",
     "corsheaders",
     "locations",
-    "devices"
+    "devices",
+    "jobs",
+    "filestore",
+    "global",
 ]
 
 MIDDLEWARE = [
@@ -74,7 +77,9 @@ AUTH_USER_MODEL = "accounts.User"
 
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        # JWTAuthentication that refuses tokens carrying an outdated role grant and
+        # loads the user (with role) from a short-lived, signal-invalidated cache
+        "accounts.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": ("rest_framework.permissions.IsAuthenticated",),
     "DEFAULT_RENDERER_CLASSES": (
@@ -83,6 +88,56 @@ REST_FRAMEWORK = {
      "EXCEPTION_HANDLER": "global.exceptions.custom_exception_handler",
 }
 
+# Keyset pagination for the devices list (?page_size= is capped at the max)
+DEVICE_PAGE_SIZE = 50
+DEVICE_MAX_PAGE_SIZE = 500
+
+# Offset pages of GET /api/accounts/users/<id>/team/ (?page_size= is capped at the max)
+TEAM_PAGE_SIZE = 50
+TEAM_MAX_PAGE_SIZE = 500
+
+# Most devices accepted by POST /api/devices/batch/ in one request
+DEVICE_BATCH_MAX_SIZE = 5000
+
+# BOM spreadsheet rows inserted per bulk_create batch
+BOM_IMPORT_BATCH_SIZE = 1000
+
+# Background jobs (manage.py run_jobs): base delay in seconds before a failed attempt is retried
+JOB_RETRY_BACKOFF = 30
+# Seconds between heartbeats a worker writes for each running job; run_jobs
+# --stale-after must stay well above it
+JOB_HEARTBEAT_INTERVAL = 30
+# Seconds between a worker's sweeps for jobs left RUNNING by dead workers
+JOB_REQUEUE_INTERVAL = 60
+
+# Sticker images: bounding boxes of the generated variants, and the largest accepted upload in pixels
+STICKER_THUMBNAIL_SIZE = (256, 256)
+STICKER_WEBP_SIZE = (1600, 1600)
+STICKER_MAX_PIXELS = 40_000_000
+
+# Seconds a worker process trusts its cached role capability sets; changes made
+# in the same process invalidate them immediately
+CAPABILITY_CACHE_TTL = 60
+
+# Seconds the JWT authentication class keeps a user (with role) in the cache.
+# Saves invalidate the entry, so deactivations apply on the next request.
+AUTH_USER_CACHE_TTL = 30
+
+# The cache MUST be shared by every worker process: cached authenticated users
+# and role capability versions are invalidated through it, and a per-process
+# cache (LocMemCache, Django's default) would leave other workers serving a
+# deactivated user or an old grant. The file-based cache is shared by all
+# processes on this host; when serving from several hosts use RedisCache (or
+# another networked backend) instead.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": BASE_DIR / "cache",
+    }
+}
+# the test runner swaps in a private in-memory cache so test runs never clear this one
+TEST_RUNNER = "global.test_runner.TestRunner"
+
 from datetime import timedelta
 
 SIMPLE_JWT = {
@@ -169,3 +224,15 @@ import os
 
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# KYC documents and sticker images go to content-addressed, deduplicated storage (filestore app)
+STORAGES = {
+    "default": {"BACKEND": "django.core.files.storage.FileSystemStorage"},
+    "staticfiles": {"BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage"},
+    "content_addressed": {"BACKEND": "filestore.storage.ContentAddressedStorage"},
+}
+
+# Chunked upload sessions (/api/uploads/): part files live outside MEDIA_ROOT until used
+UPLOAD_SESSION_ROOT = os.path.join(BASE_DIR, 'upload_sessions')
+UPLOAD_SESSION_TTL = 24 * 60 * 60
+UPLOAD_SESSION_MAX_SIZE = 1024 * 1024 * 1024
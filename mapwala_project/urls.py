@@ -25,6 +25,8 @@ urlpatterns = [
     path('api/accounts/', include('accounts.urls')),  # handles login + users
     path("api/locations/", include("locations.urls")), # handles state + district
     path("api/devices/", include("devices.urls")),     # handles devices
+    path("api/jobs/", include("jobs.urls")),           # background job status
+    path("api/uploads/", include("filestore.urls")),   # resumable chunked uploads
 ]
 
 if settings.DEBUG: